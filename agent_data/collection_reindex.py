@@ -0,0 +1,424 @@
+"""Blue/green re-index of the vector collection behind a Qdrant alias.
+
+``QDRANT_COLLECTION`` is served through an alias. A re-index builds the next
+versioned collection (``<alias>_v<N>``) from PostgreSQL while searches and
+write-behind syncs keep using the live one, then repoints the alias with a
+single ``update_collection_aliases`` call. The previous collection is kept
+so ``rollback`` can point the alias back to it.
+
+Documents written while the build runs land in the live collection only;
+a catch-up pass re-reads PostgreSQL just before the switch and applies
+revisions that changed since the first pass. Documents that failed to
+index are retried there too, and the alias is left alone if any still fail.
+Writes that land after catch-up has read them but before the switch reach
+only the old collection, so once the alias moves, ``resync`` re-syncs
+every document updated since catch-up started.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import uuid4
+
+from agent_data import vector_store
+
+# Documents per upsert_documents call; also the progress reporting step
+REINDEX_BATCH_DOCS = int(os.getenv("REINDEX_BATCH_DOCS", "64"))
+# Per-document errors kept in the progress report
+REINDEX_MAX_ERRORS = 50
+# Re-sync from this long before catch-up started, so a write whose
+# updated_at was stamped just before catch-up but committed after it
+# is still covered
+REINDEX_RESYNC_MARGIN_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+DocumentSource = Callable[[], Iterable[dict[str, Any]]]
+DocumentCount = Callable[[], int]
+# Re-syncs documents updated at or after a Unix time; returns how many
+Resync = Callable[[float], int]
+ToDocument = Callable[[str, dict[str, Any]], vector_store.VectorDocument | None]
+
+
+def _version_re(alias: str) -> re.Pattern[str]:
+    return re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+
+
+def versioned_collections(client: Any, alias: str) -> list[tuple[int, str]]:
+    """Existing ``<alias>_v<N>`` collections as (N, name), oldest first."""
+    pattern = _version_re(alias)
+    found = []
+    for description in client.get_collections().collections:
+        match = pattern.match(description.name)
+        if match:
+            found.append((int(match.group(1)), description.name))
+    return sorted(found)
+
+
+def switch_alias(client: Any, alias: str, collection: str) -> str | None:
+    """Point ``alias`` at ``collection`` atomically; returns the old target."""
+    previous = vector_store.alias_target(client, alias)
+    operations: list[Any] = []
+    if previous is not None:
+        operations.append(
+            vector_store.qmodels.DeleteAliasOperation(
+                delete_alias=vector_store.qmodels.DeleteAlias(alias_name=alias)
+            )
+        )
+    operations.append(
+        vector_store.qmodels.CreateAliasOperation(
+            create_alias=vector_store.qmodels.CreateAlias(
+                collection_name=collection, alias_name=alias
+            )
+        )
+    )
+    client.update_collection_aliases(change_aliases_operations=operations)
+    return previous
+
+
+@dataclass
+class ReindexProgress:
+    job_id: str
+    alias: str
+    source: str | None = None
+    target: str | None = None
+    phase: str = "preparing"
+    sparse_vectors: bool | None = None
+    # None until counted, or until the build has read every row
+    total_docs: int | None = None
+    processed_docs: int = 0
+    indexed: int = 0
+    skipped: int = 0
+    caught_up: int = 0
+    resynced: int = 0
+    errors: list[dict[str, str]] = field(default_factory=list)
+    error_count: int = 0
+    error: str | None = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    def to_dict(self) -> dict[str, Any]:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        rate = self.processed_docs / elapsed if elapsed > 0 else 0.0
+        eta: float | None = None
+        percent: float | None = None
+        if self.total_docs is not None:
+            if self.running and rate > 0:
+                eta = round(max(0, self.total_docs - self.processed_docs) / rate, 1)
+            # Rows written after the count can push processed past the total
+            done = min(self.processed_docs, self.total_docs)
+            percent = round(100 * done / self.total_docs, 1) if self.total_docs else 0.0
+        return {
+            "job_id": self.job_id,
+            "alias": self.alias,
+            "source": self.source,
+            "target": self.target,
+            "phase": self.phase,
+            "running": self.running,
+            "sparse_vectors": self.sparse_vectors,
+            "total_docs": self.total_docs,
+            "processed_docs": self.processed_docs,
+            "percent": percent,
+            "indexed": self.indexed,
+            "skipped": self.skipped,
+            "caught_up": self.caught_up,
+            "resynced": self.resynced,
+            "errors": self.errors,
+            "error_count": self.error_count,
+            "error": self.error,
+            "elapsed_seconds": round(elapsed, 1),
+            "docs_per_second": round(rate, 2),
+            "eta_seconds": eta,
+        }
+
+
+class BlueGreenReindex:
+    """Build ``<alias>_v<N>`` from PostgreSQL and switch the alias to it.
+
+    ``stream_docs`` returns the raw PostgreSQL rows; ``to_document`` turns
+    one into a VectorDocument, or None when it has nothing to embed. The
+    rows are consumed lazily, ``batch_size`` documents per upsert, so the
+    corpus is never held in memory. ``count_docs`` gives the total for the
+    progress percentage and ETA; without it both stay unknown until the
+    build has read every row. ``resync`` hands documents written since
+    catch-up started to the live write path once the alias has switched.
+
+    When the configured name is still a concrete collection (created before
+    aliases were used) Qdrant cannot alias over it. ``replace_collection``
+    allows deleting it at switch time; searches fail for the moment between
+    the delete and the alias creation, and there is no rollback target.
+    """
+
+    def __init__(
+        self,
+        store: vector_store.QdrantVectorStore,
+        stream_docs: DocumentSource,
+        to_document: ToDocument,
+        *,
+        count_docs: DocumentCount | None = None,
+        resync: Resync | None = None,
+        replace_collection: bool = False,
+        batch_size: int = REINDEX_BATCH_DOCS,
+    ) -> None:
+        self.store = store
+        self.stream_docs = stream_docs
+        self.to_document = to_document
+        self.count_docs = count_docs
+        self.resync = resync
+        self.replace_collection = replace_collection
+        self.batch_size = max(1, batch_size)
+        self.progress = ReindexProgress(job_id=uuid4().hex, alias=store.collection)
+
+    def run(self) -> ReindexProgress:
+        progress = self.progress
+        try:
+            target_store = self._prepare()
+            revisions, written = self._build(target_store)
+            progress.phase = "catching_up"
+            caught_up_from = time.time()
+            self._catch_up(target_store, revisions, written)
+            progress.phase = "switching"
+            self._switch()
+            if self.resync is not None:
+                progress.phase = "resyncing"
+                try:
+                    progress.resynced = self.resync(
+                        caught_up_from - REINDEX_RESYNC_MARGIN_SECONDS
+                    )
+                except Exception as exc:
+                    raise RuntimeError(
+                        f"{progress.alias} switched to {progress.target} but"
+                        f" re-syncing recent writes failed: {exc}"
+                    ) from exc
+            progress.phase = "completed"
+        except Exception as exc:
+            progress.phase = "failed"
+            progress.error = str(exc)
+            logger.error("Blue/green re-index of %s failed: %s", progress.alias, exc)
+        finally:
+            progress.finished_at = time.time()
+            logger.info("vector_reindex", extra=progress.to_dict())
+        return progress
+
+    def _prepare(self) -> vector_store.QdrantVectorStore:
+        progress = self.progress
+        self.store._ensure_client()
+        client = self.store._client
+        if client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        alias = progress.alias
+        progress.source = vector_store.alias_target(client, alias)
+        if progress.source is None and client.collection_exists(alias):
+            if not self.replace_collection:
+                raise RuntimeError(
+                    f"{alias} is a collection, not an alias; re-run with "
+                    "replace_collection to retire it at switch time"
+                )
+            progress.source = alias
+        versions = versioned_collections(client, alias)
+        next_version = versions[-1][0] + 1 if versions else 1
+        progress.target = f"{alias}_v{next_version}"
+
+        # ensure() records the new collection's own sparse-vector support, so
+        # the build writes bm25 even when the live collection is dense-only
+        target_store = self.store.for_collection(progress.target)
+        report = vector_store.CollectionManager(target_store).ensure()
+        if report["drift"]:
+            raise RuntimeError(f"New collection drift: {report['drift']}")
+        progress.sparse_vectors = report["sparse_vectors"]
+        return target_store
+
+    def _build(
+        self, target_store: vector_store.QdrantVectorStore
+    ) -> tuple[dict[str, Any], set[str]]:
+        """Index every live row; returns (revisions indexed, ids written).
+
+        Only successful upserts record a revision, so catch-up retries the
+        rest; the written ids include failures, which may have left points.
+        """
+        progress = self.progress
+        progress.phase = "building"
+        if self.count_docs is not None:
+            progress.total_docs = self.count_docs()
+        revisions: dict[str, Any] = {}
+        written: set[str] = set()
+        batch: list[vector_store.VectorDocument] = []
+        batch_revisions: dict[str, Any] = {}
+        for row in self.stream_docs():
+            if row.get("deleted_at") is not None:
+                progress.processed_docs += 1
+                progress.skipped += 1
+                continue
+            doc_id = row.get("document_id", row.get("_key", ""))
+            document = self.to_document(doc_id, row)
+            if document is None:
+                revisions[doc_id] = row.get("revision")
+                progress.processed_docs += 1
+                progress.skipped += 1
+                continue
+            batch.append(document)
+            batch_revisions[doc_id] = row.get("revision")
+            if len(batch) >= self.batch_size:
+                self._upsert_batch(target_store, batch, batch_revisions, revisions)
+                written.update(batch_revisions)
+                batch, batch_revisions = [], {}
+        if batch:
+            self._upsert_batch(target_store, batch, batch_revisions, revisions)
+            written.update(batch_revisions)
+        progress.total_docs = progress.processed_docs
+        return revisions, written
+
+    def _upsert_batch(
+        self,
+        target_store: vector_store.QdrantVectorStore,
+        batch: list[vector_store.VectorDocument],
+        batch_revisions: dict[str, Any],
+        revisions: dict[str, Any],
+    ) -> None:
+        results = self._upsert(target_store, batch)
+        for doc_id, revision in batch_revisions.items():
+            result = results.get(doc_id)
+            if result is not None and result.status != "error":
+                revisions[doc_id] = revision
+
+    def _catch_up(
+        self,
+        target_store: vector_store.QdrantVectorStore,
+        revisions: dict[str, Any],
+        written: set[str],
+    ) -> None:
+        live: set[str] = set()
+        changed: list[vector_store.VectorDocument] = []
+        for row in self.stream_docs():
+            if row.get("deleted_at") is not None:
+                continue
+            doc_id = row.get("document_id", row.get("_key", ""))
+            live.add(doc_id)
+            if doc_id in revisions and revisions[doc_id] == row.get("revision"):
+                continue
+            document = self.to_document(doc_id, row)
+            if document is not None:
+                changed.append(document)
+        for doc_id in (set(revisions) | written) - live:
+            target_store.delete_document(doc_id)
+            self.progress.caught_up += 1
+        if not changed:
+            return
+        results = target_store.upsert_documents(changed)
+        self.progress.caught_up += len(results)
+        self._record_errors(results)
+        failed = sorted(
+            document.document_id
+            for document in changed
+            if document.document_id not in results
+            or results[document.document_id].status == "error"
+        )
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} documents still fail to index (e.g. {failed[0]});"
+                f" {self.progress.alias} left on {self.progress.source}"
+            )
+
+    def _switch(self) -> None:
+        progress = self.progress
+        client = self.store._client
+        if progress.source == progress.alias:
+            # Concrete collection in the alias' place (replace_collection)
+            client.delete_collection(collection_name=progress.alias)
+            progress.source = None
+        switch_alias(client, progress.alias, progress.target)
+        # Refresh /health and the hybrid-search flag for the new collection
+        vector_store.ensure_collection()
+
+    def _upsert(
+        self,
+        target_store: vector_store.QdrantVectorStore,
+        batch: list[vector_store.VectorDocument],
+    ) -> dict[str, vector_store.VectorSyncResult]:
+        progress = self.progress
+        results = target_store.upsert_documents(batch)
+        progress.processed_docs += len(batch)
+        for result in results.values():
+            if result.status == "ready":
+                progress.indexed += 1
+            elif result.status == "skipped":
+                progress.skipped += 1
+        self._record_errors(results)
+        logger.info("vector_reindex", extra=progress.to_dict())
+        return results
+
+    def _record_errors(self, results: dict[str, vector_store.VectorSyncResult]) -> None:
+        progress = self.progress
+        for doc_id, result in results.items():
+            if result.status != "error":
+                continue
+            progress.error_count += 1
+            if len(progress.errors) < REINDEX_MAX_ERRORS:
+                progress.errors.append({"document_id": doc_id, "error": result.error})
+
+
+def rollback(
+    store: vector_store.QdrantVectorStore, collection: str | None = None
+) -> dict[str, Any]:
+    """Point the alias back at ``collection`` or the previous version."""
+    store._ensure_client()
+    client = store._client
+    if client is None:
+        raise RuntimeError("Qdrant client unavailable")
+    alias = store.collection
+    current = vector_store.alias_target(client, alias)
+    if collection is None:
+        current_version = _version_number(alias, current) if current else None
+        older = [
+            name
+            for version, name in versioned_collections(client, alias)
+            if current_version is None or version < current_version
+        ]
+        if not older:
+            raise ValueError(f"No earlier {alias}_v<N> collection to roll back to")
+        collection = older[-1]
+    elif not client.collection_exists(collection):
+        raise ValueError(f"Collection {collection} does not exist")
+    switch_alias(client, alias, collection)
+    vector_store.ensure_collection()
+    logger.info(
+        "vector_reindex_rollback",
+        extra={"alias": alias, "from": current, "to": collection},
+    )
+    return {"alias": alias, "previous": current, "collection": collection}
+
+
+def _version_number(alias: str, collection: str) -> int:
+    match = _version_re(alias).match(collection)
+    return int(match.group(1)) if match else 0
+
+
+_lock = threading.Lock()
+_active: BlueGreenReindex | None = None
+
+
+def start(job: BlueGreenReindex) -> bool:
+    """Register ``job`` as the active re-index; False if one is running."""
+    global _active
+    with _lock:
+        if _active is not None and _active.progress.running:
+            return False
+        _active = job
+        return True
+
+
+def current_progress() -> dict[str, Any] | None:
+    """Progress of the running or most recent re-index."""
+    job = _active
+    return job.progress.to_dict() if job is not None else None
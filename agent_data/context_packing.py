@@ -0,0 +1,146 @@
+"""Token-budgeted prompt context for knowledge queries.
+
+Retrieved chunks are packed into the prompt in retrieval order (score
+order, or the MMR pick order of a diversified search) until
+``QUERY_CONTEXT_TOKENS`` is spent. Chunks that repeat one already packed
+(overlapping chunks, copies of a document under another id) are dropped
+first: each chunk gets a MinHash signature over word shingles and is
+skipped when its estimated Jaccard similarity to a packed chunk reaches
+``QUERY_DEDUP_THRESHOLD``. The chunk that crosses the budget is cut to
+fit when enough room is left, otherwise skipped in favour of smaller
+ones further down.
+"""
+
+from __future__ import annotations
+
+import os
+import zlib
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from agent_data import sparse_vectors
+from agent_data.vector_store import TokenCounter, get_token_counter
+
+# Prompt tokens available for retrieved context on /chat
+QUERY_CONTEXT_TOKENS = int(os.getenv("QUERY_CONTEXT_TOKENS", "3000"))
+# Estimated Jaccard similarity at which a chunk counts as a near-duplicate
+QUERY_DEDUP_THRESHOLD = float(os.getenv("QUERY_DEDUP_THRESHOLD", "0.8"))
+# Tokenizer used to measure the prompt (the chat model, not the embedder)
+QUERY_TOKENIZER_MODEL = os.getenv("QUERY_TOKENIZER_MODEL", "gpt-4o-mini")
+
+SHINGLE_WORDS = 3
+MINHASH_PERMUTATIONS = 64
+# A cut-down chunk shorter than this is not worth its header
+MIN_PARTIAL_TOKENS = 48
+
+CONTEXT_SEPARATOR = "\n\n"
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(0x5EED)
+_PERM_A = _rng.integers(1, _PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set[int]:
+    """Hashed ``size``-word shingles; shorter texts give one shingle."""
+    words = sparse_vectors.tokenize(text)
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i : i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash(shingle_set: set[int]) -> np.ndarray:
+    """MinHash signature: the minimum of each permutation over the shingles."""
+    if not shingle_set:
+        return np.full(MINHASH_PERMUTATIONS, _PRIME, dtype=np.uint64)
+    values = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+    # (a * h + b) mod p stays below 2**63 for 32-bit h and 31-bit a, b
+    hashed = (np.outer(_PERM_A, values % _PRIME) + _PERM_B[:, None]) % _PRIME
+    return hashed.min(axis=1)
+
+
+def similarity(left: np.ndarray, right: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.count_nonzero(left == right)) / MINHASH_PERMUTATIONS
+
+
+def _entry_text(entry: Any) -> str:
+    return getattr(entry, "prompt_text", None) or entry.snippet or ""
+
+
+def _format(document_id: str, text: str) -> str:
+    return f"Source: {document_id}\n{text}"
+
+
+@dataclass
+class PackedContext:
+    entries: list[Any] = field(default_factory=list)
+    text: str = ""
+    tokens: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+    truncated: int = 0
+
+
+def pack_context(
+    entries: Sequence[Any],
+    *,
+    budget: int = QUERY_CONTEXT_TOKENS,
+    counter: TokenCounter | None = None,
+    threshold: float = QUERY_DEDUP_THRESHOLD,
+    by_score: bool = False,
+) -> PackedContext:
+    """Pack ``entries`` (QueryContextEntry-like) into at most ``budget`` tokens.
+
+    Entries are taken in the given order, or in descending score order with
+    ``by_score``, and returned in that order; ``text`` is the formatted
+    context block handed to the model.
+    """
+    counter = counter or get_token_counter(QUERY_TOKENIZER_MODEL)
+    packed = PackedContext()
+    blocks: list[str] = []
+    signatures: list[np.ndarray] = []
+    separator_tokens = counter.count(CONTEXT_SEPARATOR)
+    remaining = budget
+
+    if by_score:
+        entries = sorted(entries, key=lambda e: e.score or 0.0, reverse=True)
+    for entry in entries:
+        text = _entry_text(entry).strip()
+        if not text:
+            continue
+        # Nothing past the budget can be used, so never shingle more than that
+        text = counter.truncate(text, budget)
+        signature = minhash(shingles(text))
+        if any(similarity(signature, seen) >= threshold for seen in signatures):
+            packed.duplicates += 1
+            continue
+
+        cost = separator_tokens if blocks else 0
+        header = _format(entry.document_id, "")
+        block = _format(entry.document_id, text)
+        tokens = counter.count(block)
+        if cost + tokens > remaining:
+            room = remaining - cost - counter.count(header)
+            if room < MIN_PARTIAL_TOKENS:
+                packed.over_budget += 1
+                continue
+            block = header + counter.truncate(text, room)
+            tokens = counter.count(block)
+            packed.truncated += 1
+
+        blocks.append(block)
+        signatures.append(signature)
+        packed.entries.append(entry)
+        remaining -= cost + tokens
+
+    packed.text = CONTEXT_SEPARATOR.join(blocks)
+    # Block counts add up to an upper bound; report the exact figure
+    packed.tokens = counter.count(packed.text)
+    return packed
@@ -0,0 +1,55 @@
+"""Maximal marginal relevance (MMR) re-ranking of search candidates.
+
+Vector search returns the documents closest to the query, which for broad
+questions are often near-copies of each other (versioned files, duplicated
+context packs). MMR picks results one at a time, trading relevance to the
+query against similarity to what was already picked:
+
+    score(d) = lambda * sim(q, d) - (1 - lambda) * max sim(d, picked)
+
+``lambda = 1`` is plain relevance order; lower values favour coverage.
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Sequence
+
+import numpy as np
+
+# Relevance/diversity trade-off used when a request does not set one
+MMR_LAMBDA = float(os.getenv("QDRANT_MMR_LAMBDA", "0.5"))
+# Candidates fetched per requested result before re-ranking
+MMR_CANDIDATES = int(os.getenv("QDRANT_MMR_CANDIDATES", "4"))
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def mmr_select(
+    query: Sequence[float],
+    candidates: Sequence[Sequence[float]],
+    k: int,
+    lambda_: float = MMR_LAMBDA,
+) -> list[int]:
+    """Indices of the ``k`` candidates MMR picks, in pick order (cosine)."""
+    if k <= 0 or not len(candidates):
+        return []
+    matrix = _unit_rows(np.asarray(candidates, dtype=np.float32))
+    relevance = matrix @ _unit_rows(np.asarray(query, dtype=np.float32))
+    similarity = matrix @ matrix.T
+
+    picked = [int(np.argmax(relevance))]
+    closest = similarity[picked[0]].copy()
+    available = np.ones(len(matrix), dtype=bool)
+    available[picked[0]] = False
+    while len(picked) < min(k, len(matrix)):
+        scores = lambda_ * relevance - (1.0 - lambda_) * closest
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        np.maximum(closest, similarity[best], out=closest)
+    return picked
@@ -0,0 +1,518 @@
+"""In-process vector index for running without a Qdrant cluster.
+
+Selected with ``VECTOR_BACKEND=local``. Vectors live in an append-only
+float32 file that is memory-mapped at startup (no copy into RAM), next to a
+JSON-lines sidecar holding point ids and payloads:
+
+  <LOCAL_VECTOR_PATH>/<collection>.f32    row-major float32, one row per point
+  <LOCAL_VECTOR_PATH>/<collection>.jsonl  header, then add/payload/delete ops
+
+Search is exact: one matrix-vector product over the whole mapped matrix,
+a payload filter mask built from per-field postings, then a partial sort
+for the top hits. That makes it both a
+hermetic backend for dev and CI and a recall baseline for the ANN index.
+
+``LocalVectorStore`` reuses the chunking, embedding cache and incremental
+re-index logic of ``QdrantVectorStore`` and only replaces the Qdrant calls.
+Without ``OPENAI_API_KEY`` texts are embedded with a deterministic feature
+hash so the whole server can run offline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import zlib
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+from typing import Any
+
+from agent_data import sparse_vectors
+from agent_data.vector_store import (
+    VECTOR_DISTANCE,
+    VECTOR_SIZE,
+    OpenAI,
+    QdrantVectorStore,
+    VectorSyncResult,
+    qmodels,
+)
+
+try:  # pragma: no cover - optional dependency import guard
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+LOCAL_VECTOR_PATH = os.getenv("LOCAL_VECTOR_PATH", ".vector_index")
+
+logger = logging.getLogger(__name__)
+
+
+def _payload_values(payload: dict[str, Any], key: str) -> list[Any]:
+    value: Any = payload
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return []
+        value = value.get(part)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _hash_embedding(text: str, dim: int) -> list[float]:
+    """Signed feature-hash embedding used when no OpenAI key is configured."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in sparse_vectors.tokenize(text):
+        h = zlib.crc32(token.encode("utf-8"))
+        vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norm = float(np.linalg.norm(vector))
+    return (vector / norm if norm else vector).tolist()
+
+
+class MmapVectorIndex:
+    """Append-only float32 matrix plus id/payload sidecar for one collection."""
+
+    def __init__(self, directory: str | Path, collection: str) -> None:
+        self.directory = Path(directory)
+        self.vectors_path = self.directory / f"{collection}.f32"
+        self.sidecar_path = self.directory / f"{collection}.jsonl"
+        self.dim: int | None = None
+        self._lock = threading.RLock()
+        self._ids: list[str | None] = []  # row -> point id, None once replaced
+        self._payloads: list[dict[str, Any] | None] = []
+        self._rows: dict[str, int] = {}  # live point id -> row
+        self._by_document: dict[str, set[str]] = {}
+        self._live: Any = None  # live-row mask, rebuilt lazily
+        # payload key -> value -> rows holding it; dropped on every write
+        self._postings: dict[str, dict[Any, list[int]]] = {}
+        self._matrix: Any = None
+        self._load()
+
+    # -- persistence --
+
+    def _load(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if not self.sidecar_path.exists():
+            return
+        with self.sidecar_path.open(encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    self._apply(json.loads(line))
+        rows = len(self._ids)
+        if self.dim and rows:
+            # Vectors are written before their sidecar records; drop a torn tail
+            expected = rows * self.dim * 4
+            if self.vectors_path.stat().st_size > expected:
+                os.truncate(self.vectors_path, expected)
+        dead = rows - len(self._rows)
+        if dead > len(self._rows):
+            self.compact()
+
+    def _apply(self, record: dict[str, Any]) -> None:
+        op = record.get("op")
+        if op is None:
+            self.dim = int(record["dim"])
+        elif op == "add":
+            self._drop(record["id"])
+            self._rows[record["id"]] = len(self._ids)
+            self._ids.append(record["id"])
+            self._payloads.append(record["payload"])
+            self._index_document(record["id"], record["payload"])
+        elif op == "payload":
+            row = self._rows[record["id"]]
+            self._unindex_document(record["id"], self._payloads[row])
+            self._payloads[row] = record["payload"]
+            self._index_document(record["id"], record["payload"])
+        elif op == "delete":
+            self._drop(record["id"])
+        self._live = None
+        self._postings.clear()
+
+    def _append_records(self, records: list[dict[str, Any]]) -> None:
+        with self.sidecar_path.open("a", encoding="utf-8") as fh:
+            for record in records:
+                fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        for record in records:
+            self._apply(record)
+
+    def compact(self) -> None:
+        """Rewrite both files with live rows only."""
+        with self._lock:
+            if self.dim is None:
+                return
+            live_rows = sorted(self._rows.values())
+            matrix = self._load_matrix()
+            tmp_vectors = self.vectors_path.with_suffix(".f32.tmp")
+            tmp_sidecar = self.sidecar_path.with_suffix(".jsonl.tmp")
+            with tmp_vectors.open("wb") as fh:
+                if matrix is not None and live_rows:
+                    fh.write(np.ascontiguousarray(matrix[live_rows]).tobytes())
+            with tmp_sidecar.open("w", encoding="utf-8") as fh:
+                fh.write(json.dumps({"dim": self.dim}) + "\n")
+                for row in live_rows:
+                    record = {
+                        "op": "add",
+                        "id": self._ids[row],
+                        "payload": self._payloads[row],
+                    }
+                    fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._matrix = None
+            os.replace(tmp_vectors, self.vectors_path)
+            os.replace(tmp_sidecar, self.sidecar_path)
+            self._reset()
+            self._load()
+
+    def _reset(self) -> None:
+        self._ids, self._payloads = [], []
+        self._rows, self._by_document = {}, {}
+        self._live = None
+        self._postings.clear()
+
+    # -- in-memory bookkeeping --
+
+    def _drop(self, point_id: str) -> None:
+        row = self._rows.pop(point_id, None)
+        if row is None:
+            return
+        self._unindex_document(point_id, self._payloads[row])
+        self._ids[row] = None
+        self._payloads[row] = None
+
+    def _index_document(self, point_id: str, payload: dict[str, Any]) -> None:
+        document_id = payload.get("document_id")
+        if document_id:
+            self._by_document.setdefault(document_id, set()).add(point_id)
+
+    def _unindex_document(self, point_id: str, payload: dict[str, Any] | None) -> None:
+        document_id = (payload or {}).get("document_id")
+        ids = self._by_document.get(document_id) if document_id else None
+        if ids is not None:
+            ids.discard(point_id)
+            if not ids:
+                del self._by_document[document_id]
+
+    def _load_matrix(self) -> Any:
+        rows = len(self._ids)
+        if not rows or not self.dim:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)
+            )
+        return self._matrix
+
+    def _live_mask(self) -> Any:
+        if self._live is None:
+            self._live = np.fromiter(
+                (point_id is not None for point_id in self._ids),
+                dtype=bool,
+                count=len(self._ids),
+            )
+        return self._live
+
+    def _key_postings(self, key: str) -> dict[Any, list[int]]:
+        postings = self._postings.get(key)
+        if postings is None:
+            postings = {}
+            for row, payload in enumerate(self._payloads):
+                for value in _payload_values(payload or {}, key):
+                    try:
+                        postings.setdefault(value, []).append(row)
+                    except TypeError:
+                        pass  # unhashable (nested) values never match a filter
+            self._postings[key] = postings
+        return postings
+
+    def _filter_mask(self, query_filter: Any) -> Any:
+        """Live rows that meet every ``must`` condition _search_filter builds."""
+        mask = self._live_mask().copy()
+        for condition in query_filter.must or []:
+            postings = self._key_postings(condition.key)
+            match = condition.match
+            wanted = match.any if hasattr(match, "any") else [match.value]
+            hit = np.zeros(len(self._ids), dtype=bool)
+            for value in wanted:
+                hit[postings.get(value, [])] = True
+            mask &= hit
+        return mask
+
+    # -- operations used by LocalVectorStore --
+
+    def upsert(self, points: list[Any]) -> None:
+        if not points:
+            return
+        dense = [
+            p.vector.get("") if isinstance(p.vector, dict) else p.vector for p in points
+        ]
+        block = np.asarray(dense, dtype=np.float32)
+        if VECTOR_DISTANCE == "Cosine":
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            block = block / np.where(norms == 0, 1.0, norms)
+        with self._lock:
+            if self.dim is None:
+                self.dim = block.shape[1]
+                self.sidecar_path.write_text(
+                    json.dumps({"dim": self.dim}) + "\n", encoding="utf-8"
+                )
+            elif block.shape[1] != self.dim:
+                raise ValueError(
+                    f"vector size {block.shape[1]} != index size {self.dim}"
+                )
+            with self.vectors_path.open("ab") as fh:
+                fh.write(block.tobytes())
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._append_records(
+                [
+                    {"op": "add", "id": str(p.id), "payload": dict(p.payload or {})}
+                    for p in points
+                ]
+            )
+
+    def overwrite_payloads(self, payloads: list[tuple[str, dict[str, Any]]]) -> None:
+        with self._lock:
+            self._append_records(
+                [
+                    {"op": "payload", "id": point_id, "payload": payload}
+                    for point_id, payload in payloads
+                    if point_id in self._rows
+                ]
+            )
+
+    def set_document_payload(self, document_id: str, update: dict[str, Any]) -> None:
+        with self._lock:
+            self.overwrite_payloads(
+                [
+                    (point_id, {**self._payloads[self._rows[point_id]], **update})
+                    for point_id in sorted(self._by_document.get(document_id, ()))
+                ]
+            )
+
+    def delete_points(self, point_ids: list[str]) -> None:
+        with self._lock:
+            self._append_records(
+                [
+                    {"op": "delete", "id": point_id}
+                    for point_id in point_ids
+                    if point_id in self._rows
+                ]
+            )
+
+    def document_payloads(self, document_id: str) -> dict[str, dict]:
+        with self._lock:
+            return {
+                point_id: dict(self._payloads[self._rows[point_id]])
+                for point_id in self._by_document.get(document_id, ())
+            }
+
+    def count(self, document_id: str | None = None) -> int:
+        if document_id is None:
+            return len(self._rows)
+        return len(self._by_document.get(document_id, ()))
+
+    def document_ids(self) -> set[str]:
+        with self._lock:
+            return set(self._by_document)
+
+    def search_groups(
+        self,
+        embedding: list[float],
+        query_filter: Any,
+        top_k: int,
+        with_vectors: bool = False,
+    ) -> list[Any]:
+        """Best-scoring point of each of the top_k documents, in score order."""
+        with self._lock:
+            matrix = self._load_matrix()
+            if matrix is None or top_k <= 0:
+                return []
+            if query_filter is None:
+                mask = self._live_mask()
+            else:
+                mask = self._filter_mask(query_filter)
+            candidates = np.flatnonzero(mask)
+            if not candidates.size:
+                return []
+            query = np.asarray(embedding, dtype=np.float32)
+            if VECTOR_DISTANCE == "Cosine":
+                norm = float(np.linalg.norm(query))
+                query = query / norm if norm else query
+            # Fancy-indexing the memmap would copy the candidate rows; score
+            # every row in place and keep the candidates' scores instead
+            scores = (matrix @ query)[candidates]
+            payloads = self._payloads
+            ids = self._ids
+
+        # Several chunks of one document can outrank the next document, so
+        # widen the partial sort until top_k distinct documents are found.
+        k = min(candidates.size, top_k * 4)
+        while True:
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            hits: dict[str, Any] = {}
+            for i in top:
+                row = int(candidates[i])
+                payload = payloads[row] or {}
+                document_id = payload.get("document_id") or ids[row]
+                if document_id not in hits:
+                    hits[document_id] = qmodels.ScoredPoint(
+                        id=ids[row],
+                        version=0,
+                        score=float(scores[i]),
+                        payload=payload,
+                        vector=matrix[row].tolist() if with_vectors else None,
+                    )
+                    if len(hits) == top_k:
+                        return list(hits.values())
+            if k == candidates.size:
+                return list(hits.values())
+            k = min(candidates.size, k * 4)
+
+
+class LocalVectorStore(QdrantVectorStore):
+    """QdrantVectorStore interface backed by an in-process MmapVectorIndex."""
+
+    backend = "local"
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path or LOCAL_VECTOR_PATH
+        super().__init__()
+        self._client: MmapVectorIndex | None = None  # type: ignore[assignment]
+        if not self.openai_key:
+            # Keep hashed vectors out of the shared embedding cache entries
+            self.embedding_model = f"feature-hash-{VECTOR_SIZE}"
+
+    def _missing_requirements(self) -> list[str]:
+        missing = []
+        if np is None:
+            missing.append("numpy")
+        if qmodels is None:
+            missing.append("qdrant-client")
+        return missing
+
+    def _ensure_client(self) -> None:
+        if not self.enabled:
+            return
+        if self._client is None:
+            self._client = MmapVectorIndex(self.path, self.collection)
+        if self._openai is None and self.openai_key and OpenAI is not None:
+            self._openai = OpenAI(**self._openai_kwargs())  # type: ignore[arg-type]
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        if self.openai_key and OpenAI is not None:
+            return super()._embed_batch(texts)
+        return [_hash_embedding(text, VECTOR_SIZE) for text in texts]
+
+    def compact(self) -> None:
+        self._ensure_client()
+        if self._client is not None:
+            self._client.compact()
+
+    def _hybrid_enabled(self) -> bool:
+        # The index holds dense vectors only
+        return False
+
+    # -- index operations in place of the Qdrant SDK calls --
+
+    def _qdrant_upsert(self, points: list[Any], wait: bool = True) -> None:
+        # Index writes are synchronous; ``wait`` only matters for Qdrant
+        self._client.upsert(points)
+
+    def _qdrant_search_groups(
+        self,
+        embedding: list[float],
+        query: str,
+        query_filter: Any,
+        top_k: int,
+        with_vectors: bool = False,
+    ) -> list[Any]:
+        return self._client.search_groups(
+            embedding, query_filter, top_k, with_vectors=with_vectors
+        )
+
+    def _qdrant_count(self) -> int:
+        return self._client.count()
+
+    def _qdrant_count_by_doc(self, document_id: str) -> int:
+        return self._client.count(document_id)
+
+    def _qdrant_delete(self, document_id: str) -> None:
+        self._client.delete_points(list(self._client.document_payloads(document_id)))
+
+    def _qdrant_delete_points(self, point_ids: list[str]) -> None:
+        self._client.delete_points(point_ids)
+
+    def _qdrant_overwrite_payloads(
+        self, payloads: list[tuple[str, dict[str, Any]]]
+    ) -> None:
+        self._client.overwrite_payloads(payloads)
+
+    def _qdrant_get_document_payloads(self, document_id: str) -> dict[str, dict]:
+        return self._client.document_payloads(document_id)
+
+    def _qdrant_set_payload(
+        self, document_id: str, payload_update: dict[str, Any]
+    ) -> None:
+        self._client.set_document_payload(document_id, payload_update)
+
+    def list_document_ids(self) -> set[str]:
+        if not self.enabled:
+            return set()
+        self._ensure_client()
+        return self._client.document_ids()
+
+    def iter_document_ids(
+        self, page_size: int | None = None, segments: int | None = None
+    ) -> Iterator[str]:
+        # The index keeps a per-document map; there is nothing to scroll
+        yield from self.list_document_ids()
+
+
+class AsyncLocalVectorStore:
+    """Async facade over the shared LocalVectorStore for the async routes.
+
+    Index calls are CPU-bound and short, so they run in a worker thread.
+    Embedding usage is counted on the wrapped store.
+    """
+
+    backend = "local"
+    embed_calls = 0
+    embed_tokens = 0
+
+    def __init__(self, store: LocalVectorStore) -> None:
+        self._store = store
+        self.enabled = store.enabled
+        self.collection = store.collection
+
+    async def upsert_document(self, **kwargs: Any) -> VectorSyncResult:
+        return await asyncio.to_thread(lambda: self._store.upsert_document(**kwargs))
+
+    async def search(self, **kwargs: Any) -> list[dict[str, Any]]:
+        return await asyncio.to_thread(lambda: self._store.search(**kwargs))
+
+    async def count(self) -> int:
+        return await asyncio.to_thread(self._store.count)
+
+    async def delete_document(self, document_id: str) -> VectorSyncResult:
+        return await asyncio.to_thread(self._store.delete_document, document_id)
+
+    async def update_metadata(
+        self, document_id: str, parent_id: str | None = None
+    ) -> VectorSyncResult:
+        return await asyncio.to_thread(
+            self._store.update_metadata, document_id, parent_id
+        )
+
+    async def count_by_document_id(self, document_id: str) -> int:
+        return await asyncio.to_thread(self._store.count_by_document_id, document_id)
+
+    async def list_document_ids(self) -> set[str]:
+        return await asyncio.to_thread(self._store.list_document_ids)
+
+    async def iter_document_ids(
+        self, page_size: int | None = None, segments: int | None = None
+    ) -> AsyncIterator[str]:
+        for document_id in await self.list_document_ids():
+            yield document_id
@@ -9,17 +9,44 @@ flat document model. Each "collection" is a separate table.
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
-from contextlib import contextmanager
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from itertools import islice
 from typing import Any
 
 import psycopg2
 import psycopg2.extras
 import psycopg2.pool
+from prometheus_client import Gauge, Histogram
+
+try:  # pragma: no cover - optional dependency import guard
+    from psycopg.rows import dict_row  # type: ignore
+    from psycopg.types.json import Jsonb  # type: ignore
+    from psycopg_pool import AsyncConnectionPool  # type: ignore
+except Exception:  # pragma: no cover
+    AsyncConnectionPool = None  # type: ignore
+    Jsonb = None  # type: ignore
+    dict_row = None  # type: ignore
 
 logger = logging.getLogger(__name__)
 
+# Async pool (psycopg 3) used by the async API routes
+PG_ASYNC_POOL_MIN = int(os.getenv("PG_ASYNC_POOL_MIN", "2"))
+PG_ASYNC_POOL_MAX = int(os.getenv("PG_ASYNC_POOL_MAX", "10"))
+# Seconds a request waits for a free connection before failing
+PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "30"))
+# Rows fetched per round trip by the server-side cursor behind stream_docs
+PG_STREAM_ITERSIZE = int(os.getenv("PG_STREAM_ITERSIZE", "500"))
+# Filter and full-text search on the promoted kb_documents columns instead
+# of the JSONB. Turn on once scripts.backfill_kb_columns has filled rows
+# written before them.
+PG_HOT_COLUMNS = os.getenv("PG_HOT_COLUMNS") == "1"
+
 # ---------------------------------------------------------------------------
 # Connection pool (module-level singleton)
 # ---------------------------------------------------------------------------
@@ -61,6 +88,83 @@ def close_pool() -> None:
         logger.info("PostgreSQL pool closed")
 
 
+# ---------------------------------------------------------------------------
+# Async connection pool (psycopg 3)
+#
+# The a-prefixed functions below mirror the sync API for async routes. Until
+# init_async_pool() has run (or without psycopg 3 installed) they run the
+# sync function in a worker thread, so the event loop never blocks on I/O.
+# ---------------------------------------------------------------------------
+_async_pool: Any = None
+
+
+def _pool_stat(name: str) -> float:
+    if _async_pool is None:
+        return 0
+    return _async_pool.get_stats().get(name, 0)
+
+
+POOL_SIZE = Gauge("agent_pg_pool_size", "Open connections in the async PG pool")
+POOL_SIZE.set_function(lambda: _pool_stat("pool_size"))
+POOL_AVAILABLE = Gauge(
+    "agent_pg_pool_available", "Idle connections in the async PG pool"
+)
+POOL_AVAILABLE.set_function(lambda: _pool_stat("pool_available"))
+POOL_MAX = Gauge("agent_pg_pool_max_size", "Maximum size of the async PG pool")
+POOL_MAX.set_function(lambda: _pool_stat("pool_max"))
+POOL_WAITING = Gauge(
+    "agent_pg_pool_requests_waiting", "Requests queued for an async PG connection"
+)
+POOL_WAITING.set_function(lambda: _pool_stat("requests_waiting"))
+POOL_WAIT = Histogram(
+    "agent_pg_pool_wait_seconds",
+    "Time to acquire a connection from the async PG pool (seconds)",
+)
+
+
+async def init_async_pool(
+    dsn: str | None = None,
+    min_size: int = PG_ASYNC_POOL_MIN,
+    max_size: int = PG_ASYNC_POOL_MAX,
+) -> bool:
+    """Open the async pool. Returns False when psycopg 3 is unavailable."""
+    global _async_pool
+    if _async_pool is not None:
+        return True
+    if AsyncConnectionPool is None:
+        logger.info("psycopg 3 not installed; async PG calls use worker threads")
+        return False
+    pool = AsyncConnectionPool(
+        dsn or _dsn(),
+        min_size=min_size,
+        max_size=max_size,
+        timeout=PG_POOL_TIMEOUT,
+        kwargs={"autocommit": True},
+        open=False,
+    )
+    await pool.open()
+    _async_pool = pool
+    logger.info("PostgreSQL async pool opened (min=%d, max=%d)", min_size, max_size)
+    return True
+
+
+async def close_async_pool() -> None:
+    """Close the async pool; later calls fall back to worker threads."""
+    global _async_pool
+    if _async_pool is not None:
+        pool, _async_pool = _async_pool, None
+        await pool.close()
+        logger.info("PostgreSQL async pool closed")
+
+
+@asynccontextmanager
+async def _aconn() -> AsyncIterator[Any]:
+    t0 = time.perf_counter()
+    async with _async_pool.connection() as conn:
+        POOL_WAIT.observe(time.perf_counter() - t0)
+        yield conn
+
+
 @contextmanager
 def _conn():
     """Get a connection from the pool with auto-commit."""
@@ -77,12 +181,158 @@ def _conn():
 # ---------------------------------------------------------------------------
 # Schema management
 # ---------------------------------------------------------------------------
+
+# Full-text search: kb_search is the simple parser with unaccent in front,
+# so Vietnamese (and any accented) text matches with or without diacritics.
+# Titles weigh A, bodies B; bodies are capped below the 1 MB tsvector limit.
+KB_SEARCH_CONFIG = "kb_search"
+_KB_SEARCH_MAX_CHARS = 262144
+_KB_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{KB_SEARCH_CONFIG}'::regconfig,"
+    " coalesce({d}#>>'{{metadata,title}}', '')), 'A')"
+    f" || setweight(to_tsvector('{KB_SEARCH_CONFIG}'::regconfig,"
+    " left(coalesce({d}#>>'{{content,body}}', ''),"
+    f" {_KB_SEARCH_MAX_CHARS})), 'B')"
+)
+
+# search_vector is only complete once the backfill has built its index;
+# until then search_docs computes the vector per row and looks again later
+_KB_SEARCH_INDEX = "idx_kb_documents_search"
+_KB_SEARCH_RECHECK_SECONDS = 60.0
+_kb_search_indexed = False
+_kb_search_checked_at = float("-inf")
+
+# Hot kb_documents fields promoted from the JSONB to real columns:
+# name -> (SQL type, expression over the document JSONB ``{d}``).
+# set_doc/update_doc write them with every change to ``data``.
+KB_COLUMNS: dict[str, tuple[str, str]] = {
+    "document_id": ("TEXT", "{d}->>'document_id'"),
+    "parent_id": ("TEXT", "{d}->>'parent_id'"),
+    "deleted_at": ("TIMESTAMPTZ", "kb_timestamptz({d}->>'deleted_at')"),
+    "revision": (
+        "BIGINT",
+        "CASE WHEN jsonb_typeof({d}->'revision') = 'number'"
+        " THEN ({d}->>'revision')::numeric::bigint END",
+    ),
+    "updated_at": ("TIMESTAMPTZ", "kb_timestamptz({d}->>'updated_at')"),
+    "vector_status": ("TEXT", "{d}->>'vector_status'"),
+    "tags": (
+        "TEXT[]",
+        "CASE WHEN jsonb_typeof({d}#>'{{metadata,tags}}') = 'array'"
+        " THEN ARRAY(SELECT jsonb_array_elements_text({d}#>'{{metadata,tags}}'))"
+        " END",
+    ),
+    "title": ("TEXT", "{d}#>>'{{metadata,title}}'"),
+    "search_vector": ("TSVECTOR", _KB_SEARCH_VECTOR),
+}
+
+# Built CONCURRENTLY by build_kb_column_indexes (scripts.backfill_kb_columns)
+KB_COLUMN_INDEXES: dict[str, str] = {
+    "idx_kb_documents_live_document_id": "(document_id) WHERE deleted_at IS NULL",
+    "idx_kb_documents_live_parent": (
+        "(parent_id, document_id) WHERE deleted_at IS NULL"
+    ),
+    "idx_kb_documents_live_vector_status": ("(vector_status) WHERE deleted_at IS NULL"),
+    "idx_kb_documents_live_updated_at": "(updated_at) WHERE deleted_at IS NULL",
+    "idx_kb_documents_revision": "(revision)",
+    "idx_kb_documents_deleted_at": "(deleted_at) WHERE deleted_at IS NOT NULL",
+    "idx_kb_documents_tags": "USING GIN (tags)",
+    _KB_SEARCH_INDEX: "USING GIN (search_vector)",
+}
+
+# Timestamps in the JSONB are ISO strings; a value that does not parse
+# still has to read as "set", so deleted documents stay deleted.
+_KB_TIMESTAMPTZ_FN = """
+    CREATE OR REPLACE FUNCTION kb_timestamptz(value TEXT) RETURNS TIMESTAMPTZ
+    LANGUAGE plpgsql STABLE STRICT AS $$
+    BEGIN
+        RETURN value::timestamptz;
+    EXCEPTION WHEN others THEN
+        RETURN '-infinity';
+    END $$;
+"""
+
+
+def _kb_column_values(d: str) -> str:
+    """Comma-separated KB_COLUMNS expressions over the JSONB ``d``."""
+    return ", ".join(expr.format(d=d) for _, expr in KB_COLUMNS.values())
+
+
+def _kb_column_assignments(d: str) -> str:
+    """``column = expression`` list that syncs KB_COLUMNS from ``d``."""
+    return ", ".join(
+        f"{name} = {expr.format(d=d)}" for name, (_, expr) in KB_COLUMNS.items()
+    )
+
+
+def _ensure_kb_columns(cur: Any) -> None:
+    """Add missing KB_COLUMNS; existing tables only take a brief lock."""
+    cur.execute(_KB_TIMESTAMPTZ_FN)
+    cur.execute(
+        "SELECT column_name FROM information_schema.columns"
+        " WHERE table_schema = current_schema() AND table_name = 'kb_documents'"
+    )
+    existing = {row[0] for row in cur.fetchall()}
+    missing = [name for name in KB_COLUMNS if name not in existing]
+    if missing:
+        # Nullable, no default: a catalog change, not a table rewrite
+        cur.execute(
+            "ALTER TABLE kb_documents "
+            + ", ".join(
+                f"ADD COLUMN IF NOT EXISTS {name} {KB_COLUMNS[name][0]}"
+                for name in missing
+            )
+        )
+        logger.info("kb_documents columns added: %s", ", ".join(missing))
+
+
+def _ensure_kb_search(cur: Any) -> None:
+    """Create the kb_search config; map unaccent into it once installed.
+
+    search_vector itself is a KB_COLUMNS column, so it is added without a
+    table rewrite and filled by scripts.backfill_kb_columns.
+    """
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    except psycopg2.Error as exc:
+        logger.error(
+            "unaccent unavailable, search will not match across diacritics"
+            " until it is installed and the service restarted: %s",
+            exc,
+        )
+    # Replicas starting together may race to create it; losing is fine
+    cur.execute(f"""
+        DO $$ BEGIN
+            CREATE TEXT SEARCH CONFIGURATION {KB_SEARCH_CONFIG} (COPY = simple);
+        EXCEPTION WHEN duplicate_object OR unique_violation THEN NULL;
+        END $$;
+    """)
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'unaccent'),"
+        " EXISTS (SELECT 1 FROM pg_ts_config_map m"
+        " JOIN pg_ts_config c ON c.oid = m.mapcfg"
+        " JOIN pg_ts_dict t ON t.oid = m.mapdict"
+        " WHERE c.cfgname = %s AND t.dictname = 'unaccent')",
+        (KB_SEARCH_CONFIG,),
+    )
+    installed, mapped = cur.fetchone()
+    if installed and not mapped:
+        cur.execute(
+            f"ALTER TEXT SEARCH CONFIGURATION {KB_SEARCH_CONFIG}"
+            " ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple"
+        )
+        logger.warning(
+            "%s now strips diacritics; run scripts.backfill_kb_columns to"
+            " refresh search_vector for existing documents",
+            KB_SEARCH_CONFIG,
+        )
+
+
 def ensure_tables() -> None:
     """Create tables if they don't exist."""
     with _conn() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
+            cur.execute("""
                 CREATE TABLE IF NOT EXISTS kb_documents (
                     key TEXT PRIMARY KEY,
                     data JSONB NOT NULL DEFAULT '{}'::jsonb
@@ -106,11 +356,111 @@ def ensure_tables() -> None:
                 );
                 CREATE INDEX IF NOT EXISTS idx_chat_messages_session
                     ON chat_messages (session_id, ts);
-            """
-            )
+
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    embedding REAL[] NOT NULL,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    PRIMARY KEY (model, content_hash)
+                );
+
+                CREATE TABLE IF NOT EXISTS kb_chunks (
+                    point_id TEXT PRIMARY KEY,
+                    document_id TEXT NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    char_start INTEGER NOT NULL,
+                    char_end INTEGER NOT NULL,
+                    content TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_kb_chunks_document
+                    ON kb_chunks (document_id);
+            """)
+            # KB writes compute search_vector, so the config comes first
+            _ensure_kb_search(cur)
+            _ensure_kb_columns(cur)
     logger.info("PostgreSQL tables ensured")
 
 
+def backfill_kb_columns(after: str, limit: int) -> tuple[str | None, int, int]:
+    """Sync KB_COLUMNS for the ``limit`` rows keyed after ``after``.
+
+    Rows already in sync are not rewritten. Returns the last key seen
+    (None once the table is exhausted), rows scanned and rows updated.
+    """
+    columns = ", ".join(KB_COLUMNS)
+    with _conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""WITH batch AS (
+                        SELECT key FROM kb_documents
+                        WHERE key > %s ORDER BY key LIMIT %s
+                    ), updated AS (
+                        UPDATE kb_documents AS t
+                        SET {_kb_column_assignments("t.data")}
+                        FROM batch
+                        WHERE t.key = batch.key
+                          AND ({columns}) IS DISTINCT FROM
+                              ({_kb_column_values("t.data")})
+                        RETURNING 1
+                    )
+                    SELECT (SELECT max(key) FROM batch),
+                           (SELECT count(*) FROM batch),
+                           (SELECT count(*) FROM updated)""",
+                (after, limit),
+            )
+            last, scanned, updated = cur.fetchone()
+            return last, scanned, updated
+
+
+def _index_valid(cur: Any, name: str) -> bool | None:
+    """Whether index ``name`` is valid; None if it does not exist."""
+    cur.execute(
+        "SELECT i.indisvalid FROM pg_class c"
+        " JOIN pg_index i ON i.indexrelid = c.oid"
+        " WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+        (name,),
+    )
+    row = cur.fetchone()
+    return bool(row[0]) if row else None
+
+
+def _kb_search_index_ready(cur: Any) -> bool:
+    """True once search_vector's GIN index is valid; rechecked at most once a minute."""
+    global _kb_search_indexed, _kb_search_checked_at
+    now = time.monotonic()
+    if _kb_search_indexed or now - _kb_search_checked_at < _KB_SEARCH_RECHECK_SECONDS:
+        return _kb_search_indexed
+    _kb_search_checked_at = now
+    _kb_search_indexed = bool(_index_valid(cur, _KB_SEARCH_INDEX))
+    if _kb_search_indexed:
+        logger.info("Full-text search now uses %s", _KB_SEARCH_INDEX)
+    return _kb_search_indexed
+
+
+def build_kb_column_indexes() -> list[str]:
+    """Create KB_COLUMN_INDEXES without blocking writes; returns those built.
+
+    An index left invalid by an interrupted concurrent build is dropped
+    and built again.
+    """
+    built: list[str] = []
+    with _conn() as conn:
+        with conn.cursor() as cur:
+            for name, definition in KB_COLUMN_INDEXES.items():
+                valid = _index_valid(cur, name)
+                if valid:
+                    continue
+                if valid is not None:
+                    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                cur.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}"
+                    f" ON kb_documents {definition}"
+                )
+                built.append(name)
+    return built
+
+
 # ---------------------------------------------------------------------------
 # Generic document operations (collection = table name)
 # ---------------------------------------------------------------------------
@@ -141,17 +491,49 @@ def get_doc(collection: str, key: str) -> dict[str, Any] | None:
             return dict(row["data"]) if row else None
 
 
+def get_docs(collection: str, keys: Sequence[str]) -> list[dict[str, Any] | None]:
+    """Get many documents in one query, in ``keys`` order; None marks a miss."""
+    keys = list(keys)
+    if not keys:
+        return []
+    tbl = _table(collection)
+    with _conn() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                f"SELECT key, data FROM {tbl} WHERE key = ANY(%s)", (list(set(keys)),)
+            )
+            found = {row["key"]: row["data"] for row in cur.fetchall()}
+    return [dict(found[key]) if key in found else None for key in keys]
+
+
+def _upsert_sql(tbl: str) -> str:
+    """INSERT ... ON CONFLICT for set_doc; kb_documents also syncs KB_COLUMNS."""
+    if tbl != "kb_documents":
+        return f"""INSERT INTO {tbl} (key, data) VALUES (%(key)s, %(data)s)
+                    ON CONFLICT (key) DO UPDATE SET data = EXCLUDED.data"""
+    excluded = ", ".join(f"{name} = EXCLUDED.{name}" for name in KB_COLUMNS)
+    return f"""INSERT INTO {tbl} (key, data, {", ".join(KB_COLUMNS)})
+                SELECT %(key)s, src.d, {_kb_column_values("src.d")}
+                FROM (SELECT %(data)s::jsonb AS d) AS src
+                ON CONFLICT (key) DO UPDATE SET data = EXCLUDED.data, {excluded}"""
+
+
+def _update_sql(tbl: str) -> str:
+    """Merge UPDATE for update_doc; kb_documents also syncs KB_COLUMNS."""
+    sync = ""
+    if tbl == "kb_documents":
+        # Evaluated against the pre-update row, so repeat the merge
+        sync = ", " + _kb_column_assignments("(data || %(updates)s::jsonb)")
+    return f"UPDATE {tbl} SET data = data || %(updates)s{sync} WHERE key = %(key)s"
+
+
 def set_doc(collection: str, key: str, data: dict[str, Any]) -> None:
     """Create or replace a document (upsert)."""
     tbl = _table(collection)
     json_data = psycopg2.extras.Json(data)
     with _conn() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                f"""INSERT INTO {tbl} (key, data) VALUES (%s, %s)
-                    ON CONFLICT (key) DO UPDATE SET data = EXCLUDED.data""",
-                (key, json_data),
-            )
+            cur.execute(_upsert_sql(tbl), {"key": key, "data": json_data})
 
 
 def update_doc(collection: str, key: str, updates: dict[str, Any]) -> bool:
@@ -160,20 +542,148 @@ def update_doc(collection: str, key: str, updates: dict[str, Any]) -> bool:
     json_updates = psycopg2.extras.Json(updates)
     with _conn() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                f"""UPDATE {tbl} SET data = data || %s WHERE key = %s""",
-                (json_updates, key),
-            )
+            cur.execute(_update_sql(tbl), {"updates": json_updates, "key": key})
             return cur.rowcount > 0
 
 
-def stream_docs(collection: str) -> list[dict[str, Any]]:
-    """Stream all documents in a collection. Returns list of data dicts."""
+def _stream_query(
+    tbl: str, fields: Sequence[str] | None, live_only: bool
+) -> tuple[str, tuple[Any, ...]]:
+    """SQL and params for stream_docs: optional projection and live filter."""
+    if fields is None:
+        select, params = "SELECT key, data", ()
+    else:
+        # Keep only the requested keys; keys a document lacks stay missing
+        select = (
+            "SELECT key, (SELECT jsonb_object_agg(k, v) FROM jsonb_each(data)"
+            " AS e(k, v) WHERE k = ANY(%s)) AS data"
+        )
+        params = (list(fields),)
+    return f"{select} FROM {tbl}{_live_where(tbl, live_only)}", params
+
+
+def _live_where(tbl: str, live_only: bool) -> str:
+    """WHERE clause skipping soft-deleted documents, or "" for every row."""
+    if not live_only:
+        return ""
+    hot_columns = PG_HOT_COLUMNS and tbl == "kb_documents"
+    deleted = "deleted_at" if hot_columns else "data->>'deleted_at'"
+    return f" WHERE {deleted} IS NULL"
+
+
+def stream_docs(
+    collection: str,
+    *,
+    fields: Sequence[str] | None = None,
+    live_only: bool = False,
+    itersize: int = PG_STREAM_ITERSIZE,
+) -> Iterator[dict[str, Any]]:
+    """Yield every document in a collection as a data dict with ``_key``.
+
+    Rows come from a named (server-side) cursor ``itersize`` at a time, so
+    memory does not grow with the collection. ``fields`` limits each dict
+    to those top-level keys; ``live_only`` skips soft-deleted documents in
+    SQL. The connection is held until the generator is exhausted or closed.
+    """
+    tbl = _table(collection)
+    sql, params = _stream_query(tbl, fields, live_only)
+    with _conn() as conn:
+        # Named cursors only live inside a transaction
+        conn.autocommit = False
+        try:
+            with conn.cursor(
+                name=f"stream_{tbl}", cursor_factory=psycopg2.extras.RealDictCursor
+            ) as cur:
+                cur.itersize = max(1, itersize)
+                cur.execute(sql, params)
+                for row in cur:
+                    yield {"_key": row["key"], **(row["data"] or {})}
+        finally:
+            conn.rollback()
+
+
+def count_docs(collection: str, *, live_only: bool = False) -> int:
+    """Number of documents in a collection; ``live_only`` as in stream_docs."""
+    tbl = _table(collection)
+    with _conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT count(*) FROM {tbl}{_live_where(tbl, live_only)}")
+            return cur.fetchone()[0]
+
+
+def doc_ids_updated_since(collection: str, since: datetime) -> list[str]:
+    """IDs of KB documents, deleted ones included, updated at or after ``since``."""
     tbl = _table(collection)
+    if tbl != "kb_documents":
+        raise ValueError(f"Update times not tracked for: {collection}")
+    updated = "updated_at" if PG_HOT_COLUMNS else "kb_timestamptz(data->>'updated_at')"
     with _conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT coalesce(data->>'document_id', key) FROM {tbl}"
+                f" WHERE {updated} >= %s",
+                (since,),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+
+def search_docs(
+    collection: str,
+    words: Sequence[str],
+    *,
+    tags: Sequence[str] | None = None,
+    tenant_id: str | None = None,
+    status: str | None = None,
+    limit: int = 10,
+) -> list[tuple[dict[str, Any], float]]:
+    """Full-text search over live documents; (data with ``_key``, rank) pairs.
+
+    A document matches if it contains any of ``words``; ``ts_rank`` orders
+    by how many match and where (title above body), scaled to 0..1. Tag
+    (any of), tenant and status filters are applied in the same query.
+    The indexed search_vector column is used once the backfill has built
+    its index, whatever PG_HOT_COLUMNS says.
+    """
+    tbl = _table(collection)
+    if tbl != "kb_documents":
+        raise ValueError(f"Full-text search not available for: {collection}")
+    if not words or limit <= 0:
+        return []
+    hot_columns = PG_HOT_COLUMNS
+    where = ["deleted_at IS NULL" if hot_columns else "data->>'deleted_at' IS NULL"]
+    params: dict[str, Any] = {
+        "query": " or ".join(words),
+        "limit": limit,
+    }
+    if tags:
+        where.append(
+            "tags && %(tags)s" if hot_columns else "data#>'{metadata,tags}' ?| %(tags)s"
+        )
+        params["tags"] = list(tags)
+    if tenant_id:
+        where.append("data#>>'{metadata,tenant_id}' = %(tenant_id)s")
+        params["tenant_id"] = tenant_id
+    if status:
+        where.append("data#>>'{metadata,status}' = %(status)s")
+        params["status"] = status
+    with _conn() as conn:
+        with conn.cursor() as cur:
+            ready = _kb_search_index_ready(cur)
+        vector = "search_vector" if ready else _KB_SEARCH_VECTOR.format(d="data")
+        where.insert(0, f"{vector} @@ q")
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(f"SELECT key, data FROM {tbl}")
-            return [{"_key": row["key"], **dict(row["data"])} for row in cur.fetchall()]
+            cur.execute(
+                f"""SELECT key, data, ts_rank({vector}, q, 32) AS rank
+                    FROM {tbl},
+                         websearch_to_tsquery('{KB_SEARCH_CONFIG}', %(query)s) AS q
+                    WHERE {" AND ".join(where)}
+                    ORDER BY rank DESC LIMIT %(limit)s""",
+                params,
+            )
+            return [
+                ({"_key": row["key"], **row["data"]}, float(row["rank"]))
+                for row in cur.fetchall()
+            ]
 
 
 # ---------------------------------------------------------------------------
@@ -210,6 +720,223 @@ def clear_chat_messages(session_id: str) -> None:
             )
 
 
+# ---------------------------------------------------------------------------
+# Async document and chat operations (see "Async connection pool" above)
+# ---------------------------------------------------------------------------
+async def aget_doc(collection: str, key: str) -> dict[str, Any] | None:
+    """Async get_doc."""
+    if _async_pool is None:
+        return await asyncio.to_thread(get_doc, collection, key)
+    tbl = _table(collection)
+    async with _aconn() as conn:
+        cur = await conn.execute(f"SELECT data FROM {tbl} WHERE key = %s", (key,))
+        row = await cur.fetchone()
+        return dict(row[0]) if row else None
+
+
+async def aget_docs(
+    collection: str, keys: Sequence[str]
+) -> list[dict[str, Any] | None]:
+    """Async get_docs."""
+    if _async_pool is None:
+        return await asyncio.to_thread(get_docs, collection, keys)
+    keys = list(keys)
+    if not keys:
+        return []
+    tbl = _table(collection)
+    async with _aconn() as conn:
+        cur = await conn.execute(
+            f"SELECT key, data FROM {tbl} WHERE key = ANY(%s)", (list(set(keys)),)
+        )
+        found = dict(await cur.fetchall())
+    return [dict(found[key]) if key in found else None for key in keys]
+
+
+async def aset_doc(collection: str, key: str, data: dict[str, Any]) -> None:
+    """Async set_doc."""
+    if _async_pool is None:
+        return await asyncio.to_thread(set_doc, collection, key, data)
+    tbl = _table(collection)
+    async with _aconn() as conn:
+        await conn.execute(_upsert_sql(tbl), {"key": key, "data": Jsonb(data)})
+
+
+async def aupdate_doc(collection: str, key: str, updates: dict[str, Any]) -> bool:
+    """Async update_doc."""
+    if _async_pool is None:
+        return await asyncio.to_thread(update_doc, collection, key, updates)
+    tbl = _table(collection)
+    async with _aconn() as conn:
+        cur = await conn.execute(
+            _update_sql(tbl), {"updates": Jsonb(updates), "key": key}
+        )
+        return cur.rowcount > 0
+
+
+async def astream_docs(
+    collection: str,
+    *,
+    fields: Sequence[str] | None = None,
+    live_only: bool = False,
+    itersize: int = PG_STREAM_ITERSIZE,
+) -> AsyncIterator[dict[str, Any]]:
+    """Async stream_docs; without the pool, batches are read in a thread."""
+    if _async_pool is None:
+        rows = iter(
+            stream_docs(
+                collection, fields=fields, live_only=live_only, itersize=itersize
+            )
+        )
+        try:
+            while chunk := await asyncio.to_thread(
+                list, islice(rows, max(1, itersize))
+            ):
+                for row in chunk:
+                    yield row
+        finally:
+            close = getattr(rows, "close", None)
+            if close is not None:
+                await asyncio.to_thread(close)
+        return
+    tbl = _table(collection)
+    sql, params = _stream_query(tbl, fields, live_only)
+    async with _aconn() as conn:
+        async with conn.transaction():
+            async with conn.cursor(name=f"stream_{tbl}") as cur:
+                cur.itersize = max(1, itersize)
+                await cur.execute(sql, params)
+                async for key, data in cur:
+                    yield {"_key": key, **(data or {})}
+
+
+async def aadd_chat_message(session_id: str, role: str, content: str) -> None:
+    """Async add_chat_message."""
+    if _async_pool is None:
+        return await asyncio.to_thread(add_chat_message, session_id, role, content)
+    async with _aconn() as conn:
+        await conn.execute(
+            "INSERT INTO chat_messages (session_id, role, content) VALUES (%s, %s, %s)",
+            (session_id, role, content),
+        )
+
+
+async def aget_chat_messages(session_id: str) -> list[dict[str, Any]]:
+    """Async get_chat_messages."""
+    if _async_pool is None:
+        return await asyncio.to_thread(get_chat_messages, session_id)
+    async with _aconn() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                "SELECT role, content, ts FROM chat_messages WHERE session_id = %s ORDER BY ts",
+                (session_id,),
+            )
+            return list(await cur.fetchall())
+
+
+async def aclear_chat_messages(session_id: str) -> None:
+    """Async clear_chat_messages."""
+    if _async_pool is None:
+        return await asyncio.to_thread(clear_chat_messages, session_id)
+    async with _aconn() as conn:
+        await conn.execute(
+            "DELETE FROM chat_messages WHERE session_id = %s", (session_id,)
+        )
+
+
+# ---------------------------------------------------------------------------
+# Embedding cache (content-addressed: model + sha256 of embedded text)
+# ---------------------------------------------------------------------------
+def get_embeddings(model: str, content_hashes: list[str]) -> dict[str, list[float]]:
+    """Fetch cached embeddings for the given hashes. Misses are omitted."""
+    if not content_hashes:
+        return {}
+    with _conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """SELECT content_hash, embedding FROM embedding_cache
+                   WHERE model = %s AND content_hash = ANY(%s)""",
+                (model, list(content_hashes)),
+            )
+            return {row[0]: list(row[1]) for row in cur.fetchall()}
+
+
+def put_embeddings(model: str, embeddings: dict[str, list[float]]) -> None:
+    """Store embeddings keyed by content hash. Existing entries are kept."""
+    if not embeddings:
+        return
+    with _conn() as conn:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                """INSERT INTO embedding_cache (model, content_hash, embedding)
+                   VALUES %s ON CONFLICT (model, content_hash) DO NOTHING""",
+                [(model, h, vec) for h, vec in embeddings.items()],
+            )
+
+
+# ---------------------------------------------------------------------------
+# Chunk texts (QDRANT_CHUNK_TEXT_STORE=pg: kept here instead of the payload)
+# ---------------------------------------------------------------------------
+def put_chunks(rows: list[tuple[str, str, int, int, int, str]]) -> None:
+    """Upsert (point_id, document_id, chunk_index, char_start, char_end, content).
+
+    Rows whose values did not change are left untouched.
+    """
+    if not rows:
+        return
+    with _conn() as conn:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                """INSERT INTO kb_chunks
+                       (point_id, document_id, chunk_index, char_start, char_end,
+                        content)
+                   VALUES %s
+                   ON CONFLICT (point_id) DO UPDATE SET
+                       document_id = EXCLUDED.document_id,
+                       chunk_index = EXCLUDED.chunk_index,
+                       char_start = EXCLUDED.char_start,
+                       char_end = EXCLUDED.char_end,
+                       content = EXCLUDED.content
+                   WHERE (kb_chunks.char_start, kb_chunks.char_end,
+                          kb_chunks.content)
+                       IS DISTINCT FROM
+                         (EXCLUDED.char_start, EXCLUDED.char_end, EXCLUDED.content)""",
+                rows,
+            )
+
+
+def get_chunk_texts(point_ids: list[str]) -> dict[str, str]:
+    """Chunk text per point id, in one query. Unknown ids are omitted."""
+    if not point_ids:
+        return {}
+    with _conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT point_id, content FROM kb_chunks WHERE point_id = ANY(%s)",
+                (list(point_ids),),
+            )
+            return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def delete_chunks(point_ids: list[str]) -> None:
+    """Delete chunk rows by point id."""
+    if not point_ids:
+        return
+    with _conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM kb_chunks WHERE point_id = ANY(%s)", (list(point_ids),)
+            )
+
+
+def delete_document_chunks(document_id: str) -> None:
+    """Delete every chunk row of a document."""
+    with _conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM kb_chunks WHERE document_id = %s", (document_id,))
+
+
 # ---------------------------------------------------------------------------
 # Health probe
 # ---------------------------------------------------------------------------
@@ -253,7 +253,7 @@ class ResilientCaller:
 
 
 # ---------------------------------------------------------------------------
-# sync_retry — decorator factory for synchronous SDK calls
+# sync_retry / async_retry — decorator factories for SDK calls
 # ---------------------------------------------------------------------------
 def sync_retry(
     max_retries: int = DEFAULT_MAX_RETRIES,
@@ -289,6 +289,41 @@ def sync_retry(
     return decorator
 
 
+def async_retry(
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    service_name: str = "",
+) -> Callable:
+    """Decorator factory: async counterpart of ``sync_retry``.
+
+    Used for the async vector store (AsyncQdrantClient, AsyncOpenAI). Waits
+    between attempts with ``asyncio.sleep`` so the event loop keeps serving
+    other requests.
+    """
+    wait_strategy = (
+        wait_none()
+        if _TESTING
+        else wait_exponential(multiplier=1, min=DEFAULT_WAIT_MIN, max=DEFAULT_WAIT_MAX)
+    )
+
+    def decorator(func: Callable) -> Callable:
+        @retry(
+            stop=stop_after_attempt(max_retries),
+            wait=wait_strategy,
+            retry=retry_if_exception_type((ConnectionError, TimeoutError, OSError)),
+            before_sleep=before_sleep_log(logger, logging.WARNING),
+            reraise=True,
+        )
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await func(*args, **kwargs)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__qualname__ = func.__qualname__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    return decorator
+
+
 # ---------------------------------------------------------------------------
 # Dynamic service discovery — Phonebook Pattern
 # ---------------------------------------------------------------------------
@@ -381,6 +416,16 @@ async def probe_qdrant() -> bool:
         return False
 
 
+async def bootstrap_qdrant_collection() -> bool:
+    """Create the Qdrant collection and payload indexes if they are missing."""
+    from agent_data import vector_store as vs
+
+    report = await asyncio.to_thread(vs.ensure_collection)
+    if report["status"] == "drift":
+        logger.warning("Qdrant collection drift: %s", report["drift"])
+    return report["status"] in ("ok", "skipped")
+
+
 async def probe_postgres() -> bool:
     try:
         from agent_data import pg_store
@@ -446,10 +491,11 @@ async def resilient_lifespan(app: Any):  # noqa: ANN401
         probe_qdrant(),
         probe_postgres(),
         probe_openai(),
+        bootstrap_qdrant_collection(),
         return_exceptions=True,
     )
 
-    probe_names = ["qdrant", "postgres", "openai"]
+    probe_names = ["qdrant", "postgres", "openai", "qdrant_collection"]
     for name, result in zip(probe_names, results, strict=False):
         if isinstance(result, Exception):
             logger.warning("Probe %s raised: %s", name, result)
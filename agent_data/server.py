@@ -2,10 +2,12 @@
 Agent Data Langroid Server - FastAPI server for agent data operations
 """
 
+import asyncio
 import json
 import logging
 import os
 import re
+from contextlib import asynccontextmanager
 from datetime import UTC, datetime
 from hashlib import sha1
 from typing import Any, Literal
@@ -15,11 +17,11 @@ from fastapi import Depends, FastAPI, Header, HTTPException, Path, Query, Reques
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, RedirectResponse
 from prometheus_client import Counter, Histogram
-from pydantic import BaseModel, ConfigDict, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, model_validator
 from starlette.responses import Response
 from starlette_prometheus import PrometheusMiddleware, metrics
 
-from agent_data import pg_store, vector_store
+from agent_data import collection_reindex, context_packing, pg_store, vector_store
 from agent_data.docs_api import router as docs_router
 from agent_data.event_system import (
     DOCUMENT_CREATED,
@@ -37,17 +39,42 @@ from agent_data.session_readiness import (
     SessionReadinessGate,
     SessionReadinessResult,
 )
+from agent_data.vector_sync_queue import VECTOR_SYNC_MODE, vector_sync_queue
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """Startup probes, the async PG pool, then the vector sync workers."""
+    async with resilient_lifespan(app):
+        if getattr(agent, "db", None) is not None:
+            try:
+                await pg_store.init_async_pool()
+            except Exception as exc:
+                # Async routes keep working through the sync pool in threads
+                logger.warning("PostgreSQL async pool unavailable: %s", exc)
+        if VECTOR_SYNC_MODE == "background":
+            await vector_sync_queue.start(
+                _sync_vector_from_pg,
+                recover=_pending_vector_document_ids,
+                give_up=_mark_vector_sync_failed,
+            )
+        try:
+            yield
+        finally:
+            await vector_sync_queue.stop()
+            await pg_store.close_async_pool()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Agent Data Langroid",
     description="Multi-agent knowledge management system built with Langroid framework",
     version="0.1.0",
-    lifespan=resilient_lifespan,
+    lifespan=_lifespan,
 )
 
 # Prometheus metrics exporter via starlette-prometheus
@@ -102,6 +129,9 @@ class DataIntegrity(BaseModel):
     sync_status: str  # "ok" | "warning" | "critical"
     embed_calls: int | None = None
     embed_tokens: int | None = None
+    embed_cache_hits: int | None = None
+    embed_cache_misses: int | None = None
+    query_cache_hit_rate: float | None = None
 
 
 class HealthResponse(BaseModel):
@@ -111,6 +141,8 @@ class HealthResponse(BaseModel):
     services: dict[str, ServiceStatusDetail] | None = None
     service_count: int | None = None
     data_integrity: DataIntegrity | None = None
+    vector_collection: dict[str, Any] | None = None
+    vector_sync: dict[str, Any] | None = None
     event_system: dict[str, Any] | None = None
 
 
@@ -130,6 +162,8 @@ class QueryUsage(BaseModel):
 
     latency_ms: int = 0
     qdrant_hits: int = 0
+    prompt_tokens: int = 0
+    context_tokens: int = 0
 
 
 class QueryContextEntry(BaseModel):
@@ -140,6 +174,13 @@ class QueryContextEntry(BaseModel):
     score: float | None = None
     metadata: dict[str, Any] | None = None
 
+    # Full chunk text for prompt packing; the API only returns the snippet
+    _text: str | None = PrivateAttr(default=None)
+
+    @property
+    def prompt_text(self) -> str:
+        return self._text or self.snippet or ""
+
 
 class ChatResponse(BaseModel):
     """Unified response model for ingest/query actions.
@@ -242,6 +283,9 @@ class QueryRouting(BaseModel):
     allow_external_search: bool = False
     max_latency_ms: int = Field(default=4000, ge=1000, le=10000)
     noop_qdrant: bool = False
+    # MMR re-ranking of vector hits; mmr_lambda 1.0 = relevance only
+    diversify: bool = False
+    mmr_lambda: float | None = Field(default=None, ge=0.0, le=1.0)
 
     model_config = ConfigDict(extra="forbid")
 
@@ -527,7 +571,7 @@ def _ensure_session_ready_result(
     )
 
 
-def _sync_vector_entry(
+async def _sync_vector_entry(
     *,
     doc_key: str,
     document_id: str,
@@ -535,24 +579,42 @@ def _sync_vector_entry(
     metadata: dict[str, Any] | None,
     parent_id: str | None,
     is_human_readable: bool,
-) -> None:
-    """Best-effort synchronization of document vectors in Qdrant."""
+    revision: int | None = None,
+) -> vector_store.VectorSyncResult:
+    """Best-effort synchronization of document vectors in Qdrant.
+
+    The store diffs chunks against what is already indexed, so callers do
+    not delete first. Empty content has nothing to index: any existing
+    vectors are dropped and the document is marked ``skipped``.
+
+    With ``revision`` set, the resulting vector_status is only written if
+    the document is still at that revision; a newer write is left pending
+    for its own sync.
+    """
 
     if not isinstance(content, str) or not content.strip():
-        return
+        result = await _delete_vector_entry(document_id)
+        if result.status == "error":
+            return result
+        result = vector_store.VectorSyncResult(status="skipped")
+    else:
+        store = vector_store.get_async_vector_store()
+        result = await store.upsert_document(
+            document_id=document_id,
+            content=content,
+            metadata=metadata,
+            parent_id=parent_id,
+            is_human_readable=is_human_readable,
+        )
 
-    store = vector_store.get_vector_store()
-    result = store.upsert_document(
-        document_id=document_id,
-        content=content,
-        metadata=metadata,
-        parent_id=parent_id,
-        is_human_readable=is_human_readable,
-    )
+    if revision is not None:
+        latest = await pg_store.aget_doc(KB_COLLECTION, doc_key)
+        if latest is None or latest.get("revision") != revision:
+            return result
 
     if result.status == "skipped":
-        pg_store.update_doc(KB_COLLECTION, doc_key, {"vector_status": "skipped"})
-        return
+        await pg_store.aupdate_doc(KB_COLLECTION, doc_key, {"vector_status": "skipped"})
+        return result
 
     update_payload: dict[str, Any] = {
         "vector_status": result.status,
@@ -562,13 +624,73 @@ def _sync_vector_entry(
         update_payload["vector_error"] = result.error
     else:
         update_payload["vector_error"] = None
-    pg_store.update_doc(KB_COLLECTION, doc_key, update_payload)
+    await pg_store.aupdate_doc(KB_COLLECTION, doc_key, update_payload)
+    return result
+
+
+async def _schedule_vector_sync(**entry: Any) -> None:
+    """Hand a document to the write-behind queue, or sync inline.
+
+    Callers have already stored ``vector_status: pending``. When the queue
+    is not running (inline mode, or no app lifespan) the sync runs before
+    the request returns, as it always used to.
+    """
+    if vector_sync_queue.enqueue(entry["document_id"]):
+        return
+    await _sync_vector_entry(**entry)
+
+
+async def _sync_vector_from_pg(document_id: str) -> vector_store.VectorSyncResult:
+    """Queue worker: sync vectors to the latest stored revision of a document."""
+    doc_key = _fs_key(document_id)
+    data = await pg_store.aget_doc(KB_COLLECTION, doc_key)
+    if data is None or data.get("deleted_at") is not None:
+        return await _delete_vector_entry(document_id)
+    content = data.get("content")
+    metadata = data.get("metadata")
+    return await _sync_vector_entry(
+        doc_key=doc_key,
+        document_id=document_id,
+        content=content.get("body") if isinstance(content, dict) else None,
+        metadata=metadata if isinstance(metadata, dict) else None,
+        parent_id=data.get("parent_id"),
+        is_human_readable=bool(data.get("is_human_readable", False)),
+        revision=data.get("revision"),
+    )
 
 
-def _delete_vector_entry(document_id: str) -> None:
-    result = vector_store.delete_document(document_id)
+async def _mark_vector_sync_failed(document_id: str, error: str) -> None:
+    """Queue give-up: record the failure instead of leaving the doc pending."""
+    await pg_store.aupdate_doc(
+        KB_COLLECTION,
+        _fs_key(document_id),
+        {
+            "vector_status": "error",
+            "vector_error": error,
+            "updated_at": datetime.now(UTC).isoformat(),
+        },
+    )
+
+
+def _pending_vector_document_ids() -> list[str]:
+    """Documents left at vector_status=pending, e.g. by a restart."""
+    if getattr(agent, "db", None) is None:
+        return []
+    return [
+        data.get("document_id", data.get("_key", ""))
+        for data in pg_store.stream_docs(
+            KB_COLLECTION, fields=("document_id", "vector_status"), live_only=True
+        )
+        if data.get("vector_status") == "pending"
+    ]
+
+
+async def _delete_vector_entry(document_id: str) -> vector_store.VectorSyncResult:
+    store = vector_store.get_async_vector_store()
+    result = await store.delete_document(document_id)
     if result.status == "error":
         logger.error("Failed to delete vector for %s: %s", document_id, result.error)
+    return result
 
 
 # ---- Simple API-key auth dependency ----
@@ -589,8 +711,8 @@ def _compute_data_integrity() -> DataIntegrity | None:
             return None
 
         _ensure_pg()
-        docs = pg_store.stream_docs(KB_COLLECTION)
-        doc_count = sum(1 for d in docs if d.get("deleted_at") is None)
+        docs = pg_store.stream_docs(KB_COLLECTION, fields=(), live_only=True)
+        doc_count = sum(1 for _ in docs)
         vec_count = store.count()
         if vec_count < 0:
             return None
@@ -615,13 +737,19 @@ def _compute_data_integrity() -> DataIntegrity | None:
         else:
             sync_status = "ok"
 
+        cache_stats = store.embedding_cache.stats()
+        # Document writes embed through the async store, queries through the sync one
+        async_store = vector_store.get_async_vector_store()
         return DataIntegrity(
             document_count=doc_count,
             vector_point_count=vec_count,
             ratio=ratio,
             sync_status=sync_status,
-            embed_calls=store.embed_calls,
-            embed_tokens=store.embed_tokens,
+            embed_calls=store.embed_calls + async_store.embed_calls,
+            embed_tokens=store.embed_tokens + async_store.embed_tokens,
+            embed_cache_hits=cache_stats["hits"],
+            embed_cache_misses=cache_stats["misses"],
+            query_cache_hit_rate=store.query_cache.stats()["hit_rate"],
         )
     except Exception as exc:
         logger.warning("data_integrity probe failed: %s", exc)
@@ -660,6 +788,8 @@ async def root():
             services=services,
             service_count=len(services_raw) if services_raw else 0,
             data_integrity=data_integrity,
+            vector_collection=vector_store.get_collection_status(),
+            vector_sync=vector_sync_queue.stats(),
             event_system=event_status,
         )
     except Exception as e:
@@ -743,14 +873,14 @@ async def ingest(message: ChatMessage):
                     "deleted_at": None,
                     "revision": 1,
                 }
-                pg_store.set_doc(KB_COLLECTION, _fs_key(doc_id), kb_payload)
+                await pg_store.aset_doc(KB_COLLECTION, _fs_key(doc_id), kb_payload)
         except Exception:
             pass
 
         # Sync to Qdrant vector store for RAG
         try:
-            store = vector_store.get_vector_store()
-            vec_result = store.upsert_document(
+            store = vector_store.get_async_vector_store()
+            vec_result = await store.upsert_document(
                 document_id=doc_id,
                 content=inline_text,
                 metadata=metadata,
@@ -852,21 +982,39 @@ def query_knowledge(payload: QueryKnowledgeRequest):
                 query=query_text,
                 filters=payload.filters,
                 top_k=payload.top_k,
+                diversify=routing.diversify,
+                mmr_lambda=routing.mmr_lambda,
             )
 
         qdrant_hits = len(contexts)
 
+        # Retrieval order is kept; a diversified search is in MMR pick order
+        packed = context_packing.pack_context(contexts)
+        contexts = packed.entries
         if contexts:
-            context_text = "\n\n".join(
-                f"Source: {ctx.document_id}\n{ctx.snippet or ''}" for ctx in contexts
-            )
             llm_input = (
                 "You are a knowledge base assistant. Use the provided context to "
                 "answer the user's question accurately.\n\n"
-                f"Context:\n{context_text}\n\nQuestion: {query_text}"
+                f"Context:\n{packed.text}\n\nQuestion: {query_text}"
             )
         else:
             llm_input = query_text
+        prompt_tokens = vector_store.get_token_counter(
+            context_packing.QUERY_TOKENIZER_MODEL
+        ).count(llm_input)
+        if qdrant_hits:
+            logger.info(
+                "chat_context",
+                extra={
+                    "hits": qdrant_hits,
+                    "packed": len(contexts),
+                    "duplicates": packed.duplicates,
+                    "over_budget": packed.over_budget,
+                    "truncated": packed.truncated,
+                    "context_tokens": packed.tokens,
+                    "prompt_tokens": prompt_tokens,
+                },
+            )
 
         # Clear agent state to prevent accumulation between requests (P20 fix)
         # Without this, message_history grows and dialog causes
@@ -902,7 +1050,12 @@ def query_knowledge(payload: QueryKnowledgeRequest):
             reply_text = " ".join(reply_text.split())
 
         latency_ms = int((time.perf_counter() - _t0) * 1000)
-        usage = QueryUsage(latency_ms=latency_ms, qdrant_hits=qdrant_hits)
+        usage = QueryUsage(
+            latency_ms=latency_ms,
+            qdrant_hits=qdrant_hits,
+            prompt_tokens=prompt_tokens,
+            context_tokens=packed.tokens,
+        )
 
         if not reply_text and not contexts:
             # Align with spec guidance for empty retrieval results
@@ -1005,13 +1158,38 @@ async def structured_error_handler(request: Request, exc: HTTPException):
     return JSONResponse(status_code=exc.status_code, content=detail)
 
 
+def _text_search_context_entry(
+    data: dict[str, Any], rank: float
+) -> QueryContextEntry | None:
+    """Context entry for one PostgreSQL full-text hit, or None without a body."""
+    metadata = data.get("metadata")
+    content = data.get("content") or {}
+    body = content.get("body") if isinstance(content, dict) else None
+    if not isinstance(body, str):
+        return None
+    entry = QueryContextEntry(
+        document_id=data.get("document_id") or data.get("_key", "unknown"),
+        snippet=body[:500],
+        score=rank,
+        metadata=metadata if isinstance(metadata, dict) else None,
+    )
+    entry._text = body
+    return entry
+
+
 def _retrieve_query_context(
-    *, query: str, filters: QueryFilters | None, top_k: int
+    *,
+    query: str,
+    filters: QueryFilters | None,
+    top_k: int,
+    diversify: bool = False,
+    mmr_lambda: float | None = None,
 ) -> list[QueryContextEntry]:
     """Fetch candidate documents to ground the knowledge query.
 
-    Strategy: Use Qdrant vector search first (semantic similarity).
-    Falls back to PostgreSQL keyword scan if vector store is unavailable.
+    Strategy: Use Qdrant vector search first (semantic similarity), MMR
+    re-ranked when ``diversify`` is set. Falls back to PostgreSQL keyword
+    full-text search if vector store is unavailable.
     """
 
     # --- Strategy 1: Qdrant vector search ---
@@ -1025,84 +1203,49 @@ def _retrieve_query_context(
                 top_k=top_k,
                 filter_tags=filter_tags,
                 filter_status=filter_status,
+                diversify=diversify,
+                mmr_lambda=mmr_lambda,
             )
             if hits:
                 contexts = []
                 for hit in hits:
-                    contexts.append(
-                        QueryContextEntry(
-                            document_id=hit["document_id"],
-                            snippet=hit.get("snippet"),
-                            score=hit.get("score", 0.0),
-                            metadata=hit.get("metadata"),
-                        )
+                    entry = QueryContextEntry(
+                        document_id=hit["document_id"],
+                        snippet=hit.get("snippet"),
+                        score=hit.get("score", 0.0),
+                        metadata=hit.get("metadata"),
                     )
+                    entry._text = hit.get("content")
+                    contexts.append(entry)
                 return contexts
     except Exception as exc:
         logger.warning("Vector search failed, falling back to PostgreSQL: %s", exc)
 
-    # --- Strategy 2: PostgreSQL keyword scan (fallback) ---
+    # --- Strategy 2: PostgreSQL full-text search (fallback) ---
     try:
         _ensure_pg()
     except HTTPException:
         return []
 
+    query_words = [w for w in re.findall(r"\w+", query.lower()) if len(w) > 2]
     try:
-        all_docs = pg_store.stream_docs(KB_COLLECTION)
+        hits = pg_store.search_docs(
+            KB_COLLECTION,
+            query_words,
+            tags=filters.tags if filters else None,
+            tenant_id=filters.tenant_id if filters else None,
+            status=filters.status if filters else None,
+            limit=top_k,
+        )
     except Exception as exc:
-        logger.warning("Failed to stream documents for query context: %s", exc)
+        logger.warning("Full-text search failed for query context: %s", exc)
         return []
 
-    contexts: list[QueryContextEntry] = []
-    query_words = [w for w in re.findall(r"\w+", query.lower()) if len(w) > 2]
-    for data in all_docs:
-        if not data or data.get("deleted_at") is not None:
-            continue
-
-        metadata = data.get("metadata") or {}
-        tags = metadata.get("tags") if isinstance(metadata, dict) else None
-        if filters and filters.tags:
-            if not isinstance(tags, list) or not set(filters.tags).intersection(tags):
-                continue
-        if filters and filters.tenant_id:
-            tenant_id = (
-                metadata.get("tenant_id") if isinstance(metadata, dict) else None
-            )
-            if tenant_id != filters.tenant_id:
-                continue
-        if filters and filters.status:
-            doc_status = metadata.get("status") if isinstance(metadata, dict) else None
-            if doc_status != filters.status:
-                continue
-
-        content = data.get("content") or {}
-        body = content.get("body") if isinstance(content, dict) else None
-        if not isinstance(body, str):
-            continue
-
-        # Score by keyword overlap (check full body, not just first 200 chars)
-        body_lc = body.lower()
-        title_lc = (
-            metadata.get("title", "") if isinstance(metadata, dict) else ""
-        ).lower()
-        searchable = f"{body_lc} {title_lc}"
-        matched = sum(1 for w in query_words if w in searchable)
-        if matched == 0:
-            continue
-
-        score = matched / max(len(query_words), 1)
-        contexts.append(
-            QueryContextEntry(
-                document_id=data.get("document_id") or data.get("_key", "unknown"),
-                snippet=body[:500],
-                score=score,
-                metadata=metadata if isinstance(metadata, dict) else None,
-            )
-        )
-
-    # Sort by score descending, return top_k
-    contexts.sort(key=lambda c: c.score or 0.0, reverse=True)
-    contexts = contexts[:top_k]
+    contexts = [
+        entry
+        for data, rank in hits
+        if (entry := _text_search_context_entry(data, rank)) is not None
+    ]
 
     if not contexts:
         fallback_text = getattr(agent, "last_ingested_text", None)
@@ -1119,7 +1262,7 @@ def _retrieve_query_context(
     return contexts
 
 
-def _assert_move_target_valid(*, document_id: str, new_parent_id: str) -> None:
+async def _assert_move_target_valid(*, document_id: str, new_parent_id: str) -> None:
     """Validate that move target exists and will not create cycles."""
 
     root_sentinels = {None, "", "root"}
@@ -1127,11 +1270,11 @@ def _assert_move_target_valid(*, document_id: str, new_parent_id: str) -> None:
         return
 
     parent_key = _fs_key(new_parent_id)
-    parent_data = pg_store.get_doc(KB_COLLECTION, parent_key)
+    parent_data = await pg_store.aget_doc(KB_COLLECTION, parent_key)
     if parent_data is None:
         # Auto-create parent as a folder document
         now_iso = datetime.now(UTC).isoformat()
-        pg_store.set_doc(
+        await pg_store.aset_doc(
             KB_COLLECTION,
             parent_key,
             {
@@ -1173,7 +1316,7 @@ def _assert_move_target_valid(*, document_id: str, new_parent_id: str) -> None:
             )
         lineage_seen.add(current_id)
 
-        ancestor_data = pg_store.get_doc(KB_COLLECTION, _fs_key(current_id))
+        ancestor_data = await pg_store.aget_doc(KB_COLLECTION, _fs_key(current_id))
         if ancestor_data is None:
             break
         current_id = ancestor_data.get("parent_id")
@@ -1190,7 +1333,7 @@ async def create_document(
         _ensure_pg()
         doc_id = payload.document_id
         doc_key = _fs_key(doc_id)
-        existing = pg_store.get_doc(KB_COLLECTION, doc_key)
+        existing = await pg_store.aget_doc(KB_COLLECTION, doc_key)
         if existing is not None:
             if existing.get("deleted_at") is None:
                 if upsert:
@@ -1204,11 +1347,11 @@ async def create_document(
                         "is_human_readable": payload.is_human_readable,
                         "updated_at": now_iso,
                         "revision": current_revision + 1,
+                        "vector_status": "pending",
                     }
-                    pg_store.update_doc(KB_COLLECTION, doc_key, updates)
+                    await pg_store.aupdate_doc(KB_COLLECTION, doc_key, updates)
                     try:
-                        _delete_vector_entry(doc_id)
-                        _sync_vector_entry(
+                        await _schedule_vector_sync(
                             doc_key=doc_key,
                             document_id=doc_id,
                             content=new_content.get("body"),
@@ -1256,10 +1399,10 @@ async def create_document(
             "vector_status": "pending",
         }
 
-        pg_store.set_doc(KB_COLLECTION, doc_key, document_data)
+        await pg_store.aset_doc(KB_COLLECTION, doc_key, document_data)
 
         try:
-            _sync_vector_entry(
+            await _schedule_vector_sync(
                 doc_key=doc_key,
                 document_id=doc_id,
                 content=document_data.get("content", {}).get("body"),
@@ -1296,7 +1439,7 @@ async def update_document(
     try:
         _ensure_pg()
         doc_key = _fs_key(doc_id)
-        current = pg_store.get_doc(KB_COLLECTION, doc_key)
+        current = await pg_store.aget_doc(KB_COLLECTION, doc_key)
         if current is None:
             raise _error(404, "NOT_FOUND", "Document not found", document_id=doc_id)
 
@@ -1357,7 +1500,11 @@ async def update_document(
         if not fields_updated:
             raise _error(400, "INVALID_ARGUMENT", "update_mask empty or patch missing")
 
-        pg_store.update_doc(KB_COLLECTION, doc_key, updates)
+        # Only re-embed when content changed; metadata-only updates skip embedding
+        content_changed = "content" in fields_updated
+        if content_changed:
+            updates["vector_status"] = "pending"
+        await pg_store.aupdate_doc(KB_COLLECTION, doc_key, updates)
         current["content"] = new_content
         current["metadata"] = new_metadata
         current["is_human_readable"] = new_is_hr
@@ -1366,13 +1513,10 @@ async def update_document(
         merged_parent = updates.get("parent_id", current.get("parent_id"))
         merged_hr = new_is_hr
 
-        # Only re-embed when content changed; metadata-only updates skip embedding
-        content_changed = "content" in fields_updated
         try:
             if content_changed:
-                # Delete old vectors first to avoid stale chunks when content shrinks
-                _delete_vector_entry(doc_id)
-                _sync_vector_entry(
+                # Only new or changed chunks are re-embedded; stale ones are pruned
+                await _schedule_vector_sync(
                     doc_key=doc_key,
                     document_id=doc_id,
                     content=(
@@ -1434,7 +1578,7 @@ async def move_document(
 
         _ensure_pg()
         doc_key = _fs_key(doc_id)
-        current = pg_store.get_doc(KB_COLLECTION, doc_key)
+        current = await pg_store.aget_doc(KB_COLLECTION, doc_key)
         if current is None:
             raise _error(
                 404,
@@ -1460,7 +1604,7 @@ async def move_document(
                 document_id=doc_id,
             )
 
-        _assert_move_target_valid(document_id=doc_id, new_parent_id=new_parent_id)
+        await _assert_move_target_valid(document_id=doc_id, new_parent_id=new_parent_id)
 
         now_iso = datetime.now(UTC).isoformat()
         next_revision = (current.get("revision") or 0) + 1
@@ -1470,13 +1614,13 @@ async def move_document(
             "revision": next_revision,
         }
 
-        pg_store.update_doc(KB_COLLECTION, doc_key, updates)
+        await pg_store.aupdate_doc(KB_COLLECTION, doc_key, updates)
         current["parent_id"] = new_parent_id
         try:
             # Move only changes parent_id — content is unchanged.
             # Update vector metadata in-place (no re-embedding needed).
-            store = vector_store.get_vector_store()
-            result = store.update_metadata(doc_id, parent_id=new_parent_id)
+            store = vector_store.get_async_vector_store()
+            result = await store.update_metadata(doc_id, parent_id=new_parent_id)
             if result.status == "error":
                 logger.warning(
                     "Vector metadata update failed for move %s: %s",
@@ -1502,11 +1646,11 @@ async def delete_document(
     try:
         _ensure_pg()
         doc_key = _fs_key(doc_id)
-        current = pg_store.get_doc(KB_COLLECTION, doc_key)
+        current = await pg_store.aget_doc(KB_COLLECTION, doc_key)
 
         # Always attempt Qdrant vector deletion, even if DB doc is missing.
         try:
-            _delete_vector_entry(doc_id)
+            await _delete_vector_entry(doc_id)
         except Exception as exc:  # pragma: no cover
             logger.error("Vector deletion failed for %s: %s", doc_id, exc)
 
@@ -1515,7 +1659,7 @@ async def delete_document(
 
         now_iso = datetime.now(UTC).isoformat()
         next_revision = current.get("revision", 0) + 1
-        pg_store.update_doc(
+        await pg_store.aupdate_doc(
             KB_COLLECTION,
             doc_key,
             {
@@ -1549,6 +1693,7 @@ async def delete_document(
 # --------------- GET / PATCH / BATCH Read (TD-011, TD-009, TD-010) ---------------
 
 _TRUNCATE_DEFAULT = 500  # chars shown when ?full is not set
+_BATCH_READ_MAX_PATHS = 500  # paths per /documents/batch, fetched in one query
 
 
 @app.get("/documents/{doc_id:path}")
@@ -1567,7 +1712,7 @@ async def get_document(
     """
     try:
         _ensure_pg()
-        data = pg_store.get_doc(KB_COLLECTION, _fs_key(doc_id))
+        data = await pg_store.aget_doc(KB_COLLECTION, _fs_key(doc_id))
         if data is None:
             raise _error(404, "NOT_FOUND", "Document not found", document_id=doc_id)
         if data.get("deleted_at") is not None:
@@ -1648,7 +1793,7 @@ async def patch_document(
     try:
         _ensure_pg()
         doc_key = _fs_key(doc_id)
-        data = pg_store.get_doc(KB_COLLECTION, doc_key)
+        data = await pg_store.aget_doc(KB_COLLECTION, doc_key)
         if data is None:
             raise _error(404, "NOT_FOUND", "Document not found", document_id=doc_id)
 
@@ -1689,13 +1834,13 @@ async def patch_document(
             "content": new_content,
             "updated_at": now_iso,
             "revision": current_revision + 1,
+            "vector_status": "pending",
         }
-        pg_store.update_doc(KB_COLLECTION, doc_key, updates)
+        await pg_store.aupdate_doc(KB_COLLECTION, doc_key, updates)
 
-        # Re-embed
+        # Re-embed changed chunks
         try:
-            _delete_vector_entry(doc_id)
-            _sync_vector_entry(
+            await _schedule_vector_sync(
                 doc_key=doc_key,
                 document_id=doc_id,
                 content=new_body,
@@ -1736,7 +1881,7 @@ async def patch_document(
 class BatchReadRequest(BaseModel):
     """Request body for batch document read."""
 
-    paths: list[str] = Field(..., min_length=1, max_length=20)
+    paths: list[str] = Field(..., min_length=1, max_length=_BATCH_READ_MAX_PATHS)
     full: bool = False
 
     model_config = ConfigDict(extra="forbid")
@@ -1749,14 +1894,17 @@ async def batch_read_documents(
 ):
     """Read multiple documents in a single request.
 
-    Returns up to 20 documents. By default, content is truncated to 500 chars.
-    Pass ``full: true`` to get full content for all documents.
+    Returns up to 500 documents, all fetched from PostgreSQL in one query.
+    By default, content is truncated to 500 chars. Pass ``full: true`` to
+    get full content for all documents.
     """
     try:
         _ensure_pg()
+        docs = await pg_store.aget_docs(
+            KB_COLLECTION, [_fs_key(doc_id) for doc_id in payload.paths]
+        )
         results = []
-        for doc_id in payload.paths:
-            data = pg_store.get_doc(KB_COLLECTION, _fs_key(doc_id))
+        for doc_id, data in zip(payload.paths, docs, strict=True):
             if data is None:
                 results.append({"document_id": doc_id, "error": "not_found"})
                 continue
@@ -1806,11 +1954,13 @@ async def list_kb_documents(prefix: str = ""):
     """List KB documents from PostgreSQL, optionally filtered by path prefix."""
     try:
         _ensure_pg()
-        docs = pg_store.stream_docs(KB_COLLECTION)
+        docs = pg_store.astream_docs(
+            KB_COLLECTION,
+            fields=("document_id", "parent_id", "metadata", "revision"),
+            live_only=True,
+        )
         items = []
-        for data in docs:
-            if data.get("deleted_at") is not None:
-                continue
+        async for data in docs:
             doc_id = data.get("document_id", data.get("_key", ""))
             if prefix and not doc_id.startswith(prefix):
                 continue
@@ -1837,7 +1987,7 @@ async def get_kb_document(doc_id: str = Path(..., min_length=1)):
     """Get a single KB document's full content from PostgreSQL."""
     try:
         _ensure_pg()
-        data = pg_store.get_doc(KB_COLLECTION, _fs_key(doc_id))
+        data = await pg_store.aget_doc(KB_COLLECTION, _fs_key(doc_id))
         if data is None:
             raise _error(404, "NOT_FOUND", "Document not found", document_id=doc_id)
         if data.get("deleted_at") is not None:
@@ -1857,13 +2007,38 @@ async def get_kb_document(doc_id: str = Path(..., min_length=1)):
         raise _error(500, "INTERNAL", "Get KB document failed", error=str(e)) from e
 
 
+class ReindexRequest(BaseModel):
+    # in_place: upsert into the live collection and wait for the result
+    # blue_green: build <collection>_v<N> in the background, then switch alias
+    mode: Literal["in_place", "blue_green"] = "in_place"
+    replace_collection: bool = False
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class ReindexRollbackRequest(BaseModel):
+    collection: str | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+# Strong references so running re-index tasks are not garbage collected
+_reindex_tasks: set[asyncio.Task] = set()
+
+
 @app.post("/kb/reindex", dependencies=[Depends(require_api_key)])
-async def reindex_kb_documents():
+async def reindex_kb_documents(payload: ReindexRequest | None = None):
     """Re-index all KB documents into Qdrant vector store.
 
-    Iterates every non-deleted document in KB_COLLECTION, upserts each
-    into Qdrant with embeddings.  Returns counts of indexed/skipped/errors.
+    Collects every non-deleted document in KB_COLLECTION and sends them
+    through the bulk vector pipeline (cross-document embedding batches,
+    batched Qdrant upserts).  Returns counts of indexed/skipped/errors.
+
+    ``mode: blue_green`` instead builds a new versioned collection in the
+    background and switches the collection alias when it is complete;
+    follow it with GET /kb/reindex/status.
     """
+    payload = payload or ReindexRequest()
     store = vector_store.get_vector_store(refresh=True)
     if not store.enabled:
         raise _error(
@@ -1874,37 +2049,39 @@ async def reindex_kb_documents():
         )
 
     _ensure_pg()
-    docs = pg_store.stream_docs(KB_COLLECTION)
+    if payload.mode == "blue_green":
+        return _start_blue_green_reindex(store, payload.replace_collection)
+    # Writing to the live collection would race the build and the switch
+    progress = collection_reindex.current_progress()
+    if progress is not None and progress["running"]:
+        raise _error(
+            409, "CONFLICT", "A blue/green re-index is running", progress=progress
+        )
 
-    indexed = 0
+    db_total = 0
     skipped = 0
-    errors = []
-    for data in docs:
+    batch: list[vector_store.VectorDocument] = []
+    results: dict[str, Any] = {}
+    async for data in pg_store.astream_docs(KB_COLLECTION):
+        db_total += 1
         if data.get("deleted_at") is not None:
             skipped += 1
             continue
-
-        doc_id = data.get("document_id", data.get("_key", ""))
-        content = data.get("content") or {}
-        body = content.get("body", "") if isinstance(content, dict) else ""
-        if not body.strip():
+        document = _vector_document(data.get("document_id", data.get("_key", "")), data)
+        if document is None:
             skipped += 1
             continue
+        batch.append(document)
+        # Upsert as we go so only one batch of documents is held at a time
+        if len(batch) >= collection_reindex.REINDEX_BATCH_DOCS:
+            results.update(await asyncio.to_thread(store.upsert_documents, batch))
+            batch = []
+    if batch:
+        results.update(await asyncio.to_thread(store.upsert_documents, batch))
 
-        metadata = (
-            data.get("metadata") if isinstance(data.get("metadata"), dict) else {}
-        )
-        parent_id = data.get("parent_id", "")
-        is_hr = data.get("is_human_readable", False)
-
-        result = store.upsert_document(
-            document_id=doc_id,
-            content=body,
-            metadata=metadata,
-            parent_id=parent_id,
-            is_human_readable=is_hr,
-        )
-
+    indexed = 0
+    errors = []
+    for doc_id, result in results.items():
         if result.status == "error":
             errors.append({"document_id": doc_id, "error": result.error})
         elif result.status == "skipped":
@@ -1914,16 +2091,16 @@ async def reindex_kb_documents():
 
             # Update PostgreSQL vector_status
             try:
-                pg_store.update_doc(
+                await pg_store.aupdate_doc(
                     KB_COLLECTION, _fs_key(doc_id), {"vector_status": "ready"}
                 )
             except Exception:
                 pass
 
-    vector_count = store.count()
+    vector_count = await asyncio.to_thread(store.count)
     return {
         "status": "completed",
-        "db_total": len(docs),
+        "db_total": db_total,
         "indexed": indexed,
         "skipped": skipped,
         "errors": errors,
@@ -1932,6 +2109,84 @@ async def reindex_kb_documents():
     }
 
 
+async def _resync_vector_documents(document_ids: list[str]) -> None:
+    """Re-sync documents through the write-behind queue, or inline without it."""
+    for document_id in document_ids:
+        if not vector_sync_queue.enqueue(document_id):
+            await _sync_vector_from_pg(document_id)
+
+
+def _start_blue_green_reindex(store: Any, replace_collection: bool) -> JSONResponse:
+    if store.backend != "qdrant":
+        raise _error(
+            400,
+            "INVALID_ARGUMENT",
+            "Blue/green re-index needs the Qdrant backend",
+            backend=store.backend,
+        )
+    loop = asyncio.get_running_loop()
+
+    def resync(since: float) -> int:
+        # Runs in the job's thread once the alias points at the new collection
+        document_ids = pg_store.doc_ids_updated_since(
+            KB_COLLECTION, datetime.fromtimestamp(since, UTC)
+        )
+        asyncio.run_coroutine_threadsafe(
+            _resync_vector_documents(document_ids), loop
+        ).result()
+        return len(document_ids)
+
+    job = collection_reindex.BlueGreenReindex(
+        store,
+        lambda: pg_store.stream_docs(KB_COLLECTION),
+        _vector_document,
+        count_docs=lambda: pg_store.count_docs(KB_COLLECTION),
+        resync=resync,
+        replace_collection=replace_collection,
+    )
+    if not collection_reindex.start(job):
+        raise _error(
+            409,
+            "CONFLICT",
+            "A re-index is already running",
+            progress=collection_reindex.current_progress(),
+        )
+    task = asyncio.create_task(asyncio.to_thread(job.run))
+    _reindex_tasks.add(task)
+    task.add_done_callback(_reindex_tasks.discard)
+    return JSONResponse(
+        status_code=202,
+        content={"status": "started", "progress": job.progress.to_dict()},
+    )
+
+
+@app.get("/kb/reindex/status", dependencies=[Depends(require_api_key)])
+async def reindex_status():
+    """Progress and ETA of the running or most recent blue/green re-index."""
+    progress = collection_reindex.current_progress()
+    if progress is None:
+        raise _error(404, "NOT_FOUND", "No blue/green re-index has run")
+    return progress
+
+
+@app.post("/kb/reindex/rollback", dependencies=[Depends(require_api_key)])
+async def reindex_rollback(payload: ReindexRollbackRequest | None = None):
+    """Point the collection alias back at the previous (or given) collection."""
+    payload = payload or ReindexRollbackRequest()
+    store = vector_store.get_vector_store()
+    if not store.enabled or store.backend != "qdrant":
+        raise _error(503, "UNAVAILABLE", "Qdrant vector store not available")
+    progress = collection_reindex.current_progress()
+    if progress is not None and progress["running"]:
+        raise _error(409, "CONFLICT", "A re-index is still running")
+    try:
+        return await asyncio.to_thread(
+            collection_reindex.rollback, store, payload.collection
+        )
+    except ValueError as e:
+        raise _error(400, "INVALID_ARGUMENT", str(e)) from e
+
+
 class CleanupOrphansRequest(BaseModel):
     dry_run: bool = True
     max_delete: int = 100
@@ -1959,24 +2214,25 @@ async def cleanup_orphan_vectors(payload: CleanupOrphansRequest | None = None):
     if not store.enabled:
         raise _error(503, "UNAVAILABLE", "Vector store not available")
 
-    qdrant_doc_ids = store.list_document_ids()
+    # The sync store blocks on Qdrant; keep it off the event loop
+    qdrant_doc_ids = await asyncio.to_thread(store.list_document_ids)
     if not qdrant_doc_ids:
         return {
             "mode": "dry_run" if payload.dry_run else "execute",
             "orphans_found": 0,
             "orphans_deleted": 0,
             "details": [],
-            "qdrant_vectors": store.count(),
+            "qdrant_vectors": await asyncio.to_thread(store.count),
         }
 
     _ensure_pg()
-    # Batch: load all doc keys from PG in one query, then compare
-    all_docs = pg_store.stream_docs(KB_COLLECTION)
-    live_ids: set[str] = set()
-    for doc in all_docs:
-        if doc.get("deleted_at") is None:
-            doc_id = doc.get("document_id", doc.get("_key", ""))
-            live_ids.add(doc_id)
+    # Stream only the live document ids from PG, then compare
+    live_ids = {
+        doc.get("document_id", doc.get("_key", ""))
+        async for doc in pg_store.astream_docs(
+            KB_COLLECTION, fields=("document_id",), live_only=True
+        )
+    }
     orphan_ids = [did for did in qdrant_doc_ids if did not in live_ids]
 
     if payload.dry_run:
@@ -1990,29 +2246,30 @@ async def cleanup_orphan_vectors(payload: CleanupOrphansRequest | None = None):
             "orphans_deleted": 0,
             "details": details,
             "remaining_after_cleanup": len(orphan_ids),
-            "qdrant_vectors": store.count(),
+            "qdrant_vectors": await asyncio.to_thread(store.count),
         }
 
-    result = _run_cleanup(store, orphan_ids, max_delete=payload.max_delete)
+    result = await asyncio.to_thread(
+        _run_cleanup, store, orphan_ids, max_delete=payload.max_delete
+    )
     return {
         "mode": "execute",
         "orphans_found": result["orphans_found"],
         "orphans_deleted": result["orphans_deleted"],
         "details": result["details"],
         "remaining_after_cleanup": result["remaining_after_cleanup"],
-        "qdrant_vectors": store.count(),
+        "qdrant_vectors": await asyncio.to_thread(store.count),
     }
 
 
 def _run_audit(store: Any, _unused: Any = None) -> dict[str, Any]:
     """Internal: compare PostgreSQL vs Qdrant and return audit result dict."""
-    docs = pg_store.stream_docs(KB_COLLECTION)
-
-    pg_ids: set[str] = set()
-    for data in docs:
-        if data.get("deleted_at") is None:
-            doc_id = data.get("document_id", data.get("_key", ""))
-            pg_ids.add(doc_id)
+    pg_ids = {
+        data.get("document_id", data.get("_key", ""))
+        for data in pg_store.stream_docs(
+            KB_COLLECTION, fields=("document_id",), live_only=True
+        )
+    }
 
     qdrant_ids = store.list_document_ids()
     orphan_ids = sorted(qdrant_ids - pg_ids)
@@ -2045,42 +2302,51 @@ def _run_audit(store: Any, _unused: Any = None) -> dict[str, Any]:
     }
 
 
+def _vector_document(doc_id: str, data: dict[str, Any]) -> Any:
+    """Build the bulk-upsert input for a KB document, or None if it has no body."""
+    content = data.get("content") or {}
+    body = content.get("body", "") if isinstance(content, dict) else ""
+    if not body.strip():
+        return None
+    metadata = data.get("metadata") if isinstance(data.get("metadata"), dict) else {}
+    return vector_store.VectorDocument(
+        document_id=doc_id,
+        content=body,
+        metadata=metadata,
+        parent_id=data.get("parent_id", ""),
+        is_human_readable=data.get("is_human_readable", False),
+    )
+
+
 def _run_reindex(store: Any, _unused: Any, ghost_ids: list[str]) -> dict[str, Any]:
     """Internal: re-ingest ghost documents into Qdrant."""
     reindexed = 0
     failed: list[dict[str, str]] = []
     details: list[dict[str, Any]] = []
+    batch: list[Any] = []
 
-    for doc_id in ghost_ids:
-        try:
-            data = pg_store.get_doc(KB_COLLECTION, _fs_key(doc_id))
-            if data is None:
-                details.append({"document_id": doc_id, "status": "not_found"})
-                continue
-        except Exception:
-            failed.append({"document_id": doc_id, "error": "pg_read_failed"})
-            continue
+    try:
+        docs = pg_store.get_docs(
+            KB_COLLECTION, [_fs_key(doc_id) for doc_id in ghost_ids]
+        )
+    except Exception:
+        docs = []
+        failed.extend(
+            {"document_id": doc_id, "error": "pg_read_failed"} for doc_id in ghost_ids
+        )
 
-        content = data.get("content") or {}
-        body = content.get("body", "") if isinstance(content, dict) else ""
-        if not body.strip():
+    for doc_id, data in zip(ghost_ids, docs, strict=False):
+        if data is None:
+            details.append({"document_id": doc_id, "status": "not_found"})
+            continue
+        document = _vector_document(doc_id, data)
+        if document is None:
             details.append({"document_id": doc_id, "status": "skipped_empty"})
             continue
+        batch.append(document)
 
-        metadata = (
-            data.get("metadata") if isinstance(data.get("metadata"), dict) else {}
-        )
-        parent_id = data.get("parent_id", "")
-        is_hr = data.get("is_human_readable", False)
-
-        result = store.upsert_document(
-            document_id=doc_id,
-            content=body,
-            metadata=metadata,
-            parent_id=parent_id,
-            is_human_readable=is_hr,
-        )
-
+    results = store.upsert_documents(batch) if batch else {}
+    for doc_id, result in results.items():
         if result.status == "error":
             failed.append({"document_id": doc_id, "error": result.error or ""})
         else:
@@ -2148,7 +2414,8 @@ async def audit_sync(payload: AuditSyncRequest | None = None):
         raise _error(503, "UNAVAILABLE", "Vector store not available")
 
     _ensure_pg()
-    audit_before = _run_audit(store)
+    # Full PG and Qdrant scans; run them off the event loop
+    audit_before = await asyncio.to_thread(_run_audit, store)
 
     if not payload.auto_heal or audit_before["status"] == "clean":
         logger.info(
@@ -2175,8 +2442,8 @@ async def audit_sync(payload: AuditSyncRequest | None = None):
 
     # Fix ghosts (docs without vectors)
     if audit_before["ghost_count"] > 0:
-        reindex_result = _run_reindex(
-            store, None, audit_before["documents_without_vectors"]
+        reindex_result = await asyncio.to_thread(
+            _run_reindex, store, None, audit_before["documents_without_vectors"]
         )
         heal_report["reindex"] = reindex_result
         logger.info(
@@ -2190,8 +2457,11 @@ async def audit_sync(payload: AuditSyncRequest | None = None):
 
     # Fix orphans (vectors without docs)
     if audit_before["orphan_count"] > 0:
-        cleanup_result = _run_cleanup(
-            store, audit_before["orphan_vector_document_ids"], max_delete=100
+        cleanup_result = await asyncio.to_thread(
+            _run_cleanup,
+            store,
+            audit_before["orphan_vector_document_ids"],
+            max_delete=100,
         )
         heal_report["cleanup"] = cleanup_result
         logger.info(
@@ -2204,7 +2474,7 @@ async def audit_sync(payload: AuditSyncRequest | None = None):
         )
 
     # Verification audit
-    audit_after = _run_audit(store)
+    audit_after = await asyncio.to_thread(_run_audit, store)
     heal_report["audit_before"] = audit_before
     heal_report["audit_after"] = audit_after
     heal_report["final_status"] = audit_after["status"]
@@ -2233,10 +2503,10 @@ async def reindex_missing():
         raise _error(503, "UNAVAILABLE", "Vector store not available")
 
     _ensure_pg()
-    audit = _run_audit(store)
+    audit = await asyncio.to_thread(_run_audit, store)
     ghost_ids = audit["documents_without_vectors"]
 
-    return _run_reindex(store, None, ghost_ids)
+    return await asyncio.to_thread(_run_reindex, store, None, ghost_ids)
 
 
 # ---- Webhook / Event System API Endpoints ----
@@ -2352,6 +2622,17 @@ MCP_TOOLS = [
                     "description": "Maximum number of results (default: 5)",
                     "default": 5,
                 },
+                "diversify": {
+                    "type": "boolean",
+                    "description": "Re-rank results for coverage (MMR) so near-duplicate documents do not crowd out others; useful for overview questions",
+                    "default": False,
+                },
+                "mmr_lambda": {
+                    "type": "number",
+                    "description": "With diversify: 1.0 ranks by relevance only, lower values favour diverse results (default: 0.5)",
+                    "minimum": 0,
+                    "maximum": 1,
+                },
             },
             "required": ["query"],
         },
@@ -2501,14 +2782,14 @@ MCP_TOOLS = [
     },
     {
         "name": "batch_read",
-        "description": "Read multiple documents in a single call. Returns truncated content (500 chars) by default. Max 20 paths.",
+        "description": "Read multiple documents in a single call. Returns truncated content (500 chars) by default. Max 500 paths.",
         "inputSchema": {
             "type": "object",
             "properties": {
                 "paths": {
                     "type": "array",
                     "items": {"type": "string"},
-                    "description": "List of document paths to read (max 20)",
+                    "description": "List of document paths to read (max 500)",
                 },
                 "full": {
                     "type": "boolean",
@@ -2547,7 +2828,13 @@ async def _dispatch_mcp_tool(
     if tool_name == "search_knowledge":
         import asyncio
 
-        payload = QueryKnowledgeRequest(message=args.get("query", ""))
+        payload = QueryKnowledgeRequest(
+            message=args.get("query", ""),
+            routing=QueryRouting(
+                diversify=bool(args.get("diversify", False)),
+                mmr_lambda=args.get("mmr_lambda"),
+            ),
+        )
         # query_knowledge is sync (uses asyncio.run internally via langroid)
         # Must run in thread to avoid event loop conflict with async caller
         result = await asyncio.to_thread(query_knowledge, payload)
@@ -0,0 +1,68 @@
+"""Local BM25 sparse vectors for hybrid Qdrant search.
+
+Terms are hashed into the sparse index space, so no vocabulary or model
+download is needed. Documents carry BM25 term-frequency weights; the
+collection applies IDF server-side (``Modifier.IDF``), and queries send
+plain term presence.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import unicodedata
+import zlib
+from collections import Counter
+
+SPARSE_VECTOR_NAME = "bm25"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Typical chunk length in tokens, used for BM25 length normalisation
+BM25_AVG_LEN = float(os.getenv("QDRANT_BM25_AVG_LEN", "300"))
+
+# Words plus compounds such as ticket ids (TD-131) and law codes (01/2024/nd-cp)
+_TOKEN_RE = re.compile(r"\w+(?:[-/.]\w+)*")
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-case word tokens; compounds are kept whole and also split.
+
+    NFC normalisation keeps Vietnamese diacritics as single code points so
+    the same word always hashes to the same index.
+    """
+    normalized = unicodedata.normalize("NFC", text).casefold()
+    tokens: list[str] = []
+    for match in _TOKEN_RE.finditer(normalized):
+        compound = match.group()
+        tokens.append(compound)
+        if not compound.isalnum():
+            tokens.extend(_WORD_RE.findall(compound))
+    return tokens
+
+
+def _term_index(term: str) -> int:
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _to_sparse(weights: dict[int, float]) -> tuple[list[int], list[float]]:
+    indices = sorted(weights)
+    return indices, [weights[i] for i in indices]
+
+
+def document_vector(text: str) -> tuple[list[int], list[float]]:
+    """BM25 term-frequency weights for a chunk as (indices, values)."""
+    counts = Counter(tokenize(text))
+    length = sum(counts.values())
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / BM25_AVG_LEN)
+    weights: dict[int, float] = {}
+    for term, tf in counts.items():
+        index = _term_index(term)
+        weights[index] = weights.get(index, 0.0) + tf * (BM25_K1 + 1) / (tf + norm)
+    return _to_sparse(weights)
+
+
+def query_vector(text: str) -> tuple[list[int], list[float]]:
+    """One unit weight per distinct query term as (indices, values)."""
+    return _to_sparse({_term_index(term): 1.0 for term in set(tokenize(text))})
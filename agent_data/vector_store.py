@@ -2,32 +2,149 @@
 
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
+import itertools
 import logging
 import os
+import queue
+import re
+import threading
 import time
-from collections.abc import Iterable
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any
-from uuid import NAMESPACE_DNS, uuid5
-
-from agent_data.resilient_client import health_registry, sync_retry
-
-# Chunking configuration (configurable via environment variables)
-CHUNK_SIZE = int(os.getenv("QDRANT_CHUNK_SIZE", "4000"))
-CHUNK_OVERLAP = int(os.getenv("QDRANT_CHUNK_OVERLAP", "400"))
+from uuid import NAMESPACE_DNS, UUID, uuid5
+
+from agent_data import diversity, sparse_vectors
+from agent_data.resilient_client import async_retry, health_registry, sync_retry
+
+# Input limit of the OpenAI embedding models, in tokens
+EMBED_MAX_TOKENS = 8191
+
+# Chunk budget and overlap, counted with the embedding model's tokenizer
+CHUNK_TOKENS = min(int(os.getenv("QDRANT_CHUNK_TOKENS", "800")), EMBED_MAX_TOKENS)
+CHUNK_OVERLAP_TOKENS = int(os.getenv("QDRANT_CHUNK_OVERLAP_TOKENS", "80"))
+
+# Memoised token counts (paragraphs and chunks) per embedding model
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv("QDRANT_TOKEN_COUNT_CACHE_SIZE", "65536"))
+TOKENIZE_THREADS = min(8, os.cpu_count() or 1)
+
+# Embedding batch limits: inputs per OpenAI request and token budget
+EMBED_BATCH_SIZE = int(os.getenv("QDRANT_EMBED_BATCH_SIZE", "64"))
+EMBED_BATCH_TOKENS = int(os.getenv("QDRANT_EMBED_BATCH_TOKENS", "100000"))
+
+# Bulk upserts: worker threads and points per Qdrant upsert request
+BULK_CONCURRENCY = int(os.getenv("QDRANT_BULK_CONCURRENCY", "4"))
+BULK_UPSERT_POINTS = int(os.getenv("QDRANT_BULK_UPSERT_POINTS", "256"))
+
+# In-process LRU entries in front of the PostgreSQL embedding cache
+EMBED_CACHE_SIZE = int(os.getenv("QDRANT_EMBED_CACHE_SIZE", "2048"))
+
+# Output size requested from v3 embedding models; unset keeps the native size
+EMBED_DIMENSIONS = int(os.getenv("QDRANT_EMBED_DIMENSIONS", "0")) or None
+
+# Collection layout expected by the bootstrap (text-embedding-3-small = 1536)
+VECTOR_SIZE = int(os.getenv("QDRANT_VECTOR_SIZE", str(EMBED_DIMENSIONS or 1536)))
+VECTOR_DISTANCE = os.getenv("QDRANT_DISTANCE", "Cosine")
+
+# Dense vector quantization: "none", "int8" (scalar), "binary" or "product".
+# Quantized vectors are always kept in RAM. "none" (the default) creates
+# unquantized collections and leaves existing ones as they are.
+QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")
+QUANTIZATION_PROFILES = ("none", "int8", "binary", "product")
+# Original dense vectors on disk ("1") or in RAM ("0"); unset keeps Qdrant's
+# default for new collections and leaves existing ones as they are
+VECTORS_ON_DISK = {"1": True, "0": False}.get(os.getenv("QDRANT_ON_DISK", ""))
+# Product quantization compression ratio: x4, x8, x16, x32 or x64
+PQ_COMPRESSION = os.getenv("QDRANT_PQ_COMPRESSION", "x16")
+# Quantized search: candidates per requested result, and whether they are
+# re-scored with the original vectors before the top results are picked
+SEARCH_OVERSAMPLING = float(os.getenv("QDRANT_SEARCH_OVERSAMPLING", "2.0"))
+SEARCH_RESCORE = os.getenv("QDRANT_SEARCH_RESCORE", "1") == "1"
+
+# Payload indexes for every key the store filters on
+PAYLOAD_INDEXES = {
+    "document_id": "keyword",
+    "parent_id": "keyword",
+    "metadata.tags": "keyword",
+    "metadata.status": "keyword",
+    "is_human_readable": "bool",
+}
+
+# Payload fields search needs; the rest (hashes, flags) stays server-side
+SEARCH_PAYLOAD_FIELDS = ["document_id", "content", "metadata"]
+
+# Where chunk text lives: "payload" keeps it in the point payload, which is
+# what langroid's Document expects; "pg" keeps it in the PostgreSQL kb_chunks
+# table so search responses only carry ids and metadata. Switching to "pg"
+# needs a re-index to fill the table.
+CHUNK_TEXT_STORE = os.getenv("QDRANT_CHUNK_TEXT_STORE", "payload")
+
+# Query embeddings: LRU entries and time-to-live in seconds
+QUERY_CACHE_SIZE = int(os.getenv("QDRANT_QUERY_CACHE_SIZE", "512"))
+QUERY_CACHE_TTL = float(os.getenv("QDRANT_QUERY_CACHE_TTL", "900"))
+
+# "qdrant" (default) or "local" for the in-process memory-mapped index
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+
+# Hybrid search: BM25 sparse vectors fused with dense results (RRF)
+HYBRID_SEARCH = os.getenv("QDRANT_HYBRID_SEARCH", "1") == "1"
+HYBRID_PREFETCH_LIMIT = int(os.getenv("QDRANT_HYBRID_PREFETCH_LIMIT", "50"))
+
+# Qdrant transport: "rest" (HTTP/JSON) or "grpc" (protobuf over HTTP/2 on
+# QDRANT_GRPC_PORT; calls the gRPC API lacks still go over REST)
+QDRANT_TRANSPORT = os.getenv("QDRANT_TRANSPORT", "rest")
+QDRANT_TRANSPORTS = ("rest", "grpc")
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+# REST connection pool: open connections, idle keep-alive connections and
+# how long an idle one is kept (seconds). qdrant-client disables keep-alive
+# for localhost by default; these apply to every host.
+HTTP_MAX_CONNECTIONS = int(os.getenv("QDRANT_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv("QDRANT_HTTP_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("QDRANT_HTTP_KEEPALIVE_EXPIRY", "30"))
+# Timeouts in seconds. QDRANT_TIMEOUT bounds every request (writes have no
+# other limit); search, scroll and count also send their own timeout so
+# the server abandons slow reads. 0 keeps QDRANT_TIMEOUT for that operation.
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "15"))
+SEARCH_TIMEOUT = int(os.getenv("QDRANT_SEARCH_TIMEOUT", "0")) or None
+SCROLL_TIMEOUT = int(os.getenv("QDRANT_SCROLL_TIMEOUT", "0")) or None
+COUNT_TIMEOUT = int(os.getenv("QDRANT_COUNT_TIMEOUT", "0")) or None
+
+# Full-collection scans (list_document_ids): points per scroll request and
+# disjoint point-id ranges scanned concurrently
+SCROLL_PAGE_SIZE = int(os.getenv("QDRANT_SCROLL_PAGE_SIZE", "1000"))
+SCROLL_SEGMENTS = int(os.getenv("QDRANT_SCROLL_SEGMENTS", "4"))
 
 try:  # pragma: no cover - optional dependency import guard
-    from openai import OpenAI  # type: ignore
+    from openai import AsyncOpenAI, OpenAI  # type: ignore
 except Exception:  # pragma: no cover
     OpenAI = None  # type: ignore
+    AsyncOpenAI = None  # type: ignore
+
+try:  # pragma: no cover - optional dependency import guard
+    import tiktoken  # type: ignore
+except Exception:  # pragma: no cover
+    tiktoken = None  # type: ignore
 
 try:  # pragma: no cover - optional dependency import guard
-    from qdrant_client import QdrantClient  # type: ignore
+    from qdrant_client import AsyncQdrantClient, QdrantClient  # type: ignore
     from qdrant_client.http import models as qmodels  # type: ignore
 except Exception:  # pragma: no cover
     QdrantClient = None  # type: ignore
+    AsyncQdrantClient = None  # type: ignore
     qmodels = None  # type: ignore
 
+try:  # pragma: no cover - optional dependency import guard
+    import httpx  # type: ignore
+except Exception:  # pragma: no cover
+    httpx = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,50 +155,1059 @@ class VectorSyncResult:
     chunks_created: int = 0
 
 
-def _split_text(text: str, chunk_size: int, overlap: int) -> list[str]:
-    """Split text into overlapping chunks.
+@dataclass(slots=True)
+class VectorDocument:
+    """One document for a bulk upsert; fields mirror upsert_document()."""
+
+    document_id: str
+    content: str
+    metadata: dict[str, Any] | None = None
+    parent_id: str | None = None
+    is_human_readable: bool = False
+
+
+def _load_encoding(model: str) -> Any:
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Not an OpenAI model name (e.g. the local feature hash)
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:  # encoding files not downloadable
+        logger.warning("No tiktoken encoding for %s: %s", model, exc)
+        return None
+
 
-    Uses a simple character-based splitter that tries to break on paragraph
-    boundaries (\n\n), then sentence boundaries (. ), then word boundaries.
+class TokenCounter:
+    """Token counts for one embedding model, memoised per text.
+
+    Uses the model's tiktoken encoding. Without tiktoken (or its encoding
+    files) the UTF-8 byte length stands in: byte-level BPE never produces
+    more tokens than bytes, so budgets still hold, only more conservatively.
     """
-    if len(text) <= chunk_size:
-        return [text]
 
-    chunks: list[str] = []
-    start = 0
+    def __init__(self, model: str, max_entries: int = TOKEN_COUNT_CACHE_SIZE) -> None:
+        self.model = model
+        self.max_entries = max_entries
+        self._encoding: Any = None
+        self._loaded = False
+        # hash(text) -> count; evicted oldest-first
+        self._counts: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self) -> Any:
+        if not self._loaded:
+            self._encoding = _load_encoding(self.model)
+            self._loaded = True
+        return self._encoding
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        return self.count_many([text])[0]
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        cache = self._counts
+        with self._lock:
+            counts = [cache.get(hash(text)) for text in texts]
+        missing = [i for i, count in enumerate(counts) if count is None]
+        if not missing:
+            return counts  # type: ignore[return-value]
+        todo = [texts[i] for i in missing]
+        encoding = self.encoding
+        if encoding is None:
+            fresh = [len(text.encode("utf-8")) for text in todo]
+        elif TOKENIZE_THREADS > 1 and sum(map(len, todo)) >= 1 << 18:
+            # tiktoken releases the GIL, so large cold batches scale with cores
+            fresh = list(
+                map(
+                    len,
+                    encoding.encode_ordinary_batch(todo, num_threads=TOKENIZE_THREADS),
+                )
+            )
+        else:
+            fresh = [len(encoding.encode_ordinary(text)) for text in todo]
+        with self._lock:
+            for i, text, count in zip(missing, todo, fresh, strict=True):
+                counts[i] = cache[hash(text)] = count
+            overflow = len(cache) - self.max_entries
+            if overflow > 0:
+                for key in list(itertools.islice(cache, overflow)):
+                    del cache[key]
+        return counts  # type: ignore[return-value]
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of ``text`` within ``max_tokens``."""
+        if self.count(text) <= max_tokens:
+            return text
+        encoding = self.encoding
+        if encoding is None:
+            head = text.encode("utf-8")[:max_tokens]
+        else:
+            head = encoding.decode_bytes(encoding.encode_ordinary(text)[:max_tokens])
+        # Drop a multi-byte character cut in half at the end
+        return head.decode("utf-8", "ignore")
+
+
+_token_counters: dict[str, TokenCounter] = {}
+_token_counters_lock = threading.Lock()
+
+
+def get_token_counter(model: str) -> TokenCounter:
+    with _token_counters_lock:
+        counter = _token_counters.get(model)
+        if counter is None:
+            counter = _token_counters[model] = TokenCounter(model)
+        return counter
+
+
+@dataclass(slots=True)
+class TextChunk:
+    text: str
+    tokens: int
+    # [start, end) character span in the source (only with spans=True);
+    # whitespace between blocks is normalised, so text is not always
+    # content[start:end]
+    start: int = 0
+    end: int = 0
+
+
+# Paragraph breaks, and the line before a heading
+_BLOCK_BREAK_RE = re.compile(r"\n[ \t]*\n|\n(?=#{1,6}[ \t])")
+_HEADING_RE = re.compile(r"#{1,6}[ \t]")
+_NON_SPACE_RE = re.compile(r"\S")
+# Ways to split a block that is over budget on its own, coarsest first
+_BLOCK_SPLITS = (
+    ("\n", re.compile(r"\n")),
+    (" ", re.compile(r"(?<=[.!?;:])\s+")),
+    (" ", re.compile(r"\s+")),
+)
+
+
+def _prose_blocks(text: str, blocks: list[tuple[str, bool]]) -> None:
+    for block in _BLOCK_BREAK_RE.split(text):
+        block = block.strip()
+        if block:
+            blocks.append(
+                (block, block[0] == "#" and _HEADING_RE.match(block) is not None)
+            )
+
 
-    while start < len(text):
-        end = start + chunk_size
+def _fence_end(text: str, start: int, marker: str) -> int:
+    """End of the fence opened at ``start``; an unclosed fence runs to the end."""
+    pos = text.find("\n", start)
+    while pos != -1:
+        close = text.find("\n" + marker, pos)
+        if close == -1:
+            break
+        line_end = text.find("\n", close + 1)
+        line_end = len(text) if line_end == -1 else line_end
+        if not text[close + 1 + len(marker) : line_end].strip(marker[0] + " \t"):
+            return line_end
+        pos = line_end
+    return len(text)
 
-        # If we're not at the end, try to find a good break point
-        if end < len(text):
-            # Look for paragraph break
-            para_break = text.rfind("\n\n", start, end)
-            if para_break > start + chunk_size // 2:
-                end = para_break + 2  # Include the newlines
-            else:
-                # Look for sentence break
-                sentence_break = text.rfind(". ", start, end)
-                if sentence_break > start + chunk_size // 2:
-                    end = sentence_break + 2
-                else:
-                    # Look for word break
-                    word_break = text.rfind(" ", start, end)
-                    if word_break > start + chunk_size // 2:
-                        end = word_break + 1
-
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-
-        # Move start with overlap
-        start = end - overlap if end < len(text) else len(text)
 
+def _markdown_blocks(text: str) -> list[tuple[str, bool]]:
+    """(block, is_heading) for paragraphs, headings and code fences, in order.
+
+    Fenced code blocks are kept whole, blank lines included.
+    """
+    blocks: list[tuple[str, bool]] = []
+    pos = 0
+    marker = "```" if "```" in text else "~~~" if "~~~" in text else None
+    search = 0
+    while marker and (start := text.find(marker, search)) != -1:
+        if start > 0 and text[start - 1] != "\n":
+            # Inline backticks, not a fence
+            search = start + len(marker)
+            continue
+        end = _fence_end(text, start, marker)
+        _prose_blocks(text[pos:start], blocks)
+        blocks.append((text[start:end], False))
+        pos = search = end
+    _prose_blocks(text[pos:], blocks)
+    return blocks
+
+
+def _split_block(
+    text: str, counter: TokenCounter, max_tokens: int, level: int = 0
+) -> list[tuple[str, str]]:
+    """(separator, part) pairs of an over-budget block; every part fits.
+
+    Lines first (code), then sentences, then words; a single word that is
+    still too long is halved by characters, so nothing is ever dropped.
+    """
+    if level < len(_BLOCK_SPLITS):
+        joiner, pattern = _BLOCK_SPLITS[level]
+        parts = [part for part in pattern.split(text) if part.strip()]
+        if len(parts) < 2:
+            return _split_block(text, counter, max_tokens, level + 1)
+    else:
+        joiner = ""
+        mid = len(text) // 2
+        parts = [text[:mid], text[mid:]]
+    pieces: list[tuple[str, str]] = []
+    for part, tokens in zip(parts, counter.count_many(parts), strict=True):
+        if tokens <= max_tokens:
+            pieces.append((joiner, part))
+            continue
+        sub = _split_block(part, counter, max_tokens, level + 1)
+        pieces.append((joiner, sub[0][1]))
+        pieces.extend(sub[1:])
+    return pieces
+
+
+def _chunk_text(
+    text: str,
+    counter: TokenCounter,
+    max_tokens: int | None = None,
+    overlap: int | None = None,
+    spans: bool = False,
+) -> list[TextChunk]:
+    """Split markdown into chunks of at most ``max_tokens`` model tokens.
+
+    Chunks are packed from whole paragraphs and code fences, and a heading
+    starts a new chunk unless the current one is still tiny. A block over
+    budget on its own is split by lines, sentences, then words. Chunks cut
+    for size repeat up to ``overlap`` tokens of trailing paragraphs.
+    ``spans`` fills in each chunk's character span in ``text``.
+    """
+    max_tokens = max(16, max_tokens or CHUNK_TOKENS)
+    overlap = CHUNK_OVERLAP_TOKENS if overlap is None else overlap
+    # Fewer bytes than budget means fewer tokens than budget
+    if len(text) <= max_tokens and len(text.encode("utf-8")) <= max_tokens:
+        return [TextChunk(text, counter.count(text), 0, len(text))]
+
+    blocks = _markdown_blocks(text)
+    block_counts = counter.count_many([block for block, _ in blocks])
+    # Parallel lists: separator before, text, token count, starts a section
+    if max(block_counts, default=0) <= max_tokens:
+        # Common case: every block fits on its own
+        seps = ["\n\n"] * len(blocks)
+        parts = [block for block, _ in blocks]
+        counts = block_counts
+        headings = [heading for _, heading in blocks]
+    else:
+        seps, parts, counts, headings = [], [], [], []
+        for (block, heading), tokens in zip(blocks, block_counts, strict=True):
+            pieces = (
+                [("\n\n", block)]
+                if tokens <= max_tokens
+                else _split_block(block, counter, max_tokens)
+            )
+            piece_counts = (
+                [tokens]
+                if len(pieces) == 1
+                else counter.count_many([piece for _, piece in pieces])
+            )
+            for i, ((sep, piece), piece_tokens) in enumerate(
+                zip(pieces, piece_counts, strict=True)
+            ):
+                seps.append("\n\n" if i == 0 else sep)
+                parts.append(piece)
+                counts.append(piece_tokens)
+                headings.append(heading and i == 0)
+    if not parts:
+        return []
+    sep_counts = {sep: counter.count(sep) if sep else 0 for sep in set(seps)}
+    sep_tokens = [sep_counts[sep] for sep in seps]
+
+    # Greedy packing into [start, end) ranges of parts. ``current`` sums part
+    # and separator counts, which is never below the joined text's count.
+    ranges: list[tuple[int, int]] = []
+    start = current = 0
+    for i, tokens in enumerate(counts):
+        if i > start:
+            if headings[i] and current >= max_tokens // 8:
+                ranges.append((start, i))
+                start, current = i, 0
+            elif current + sep_tokens[i] + tokens > max_tokens:
+                ranges.append((start, i))
+                # Carry trailing parts of the previous chunk as overlap
+                carry, j = 0, i
+                while j - 1 > start:
+                    added = counts[j - 1] + (sep_tokens[j] if j < i else 0)
+                    if carry + added > overlap or (
+                        carry + added + sep_tokens[i] + tokens > max_tokens
+                    ):
+                        break
+                    carry, j = carry + added, j - 1
+                start, current = j, carry
+        current += (sep_tokens[i] if i > start else 0) + tokens
+    ranges.append((start, len(parts)))
+
+    glued = [sep + part for sep, part in zip(seps, parts, strict=True)]
+    texts = [parts[a] + "".join(glued[a + 1 : b]) for a, b in ranges]
+    chunks = [
+        TextChunk(chunk, tokens)
+        for chunk, tokens in zip(texts, counter.count_many(texts), strict=True)
+    ]
+    if spans:
+        starts = _part_offsets(text, parts)
+        for chunk, (a, b) in zip(chunks, ranges, strict=True):
+            chunk.start, chunk.end = starts[a], starts[b - 1] + len(parts[b - 1])
     return chunks
 
 
-class QdrantVectorStore:
-    """Thin wrapper around Qdrant upsert/delete operations."""
+def _part_offsets(text: str, parts: list[str]) -> list[int]:
+    """Start of each part in ``text``; parts are in-order substrings of it.
+
+    Only whitespace lies between consecutive parts, so the next part almost
+    always starts at the next non-space character; indented code lines fall
+    back to a search.
+    """
+    starts: list[int] = []
+    pos = 0
+    search = _NON_SPACE_RE.search
+    for part in parts:
+        match = search(text, pos)
+        start = match.start() if match else pos
+        if not text.startswith(part, start):
+            start = text.find(part, pos)
+        starts.append(start)
+        pos = start + len(part)
+    return starts
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 chars/token) used to size embedding batches."""
+    return len(text) // 4 + 1
+
+
+def _batch_inputs(
+    texts: list[str],
+    max_inputs: int,
+    max_tokens: int,
+    count: Callable[[str], int] = _estimate_tokens,
+) -> list[list[str]]:
+    """Group texts into batches bounded by input count and tokens.
+
+    ``count`` defaults to a rough estimate; stores pass their tokenizer.
+    A single text larger than ``max_tokens`` still gets its own batch so it
+    is never dropped; OpenAI decides whether it fits.
+    """
+    batches: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for text in texts:
+        tokens = count(text)
+        if current and (
+            len(current) >= max_inputs or current_tokens + tokens > max_tokens
+        ):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _is_input_error(exc: Exception) -> bool:
+    """True for OpenAI errors caused by the request payload (400/413/422)."""
+    return getattr(exc, "status_code", None) in {400, 413, 422}
+
+
+@dataclass(slots=True)
+class _ChunkPlan:
+    """What an upsert has to write, given the chunks already indexed."""
+
+    total_chunks: int
+    # (point_id, chunk_text, payload) for chunks that need a new embedding
+    changed: list[tuple[str, str, dict[str, Any]]]
+    # (point_id, payload) for unchanged chunks whose payload moved
+    payload_only: list[tuple[str, dict[str, Any]]]
+    # indexed points past the new chunk count
+    stale_ids: list[str]
+    # kb_chunks rows for every chunk (see pg_store.put_chunks)
+    rows: list[tuple[str, str, int, int, int, str]]
+
+
+def _plan_chunk_updates(
+    *,
+    document_id: str,
+    content: str,
+    metadata: dict[str, Any] | None,
+    parent_id: str | None,
+    is_human_readable: bool,
+    existing: dict[str, dict],
+    counter: TokenCounter,
+) -> _ChunkPlan:
+    """Chunk ``content`` and diff it against the indexed payloads of the document.
+
+    ``existing`` maps point_id to payload as returned by a scroll; it is
+    consumed by this call.
+    """
+    chunks = _chunk_text(content, counter, spans=CHUNK_TEXT_STORE == "pg")
+    total_chunks = len(chunks)
+
+    # Preserve original metadata with source info
+    base_metadata = metadata or {}
+    if "source_id" not in base_metadata and "title" not in base_metadata:
+        # Ensure source tracking for citation integrity
+        base_metadata["source_id"] = document_id
+
+    changed: list[tuple[str, str, dict[str, Any]]] = []
+    payload_only: list[tuple[str, dict[str, Any]]] = []
+    rows: list[tuple[str, str, int, int, int, str]] = []
+    for idx, chunk in enumerate(chunks):
+        chunk_text = chunk.text
+        # Build payload with chunk metadata
+        payload = {
+            "document_id": document_id,
+            "metadata": {
+                **base_metadata,
+                "chunk_index": idx,
+                "total_chunks": total_chunks,
+                "token_count": chunk.tokens,
+            },
+            "parent_id": parent_id,
+            "is_human_readable": is_human_readable,
+            "content_hash": _content_hash(chunk_text),
+        }
+        if CHUNK_TEXT_STORE != "pg":
+            payload["content"] = chunk_text  # Required by langroid Document class
+
+        # Generate unique point_id for each chunk
+        # Format: uuid5(document_id:chunk_idx) for deterministic IDs
+        chunk_id = f"{document_id}:chunk:{idx}"
+        point_id = str(uuid5(NAMESPACE_DNS, chunk_id))
+        rows.append((point_id, document_id, idx, chunk.start, chunk.end, chunk_text))
+
+        indexed = existing.pop(point_id, None)
+        if indexed is None or indexed.get("content_hash") != payload["content_hash"]:
+            changed.append((point_id, chunk_text, payload))
+        elif indexed != payload:
+            payload_only.append((point_id, payload))
+
+    # Whatever is left in `existing` belongs to chunks that no longer exist
+    return _ChunkPlan(
+        total_chunks=total_chunks,
+        changed=changed,
+        payload_only=payload_only,
+        stale_ids=list(existing),
+        rows=rows,
+    )
+
+
+def _write_chunk_texts(rows: list[tuple[str, str, int, int, int, str]]) -> None:
+    """Store chunk texts in kb_chunks; runs before the points are upserted."""
+    if CHUNK_TEXT_STORE != "pg" or not rows:
+        return
+    from agent_data import pg_store
+
+    pg_store.put_chunks(rows)
+
+
+def _delete_chunk_texts(
+    point_ids: list[str] | None = None, document_id: str | None = None
+) -> None:
+    if CHUNK_TEXT_STORE != "pg":
+        return
+    from agent_data import pg_store
+
+    if document_id is not None:
+        pg_store.delete_document_chunks(document_id)
+    elif point_ids:
+        pg_store.delete_chunks(point_ids)
+
+
+def _fetch_chunk_texts(results: list[Any]) -> dict[str, str] | None:
+    """Texts of the hit points from kb_chunks, or None when in the payload.
+
+    A PostgreSQL failure degrades to empty snippets, not a failed search.
+    """
+    if CHUNK_TEXT_STORE != "pg":
+        return None
+    try:
+        from agent_data import pg_store
+
+        return pg_store.get_chunk_texts([str(hit.id) for hit in results])
+    except Exception as exc:
+        logger.warning("Chunk text lookup failed: %s", exc)
+        return {}
+
+
+def _search_payload_fields() -> list[str]:
+    if CHUNK_TEXT_STORE != "pg":
+        return SEARCH_PAYLOAD_FIELDS
+    return [field for field in SEARCH_PAYLOAD_FIELDS if field != "content"]
+
+
+# Whether a collection (alias or concrete name) has the BM25 sparse vector.
+# Set by CollectionManager.ensure or read from the collection's own config on
+# first use; a failed lookup is not cached, and ensure_collection drops every
+# entry so alias switches show up.
+_sparse_support: dict[str, bool] = {}
+
+
+def _has_sparse_vector(info: Any) -> bool:
+    sparse = getattr(info.config.params, "sparse_vectors", None) or {}
+    return sparse_vectors.SPARSE_VECTOR_NAME in sparse
+
+
+def _sparse_vector(indices_values: tuple[list[int], list[float]]) -> Any:
+    indices, values = indices_values
+    return qmodels.SparseVector(indices=indices, values=values)
+
+
+def _build_points(
+    changed: list[tuple[str, str, dict[str, Any]]],
+    embeddings: list[list[float]],
+    hybrid: bool,
+) -> list[Any]:
+    points = []
+    for (point_id, text, payload), embedding in zip(changed, embeddings, strict=True):
+        vector: Any = embedding
+        if hybrid:
+            vector = {
+                "": embedding,
+                sparse_vectors.SPARSE_VECTOR_NAME: _sparse_vector(
+                    sparse_vectors.document_vector(text)
+                ),
+            }
+        points.append(qmodels.PointStruct(id=point_id, vector=vector, payload=payload))
+    return points
+
+
+def qdrant_client_kwargs(
+    url: str | None, api_key: str | None, transport: str | None = None
+) -> dict[str, Any]:
+    """Constructor arguments for QdrantClient / AsyncQdrantClient."""
+    transport = transport or QDRANT_TRANSPORT
+    if transport not in QDRANT_TRANSPORTS:
+        raise ValueError(
+            f"Unknown Qdrant transport {transport!r}; "
+            f"expected one of {', '.join(QDRANT_TRANSPORTS)}"
+        )
+    kwargs: dict[str, Any] = {"url": url, "api_key": api_key, "timeout": QDRANT_TIMEOUT}
+    if transport == "grpc":
+        kwargs["prefer_grpc"] = True
+        kwargs["grpc_port"] = QDRANT_GRPC_PORT
+    if httpx is not None:
+        # Also sizes the REST fallback a gRPC client keeps for some calls
+        kwargs["limits"] = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+    return kwargs
+
+
+def _timeout_kwargs(timeout: int | None) -> dict[str, Any]:
+    """Per-call ``timeout`` for reads that accept one, when configured."""
+    return {"timeout": timeout} if timeout else {}
+
+
+@dataclass(frozen=True, slots=True)
+class _ScrollSegment:
+    """A point-id range ``[start, end)``; ids are keyed by ``_point_key``."""
+
+    offset: str | None
+    start: int
+    end: int | None
+
+    def contains(self, point_id: Any) -> bool:
+        key = _point_key(point_id)
+        return key >= self.start and (self.end is None or key < self.end)
+
+    def past(self, point_id: Any) -> bool:
+        return self.end is not None and _point_key(point_id) >= self.end
+
+
+def _point_key(point_id: Any) -> int:
+    """Scroll order of a point id: Qdrant lists integer ids before UUIDs."""
+    if isinstance(point_id, int):
+        return -1
+    try:
+        return UUID(str(point_id)).int
+    except ValueError:
+        return -1
+
+
+def _scroll_segments(count: int) -> list[_ScrollSegment]:
+    """Split the UUID space into ``count`` disjoint, contiguous ranges."""
+    count = max(1, count)
+    step = (1 << 128) // count
+    bounds = [k * step for k in range(count)] + [None]
+    return [
+        _ScrollSegment(
+            offset=str(UUID(int=bounds[k])) if k else None,
+            start=bounds[k] if k else -1,
+            end=bounds[k + 1],
+        )
+        for k in range(count)
+    ]
+
+
+def _page_document_ids(
+    points: list[Any], segment: _ScrollSegment
+) -> tuple[set[str], bool]:
+    """document_ids of a scroll page inside ``segment``, and whether it ended."""
+    ids: set[str] = set()
+    for point in points:
+        if segment.past(point.id):
+            return ids, True
+        if segment.contains(point.id):
+            did = (point.payload or {}).get("document_id")
+            if did:
+                ids.add(did)
+    return ids, False
+
+
+# Marks a finished segment scan on the page queue
+_SEGMENT_DONE = object()
+
+
+def quantization_config(profile: str | None = None) -> Any:
+    """Collection quantization for a profile; None for "none"."""
+    profile = profile or QUANTIZATION
+    if profile == "none":
+        return None
+    if profile == "int8":
+        return qmodels.ScalarQuantization(
+            scalar=qmodels.ScalarQuantizationConfig(
+                type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=True
+            )
+        )
+    if profile == "binary":
+        return qmodels.BinaryQuantization(
+            binary=qmodels.BinaryQuantizationConfig(always_ram=True)
+        )
+    if profile == "product":
+        return qmodels.ProductQuantization(
+            product=qmodels.ProductQuantizationConfig(
+                compression=qmodels.CompressionRatio(PQ_COMPRESSION), always_ram=True
+            )
+        )
+    raise ValueError(
+        f"Unknown quantization profile {profile!r}; "
+        f"expected one of {', '.join(QUANTIZATION_PROFILES)}"
+    )
+
+
+def quantization_profile(config: Any) -> str:
+    """Profile name of a collection's quantization config."""
+    if config is None:
+        return "none"
+    if getattr(config, "scalar", None) is not None:
+        return "int8"
+    if getattr(config, "binary", None) is not None:
+        return "binary"
+    if getattr(config, "product", None) is not None:
+        return "product"
+    return "none"
+
+
+def quantization_search_params(
+    profile: str | None = None,
+    oversampling: float | None = None,
+    rescore: bool | None = None,
+) -> Any:
+    """Search params for a quantized collection; None when unquantized."""
+    if (profile or QUANTIZATION) == "none":
+        return None
+    return qmodels.SearchParams(
+        quantization=qmodels.QuantizationSearchParams(
+            rescore=SEARCH_RESCORE if rescore is None else rescore,
+            oversampling=SEARCH_OVERSAMPLING if oversampling is None else oversampling,
+        )
+    )
+
+
+def _group_query_kwargs(
+    embedding: list[float],
+    query: str,
+    query_filter: Any,
+    top_k: int,
+    with_vectors: bool = False,
+    hybrid: bool = False,
+) -> dict[str, Any]:
+    """Arguments for query_points_groups: one best chunk per document.
+
+    With ``hybrid`` the dense and BM25 candidates are fetched in the same
+    request and merged server-side with reciprocal rank fusion.
+    ``with_vectors`` returns each hit's vectors for MMR re-ranking.
+    """
+    kwargs: dict[str, Any] = {
+        "group_by": "document_id",
+        "group_size": 1,
+        "limit": top_k,
+        "query_filter": query_filter,
+        "with_payload": _search_payload_fields(),
+        **_timeout_kwargs(SEARCH_TIMEOUT),
+    }
+    if with_vectors:
+        kwargs["with_vectors"] = True
+    search_params = quantization_search_params()
+    if not hybrid:
+        kwargs["query"] = embedding
+        if search_params is not None:
+            kwargs["search_params"] = search_params
+        return kwargs
+    prefetch_limit = max(HYBRID_PREFETCH_LIMIT, top_k * 4)
+    kwargs["prefetch"] = [
+        qmodels.Prefetch(
+            query=embedding,
+            filter=query_filter,
+            limit=prefetch_limit,
+            params=search_params,
+        ),
+        qmodels.Prefetch(
+            query=_sparse_vector(sparse_vectors.query_vector(query)),
+            using=sparse_vectors.SPARSE_VECTOR_NAME,
+            filter=query_filter,
+            limit=prefetch_limit,
+        ),
+    ]
+    kwargs["query"] = qmodels.FusionQuery(fusion=qmodels.Fusion.RRF)
+    return kwargs
+
+
+def _document_filter(document_id: str) -> Any:
+    return qmodels.Filter(
+        must=[
+            qmodels.FieldCondition(
+                key="document_id",
+                match=qmodels.MatchValue(value=document_id),
+            )
+        ]
+    )
+
+
+def _search_filter(filter_tags: list[str] | None, filter_status: str | None) -> Any:
+    conditions: list[Any] = []
+    if filter_tags:
+        conditions.append(
+            qmodels.FieldCondition(
+                key="metadata.tags",
+                match=qmodels.MatchAny(any=filter_tags),
+            )
+        )
+    if filter_status:
+        conditions.append(
+            qmodels.FieldCondition(
+                key="metadata.status",
+                match=qmodels.MatchValue(value=filter_status),
+            )
+        )
+    return qmodels.Filter(must=conditions) if conditions else None
+
+
+def _dense_vector(point: Any) -> list[float] | None:
+    vector = getattr(point, "vector", None)
+    if isinstance(vector, dict):
+        # Hybrid collections name the dense vector "" next to the sparse one
+        vector = vector.get("")
+    return vector if isinstance(vector, list) else None
+
+
+def _diversify(
+    embedding: list[float], results: list[Any], top_k: int, mmr_lambda: float | None
+) -> list[Any]:
+    """MMR pick of ``top_k`` hits; score order when vectors are missing."""
+    vectors = [_dense_vector(hit) for hit in results]
+    if any(vector is None for vector in vectors):
+        return results[:top_k]
+    order = diversity.mmr_select(
+        embedding,
+        vectors,
+        top_k,
+        diversity.MMR_LAMBDA if mmr_lambda is None else mmr_lambda,
+    )
+    return [results[i] for i in order]
+
+
+def _search_fetch_limit(top_k: int, diversify: bool) -> int:
+    return top_k * max(1, diversity.MMR_CANDIDATES) if diversify else top_k
+
+
+def _dedupe_hits(
+    results: Iterable[Any], top_k: int, texts: dict[str, str] | None = None
+) -> list[dict[str, Any]]:
+    """Shape hits for the API, keeping the first hit per document_id.
+
+    Qdrant already groups by document_id; the dedup only guards against a
+    point whose payload lacks one. ``texts`` maps point ids to chunk text
+    when it is kept in PostgreSQL rather than the payload.
+    """
+    seen_docs: dict[str, dict[str, Any]] = {}
+    for hit in results:
+        payload = hit.payload or {}
+        doc_id = payload.get("document_id", "")
+        if not doc_id or doc_id in seen_docs:
+            continue
+        if texts is None:
+            content = payload.get("content") or ""
+        else:
+            content = texts.get(str(hit.id), "")
+        seen_docs[doc_id] = {
+            "document_id": doc_id,
+            "snippet": content[:500],
+            "content": content,
+            "score": hit.score,
+            "metadata": payload.get("metadata") or {},
+        }
+        if len(seen_docs) >= top_k:
+            break
+    return list(seen_docs.values())
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache keyed by (model, sha256 of text).
+
+    A bounded in-process LRU sits in front of the PostgreSQL
+    ``embedding_cache`` table. PostgreSQL errors (including an uninitialized
+    pool) degrade to cache misses so embedding never depends on the cache.
+    Vectors are held as float32 arrays to keep the LRU compact.
+    """
+
+    def __init__(self, max_entries: int = EMBED_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._lru: OrderedDict[tuple[str, str], array] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.pg_hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, keys: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            for key in keys:
+                vec = self._lru.get((model, key))
+                if vec is not None:
+                    self._lru.move_to_end((model, key))
+                    found[key] = vec.tolist()
+            self.memory_hits += len(found)
+
+        remaining = [key for key in dict.fromkeys(keys) if key not in found]
+        if remaining:
+            from_pg = self._pg_get(model, remaining)
+            if from_pg:
+                self._remember(model, from_pg)
+                found.update(from_pg)
+            with self._lock:
+                self.pg_hits += len(from_pg)
+                self.misses += len(remaining) - len(from_pg)
+        return found
+
+    def put_many(self, model: str, embeddings: dict[str, list[float]]) -> None:
+        if not embeddings:
+            return
+        self._remember(model, embeddings)
+        try:
+            from agent_data import pg_store
+
+            pg_store.put_embeddings(model, embeddings)
+        except Exception as exc:
+            logger.debug("Embedding cache write skipped: %s", exc)
+
+    def _pg_get(self, model: str, keys: list[str]) -> dict[str, list[float]]:
+        try:
+            from agent_data import pg_store
+
+            return pg_store.get_embeddings(model, keys)
+        except Exception as exc:
+            logger.debug("Embedding cache read skipped: %s", exc)
+            return {}
+
+    def _remember(self, model: str, embeddings: dict[str, list[float]]) -> None:
+        with self._lock:
+            for key, vec in embeddings.items():
+                self._lru[(model, key)] = array("f", vec)
+                self._lru.move_to_end((model, key))
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self.memory_hits = self.pg_hits = self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.memory_hits + self.pg_hits,
+                "memory_hits": self.memory_hits,
+                "pg_hits": self.pg_hits,
+                "misses": self.misses,
+                "size": len(self._lru),
+            }
+
+
+_embedding_cache = EmbeddingCache()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    return _embedding_cache
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.split())
+
+
+class QueryEmbeddingCache:
+    """Bounded, TTL-aware LRU of query embeddings keyed by (model, query).
+
+    Queries are normalized by collapsing whitespace, and the normalized text
+    is what gets embedded. Concurrent misses for the same key are
+    single-flighted: the first caller embeds, the others wait for its
+    result. Search traffic repeats a handful of strings, so unlike
+    EmbeddingCache nothing is persisted.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = QUERY_CACHE_SIZE,
+        ttl_seconds: float = QUERY_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lru: OrderedDict[tuple[str, str], tuple[float, list[float]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._inflight: dict[tuple[str, str], Future] = {}
+        self._async_inflight: dict[tuple[str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+
+    def get_or_embed(
+        self, model: str, query: str, embed: Callable[[str], list[float]]
+    ) -> list[float]:
+        """Return the cached embedding or compute it once via ``embed(text)``."""
+        key = (model, _normalize_query(query))
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                self.misses += 1
+                leader: Future = Future()
+                self._inflight[key] = leader
+            else:
+                self.coalesced += 1
+        if waiter is not None:
+            return waiter.result()
+
+        try:
+            vector = embed(key[1])
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+            leader.set_exception(exc)
+            raise
+        with self._lock:
+            self._store(key, vector)
+            self._inflight.pop(key, None)
+        leader.set_result(vector)
+        return vector
+
+    async def aget_or_embed(
+        self,
+        model: str,
+        query: str,
+        embed: Callable[[str], Awaitable[list[float]]],
+    ) -> list[float]:
+        """Async counterpart of ``get_or_embed`` for the async store."""
+        key = (model, _normalize_query(query))
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            waiter = self._async_inflight.get(key)
+            if waiter is None:
+                self.misses += 1
+                leader = asyncio.get_running_loop().create_future()
+                self._async_inflight[key] = leader
+            else:
+                self.coalesced += 1
+        if waiter is not None:
+            return await asyncio.shield(waiter)
+
+        try:
+            vector = await embed(key[1])
+        except BaseException as exc:
+            with self._lock:
+                self._async_inflight.pop(key, None)
+            if isinstance(exc, asyncio.CancelledError):
+                leader.cancel()
+            else:
+                leader.set_exception(exc)
+                # Waiters re-raise it; don't warn when there are none
+                leader.exception()
+            raise
+        with self._lock:
+            self._store(key, vector)
+            self._async_inflight.pop(key, None)
+        leader.set_result(vector)
+        return vector
+
+    def _lookup(self, key: tuple[str, str]) -> list[float] | None:
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+        expires_at, vector = entry
+        if expires_at <= self._clock():
+            del self._lru[key]
+            self.expired += 1
+            return None
+        self._lru.move_to_end(key)
+        self.hits += 1
+        return vector
+
+    def _store(self, key: tuple[str, str], vector: list[float]) -> None:
+        self._lru[key] = (self._clock() + self.ttl_seconds, vector)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self.hits = self.misses = self.coalesced = self.expired = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            served = self.hits + self.coalesced
+            total = served + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "expired": self.expired,
+                "size": len(self._lru),
+                "hit_rate": round(served / total, 4) if total else 0.0,
+            }
+
+
+_query_embedding_cache = QueryEmbeddingCache()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    return _query_embedding_cache
+
+
+class _QdrantStoreBase(ABC):
+    """Environment configuration shared by the sync and async stores."""
+
+    backend = "qdrant"
 
     def __init__(self) -> None:
         env = os.getenv("APP_ENV") or os.getenv("ENV") or "test"
@@ -92,39 +1218,117 @@ class QdrantVectorStore:
         self.api_key = os.getenv("QDRANT_API_KEY")
         self.openai_key = os.getenv("OPENAI_API_KEY")
         self.embedding_model = os.getenv("QDRANT_EMBED_MODEL", "text-embedding-3-small")
-        self.enabled = all(
-            [
-                self.collection,
-                self.url,
-                self.api_key,
-                self.openai_key,
-                OpenAI is not None,
-                QdrantClient is not None,
-                qmodels is not None,
-            ]
-        )
-        self._client: QdrantClient | None = None
-        self._openai: OpenAI | None = None
+        self.dimensions = EMBED_DIMENSIONS
+        missing = self._missing_requirements()
+        self.enabled = bool(self.collection) and not missing
         self.embed_calls: int = 0
         self.embed_tokens: int = 0
+        self.embedding_cache = get_embedding_cache()
+        self.query_cache = get_query_embedding_cache()
 
-        if not self.enabled:
-            missing = []
-            if not self.url:
-                missing.append("QDRANT_URL")
-            if not self.api_key:
-                missing.append("QDRANT_API_KEY")
-            if not self.openai_key:
-                missing.append("OPENAI_API_KEY")
-            if OpenAI is None:
-                missing.append("openai-sdk")
-            if QdrantClient is None:
-                missing.append("qdrant-client")
-            if missing:
-                logger.info(
-                    "Qdrant vector store disabled; missing dependencies/env: %s",
-                    ", ".join(missing),
-                )
+        if missing:
+            logger.info(
+                "%s vector store disabled; missing dependencies/env: %s",
+                self.backend.capitalize(),
+                ", ".join(missing),
+            )
+
+    @abstractmethod
+    def _sdk_classes(self) -> tuple[Any, Any]:
+        """Return the (OpenAI, Qdrant) client classes this store drives."""
+
+    def _missing_requirements(self) -> list[str]:
+        openai_cls, qdrant_cls = self._sdk_classes()
+        missing = []
+        if not self.url:
+            missing.append("QDRANT_URL")
+        if not self.api_key:
+            missing.append("QDRANT_API_KEY")
+        if not self.openai_key:
+            missing.append("OPENAI_API_KEY")
+        if openai_cls is None:
+            missing.append("openai-sdk")
+        if qdrant_cls is None or qmodels is None:
+            missing.append("qdrant-client")
+        return missing
+
+    def _openai_kwargs(self) -> dict[str, Any]:
+        # Allow overriding OpenAI base URL for testing
+        openai_base = os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE")
+        kwargs: dict[str, Any] = {"api_key": self.openai_key}
+        if openai_base:
+            kwargs["base_url"] = openai_base
+        return kwargs
+
+    @property
+    def embedding_space(self) -> str:
+        """Cache namespace, so vectors of different sizes never mix."""
+        if self.dimensions:
+            return f"{self.embedding_model}@{self.dimensions}"
+        return self.embedding_model
+
+    @property
+    def token_counter(self) -> TokenCounter:
+        return get_token_counter(self.embedding_model)
+
+    def _query_input(self, query: str) -> str:
+        """Clip a query to the model's input limit; chunks never need this."""
+        clipped = self.token_counter.truncate(query, EMBED_MAX_TOKENS)
+        if clipped != query:
+            logger.warning(
+                "Search query clipped to %d tokens (%d chars dropped)",
+                EMBED_MAX_TOKENS,
+                len(query) - len(clipped),
+            )
+        return clipped
+
+    def _embedding_request(self, texts: list[str]) -> dict[str, Any]:
+        kwargs: dict[str, Any] = {
+            "model": self.embedding_model,
+            "input": list(texts),
+        }
+        if self.dimensions:
+            kwargs["dimensions"] = self.dimensions
+        return kwargs
+
+    def _record_usage(self, response: Any, count: int) -> list[list[float]]:
+        self.embed_calls += 1
+        usage = getattr(response, "usage", None)
+        if usage:
+            self.embed_tokens += getattr(usage, "total_tokens", 0)
+        data = sorted(response.data, key=lambda item: getattr(item, "index", 0))
+        if len(data) != count:
+            raise RuntimeError(
+                f"Embedding count mismatch: sent {count}, got {len(data)}"
+            )
+        vectors = [list(item.embedding) for item in data]
+        sizes = {len(v) for v in vectors}
+        if self.dimensions and sizes - {self.dimensions}:
+            # e.g. a pre-v3 model that ignores the dimensions parameter
+            raise RuntimeError(
+                f"Embedding size mismatch: expected {self.dimensions}, "
+                f"got {sorted(sizes)} from {self.embedding_model}"
+            )
+        return vectors
+
+
+class QdrantVectorStore(_QdrantStoreBase):
+    """Thin wrapper around Qdrant upsert/delete operations."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._client: QdrantClient | None = None
+        self._openai: OpenAI | None = None
+
+    def _sdk_classes(self) -> tuple[Any, Any]:
+        return OpenAI, QdrantClient
+
+    def for_collection(self, collection: str) -> QdrantVectorStore:
+        """A store for another collection that shares this one's clients."""
+        self._ensure_client()
+        clone = copy.copy(self)
+        clone.collection = collection
+        return clone
 
     @sync_retry(service_name="qdrant")
     def _ensure_client(self) -> None:
@@ -132,33 +1336,81 @@ class QdrantVectorStore:
             return
         if self._client is None:
             self._client = QdrantClient(  # type: ignore[call-arg]
-                url=self.url,
-                api_key=self.api_key,
-                timeout=15,
+                **qdrant_client_kwargs(self.url, self.api_key)
             )
         if self._openai is None:
-            # Allow overriding OpenAI base URL for testing
-            openai_base = os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE")
-            kwargs = {"api_key": self.openai_key}
-            if openai_base:
-                kwargs["base_url"] = openai_base
-            self._openai = OpenAI(**kwargs)  # type: ignore[arg-type]
+            self._openai = OpenAI(**self._openai_kwargs())  # type: ignore[arg-type]
+
+    def _hybrid_enabled(self) -> bool:
+        """True when this store's collection has the BM25 sparse vector."""
+        if not HYBRID_SEARCH:
+            return False
+        if self.collection not in _sparse_support:
+            _sparse_support[self.collection] = _has_sparse_vector(
+                self._qdrant_collection_info()
+            )
+        return _sparse_support[self.collection]
+
+    @sync_retry(service_name="qdrant")
+    def _qdrant_collection_info(self) -> Any:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        return self._client.get_collection(self.collection)
 
-    @sync_retry(service_name="openai")
     def _embed(self, text: str) -> list[float]:
+        return self._embed_texts([text])[0]
+
+    @sync_retry(service_name="openai")
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed several texts in one OpenAI request, preserving input order."""
         self._ensure_client()
         if not self.enabled or self._openai is None:
             raise RuntimeError("Vector store not enabled")
-        truncated = text[:6000]
-        response = self._openai.embeddings.create(
-            model=self.embedding_model,
-            input=truncated,
-        )
-        self.embed_calls += 1
-        usage = getattr(response, "usage", None)
-        if usage:
-            self.embed_tokens += getattr(usage, "total_tokens", 0)
-        return list(response.data[0].embedding)
+        response = self._openai.embeddings.create(**self._embedding_request(texts))
+        return self._record_usage(response, len(texts))
+
+    def _embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Embed many texts using as few OpenAI requests as the limits allow.
+
+        Texts already in the embedding cache are not sent. The rest are
+        grouped by EMBED_BATCH_SIZE and EMBED_BATCH_TOKENS. When OpenAI
+        rejects a batch because of its payload, the batch is split in half
+        and retried so one bad chunk cannot fail its neighbours; only a
+        single input that still fails is raised.
+        """
+        keys = [_content_hash(text) for text in texts]
+        vectors = self.embedding_cache.get_many(self.embedding_space, keys)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing:
+            text_by_key = dict(zip(keys, texts, strict=True))
+            to_embed = [text_by_key[key] for key in missing]
+            fresh: list[list[float]] = []
+            for batch in _batch_inputs(
+                to_embed,
+                EMBED_BATCH_SIZE,
+                EMBED_BATCH_TOKENS,
+                self.token_counter.count,
+            ):
+                fresh.extend(self._embed_batch_split_on_error(batch))
+            new_vectors = dict(zip(missing, fresh, strict=True))
+            self.embedding_cache.put_many(self.embedding_space, new_vectors)
+            vectors.update(new_vectors)
+        return [vectors[key] for key in keys]
+
+    def _embed_batch_split_on_error(self, texts: list[str]) -> list[list[float]]:
+        try:
+            return self._embed_batch(texts)
+        except Exception as exc:
+            if len(texts) == 1 or not _is_input_error(exc):
+                raise
+            logger.warning(
+                "Embedding batch of %d rejected (%s); splitting", len(texts), exc
+            )
+            mid = len(texts) // 2
+            return self._embed_batch_split_on_error(
+                texts[:mid]
+            ) + self._embed_batch_split_on_error(texts[mid:])
 
     def upsert_document(
         self,
@@ -171,9 +1423,18 @@ class QdrantVectorStore:
     ) -> VectorSyncResult:
         """Upsert document with automatic chunking for long content.
 
-        Documents longer than CHUNK_SIZE are split into overlapping chunks.
+        Content is split into chunks of at most CHUNK_TOKENS model tokens
+        along markdown structure (see _chunk_text); nothing is truncated.
         Each chunk gets a unique point_id but shares the same document_id
         in metadata for retrieval grouping.
+
+        Re-indexing is incremental: each point stores the hash of its chunk
+        text, so only new or changed chunks are embedded, unchanged chunks
+        get a payload rewrite only when their metadata moved, and points
+        beyond the new chunk count are deleted.
+
+        With QDRANT_CHUNK_TEXT_STORE=pg the chunk text and its character span
+        go to the PostgreSQL kb_chunks table instead of the payload.
         """
         if not self.enabled:
             return VectorSyncResult(status="skipped")
@@ -183,48 +1444,32 @@ class QdrantVectorStore:
             if self._client is None:
                 raise RuntimeError("Qdrant client unavailable")
 
-            # Split content into chunks
-            chunks = _split_text(content, CHUNK_SIZE, CHUNK_OVERLAP)
-            total_chunks = len(chunks)
-
-            # Preserve original metadata with source info
-            base_metadata = metadata or {}
-            if "source_id" not in base_metadata and "title" not in base_metadata:
-                # Ensure source tracking for citation integrity
-                base_metadata["source_id"] = document_id
-
-            points: list[Any] = []
-            for idx, chunk_text in enumerate(chunks):
-                embedding = self._embed(chunk_text)
+            existing = self._qdrant_get_document_payloads(document_id)
+            plan = _plan_chunk_updates(
+                document_id=document_id,
+                content=content,
+                metadata=metadata,
+                parent_id=parent_id,
+                is_human_readable=is_human_readable,
+                existing=existing,
+                counter=self.token_counter,
+            )
 
-                # Build payload with chunk metadata
-                payload = {
-                    "content": chunk_text,  # Required by langroid Document class
-                    "document_id": document_id,
-                    "metadata": {
-                        **base_metadata,
-                        "chunk_index": idx,
-                        "total_chunks": total_chunks,
-                    },
-                    "parent_id": parent_id,
-                    "is_human_readable": is_human_readable,
-                }
-
-                # Generate unique point_id for each chunk
-                # Format: uuid5(document_id:chunk_idx) for deterministic IDs
-                chunk_id = f"{document_id}:chunk:{idx}"
-                point_id = str(uuid5(NAMESPACE_DNS, chunk_id))
-
-                points.append(
-                    qmodels.PointStruct(
-                        id=point_id,
-                        vector=embedding,
-                        payload=payload,
-                    )
+            if plan.changed:
+                # One OpenAI round trip per batch of chunks instead of per chunk
+                embeddings = self._embed_texts([text for _, text, _ in plan.changed])
+            # Texts first, so a search never meets a point without one
+            _write_chunk_texts(plan.rows)
+            if plan.changed:
+                # Batch upsert changed chunks (with retry on transient errors)
+                self._qdrant_upsert(
+                    _build_points(plan.changed, embeddings, self._hybrid_enabled())
                 )
-
-            # Batch upsert all chunks (with retry on transient errors)
-            self._qdrant_upsert(points)
+            if plan.payload_only:
+                self._qdrant_overwrite_payloads(plan.payload_only)
+            if plan.stale_ids:
+                self._qdrant_delete_points(plan.stale_ids)
+                _delete_chunk_texts(plan.stale_ids)
 
             duration_ms = int((time.monotonic() - t0) * 1000)
             logger.info(
@@ -232,11 +1477,14 @@ class QdrantVectorStore:
                 extra={
                     "action": "upsert",
                     "document_id": document_id,
-                    "chunks": total_chunks,
+                    "chunks": plan.total_chunks,
+                    "chunks_embedded": len(plan.changed),
+                    "chunks_unchanged": plan.total_chunks - len(plan.changed),
+                    "chunks_deleted": len(plan.stale_ids),
                     "duration_ms": duration_ms,
                 },
             )
-            return VectorSyncResult(status="ready", chunks_created=total_chunks)
+            return VectorSyncResult(status="ready", chunks_created=plan.total_chunks)
         except Exception as exc:  # pragma: no cover - network/SDK errors
             duration_ms = int((time.monotonic() - t0) * 1000)
             logger.error(
@@ -251,6 +1499,201 @@ class QdrantVectorStore:
             health_registry.mark_unhealthy("qdrant", str(exc))
             return VectorSyncResult(status="error", error=str(exc))
 
+    def upsert_documents(
+        self, documents: Iterable[VectorDocument]
+    ) -> dict[str, VectorSyncResult]:
+        """Upsert many documents through a staged pipeline.
+
+        1. Chunk every document and diff it against its indexed payloads.
+        2. Embed changed chunks in batches that span documents.
+        3. Upsert points in batches of BULK_UPSERT_POINTS with wait=False,
+           then send the final batch with wait=True once the others are
+           acknowledged, as a consistency barrier.
+        4. Apply payload rewrites and stale-chunk deletes.
+
+        Stages 1-3 run on at most BULK_CONCURRENCY threads. A failure only
+        fails the documents it touched. Returns a result per document_id, in
+        input order; a repeated document_id keeps its last entry.
+        """
+        docs = list({doc.document_id: doc for doc in documents}.values())
+        if not self.enabled:
+            return {doc.document_id: VectorSyncResult(status="skipped") for doc in docs}
+        t0 = time.monotonic()
+        try:
+            self._ensure_client()
+            if self._client is None:
+                raise RuntimeError("Qdrant client unavailable")
+            hybrid = self._hybrid_enabled()
+        except Exception as exc:
+            health_registry.mark_unhealthy("qdrant", str(exc))
+            return {
+                doc.document_id: VectorSyncResult(status="error", error=str(exc))
+                for doc in docs
+            }
+
+        errors: dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=max(1, BULK_CONCURRENCY)) as pool:
+            plans = self._bulk_plan(docs, pool, errors)
+            embeddings = self._bulk_embed(plans, pool, errors)
+            self._bulk_write(plans, embeddings, pool, errors, hybrid)
+
+        results: dict[str, VectorSyncResult] = {}
+        for doc in docs:
+            if doc.document_id in errors:
+                results[doc.document_id] = VectorSyncResult(
+                    status="error", error=errors[doc.document_id]
+                )
+            else:
+                results[doc.document_id] = VectorSyncResult(
+                    status="ready",
+                    chunks_created=plans[doc.document_id].total_chunks,
+                )
+        logger.info(
+            "vector_sync",
+            extra={
+                "action": "bulk_upsert",
+                "documents": len(docs),
+                "errors": len(errors),
+                "chunks_embedded": sum(len(p.changed) for p in plans.values()),
+                "duration_ms": int((time.monotonic() - t0) * 1000),
+            },
+        )
+        if errors:
+            health_registry.mark_unhealthy("qdrant", next(iter(errors.values())))
+        return results
+
+    def _bulk_plan(
+        self,
+        docs: list[VectorDocument],
+        pool: ThreadPoolExecutor,
+        errors: dict[str, str],
+    ) -> dict[str, _ChunkPlan]:
+        def plan(doc: VectorDocument) -> _ChunkPlan:
+            return _plan_chunk_updates(
+                document_id=doc.document_id,
+                content=doc.content,
+                metadata=doc.metadata,
+                parent_id=doc.parent_id,
+                is_human_readable=doc.is_human_readable,
+                existing=self._qdrant_get_document_payloads(doc.document_id),
+                counter=self.token_counter,
+            )
+
+        futures = {doc.document_id: pool.submit(plan, doc) for doc in docs}
+        plans: dict[str, _ChunkPlan] = {}
+        for document_id, future in futures.items():
+            try:
+                plans[document_id] = future.result()
+            except Exception as exc:
+                errors[document_id] = str(exc)
+        return plans
+
+    def _bulk_embed(
+        self,
+        plans: dict[str, _ChunkPlan],
+        pool: ThreadPoolExecutor,
+        errors: dict[str, str],
+    ) -> dict[str, list[list[float]]]:
+        def embed(document_ids: list[str]) -> dict[str, list[list[float]]]:
+            texts = [text for d in document_ids for _, text, _ in plans[d].changed]
+            try:
+                vectors = self._embed_texts(texts)
+            except Exception as exc:
+                if len(document_ids) == 1:
+                    errors[document_ids[0]] = str(exc)
+                    return {}
+                # Retry one document at a time so only the bad one fails
+                out: dict[str, list[list[float]]] = {}
+                for document_id in document_ids:
+                    out.update(embed([document_id]))
+                return out
+            out, start = {}, 0
+            for document_id in document_ids:
+                end = start + len(plans[document_id].changed)
+                out[document_id] = vectors[start:end]
+                start = end
+            return out
+
+        # Pack documents into groups of about one embedding request each
+        groups: list[list[str]] = [[]]
+        size = 0
+        for document_id, plan in plans.items():
+            if not plan.changed:
+                continue
+            if size >= EMBED_BATCH_SIZE:
+                groups.append([])
+                size = 0
+            groups[-1].append(document_id)
+            size += len(plan.changed)
+
+        embeddings: dict[str, list[list[float]]] = {}
+        for future in [pool.submit(embed, group) for group in groups if group]:
+            embeddings.update(future.result())
+        return embeddings
+
+    def _bulk_write(
+        self,
+        plans: dict[str, _ChunkPlan],
+        embeddings: dict[str, list[list[float]]],
+        pool: ThreadPoolExecutor,
+        errors: dict[str, str],
+        hybrid: bool,
+    ) -> None:
+        if CHUNK_TEXT_STORE == "pg":
+            # Texts first, so a search never meets a point without one
+            rows = [(d, row) for d in plans if d not in errors for row in plans[d].rows]
+            for start in range(0, len(rows), BULK_UPSERT_POINTS):
+                batch = rows[start : start + BULK_UPSERT_POINTS]
+                try:
+                    _write_chunk_texts([row for _, row in batch])
+                except Exception as exc:
+                    for document_id, _ in batch:
+                        errors[document_id] = str(exc)
+
+        batches: list[tuple[list[Any], set[str]]] = []
+        for document_id, vectors in embeddings.items():
+            if document_id in errors:
+                continue
+            for point in _build_points(plans[document_id].changed, vectors, hybrid):
+                if not batches or len(batches[-1][0]) >= BULK_UPSERT_POINTS:
+                    batches.append(([], set()))
+                batches[-1][0].append(point)
+                batches[-1][1].add(document_id)
+
+        def upsert(batch: tuple[list[Any], set[str]], wait: bool) -> None:
+            points, document_ids = batch
+            try:
+                self._qdrant_upsert(points, wait=wait)
+            except Exception as exc:
+                for document_id in document_ids:
+                    errors[document_id] = str(exc)
+
+        if batches:
+            *queued, barrier = batches
+            for future in [pool.submit(upsert, b, False) for b in queued]:
+                future.result()
+            upsert(barrier, True)
+
+        # Only touch unchanged or stale chunks of documents that fully succeeded
+        ok = [d for d in plans if d not in errors]
+        payloads = [(d, item) for d in ok for item in plans[d].payload_only]
+        for start in range(0, len(payloads), BULK_UPSERT_POINTS):
+            batch = payloads[start : start + BULK_UPSERT_POINTS]
+            try:
+                self._qdrant_overwrite_payloads([item for _, item in batch])
+            except Exception as exc:
+                for document_id, _ in batch:
+                    errors[document_id] = str(exc)
+        stale = [(d, point_id) for d in ok for point_id in plans[d].stale_ids]
+        for start in range(0, len(stale), BULK_UPSERT_POINTS):
+            batch = stale[start : start + BULK_UPSERT_POINTS]
+            try:
+                self._qdrant_delete_points([point_id for _, point_id in batch])
+                _delete_chunk_texts([point_id for _, point_id in batch])
+            except Exception as exc:
+                for document_id, _ in batch:
+                    errors[document_id] = str(exc)
+
     def search(
         self,
         *,
@@ -258,10 +1701,14 @@ class QdrantVectorStore:
         top_k: int = 5,
         filter_tags: list[str] | None = None,
         filter_status: str | None = None,
+        diversify: bool = False,
+        mmr_lambda: float | None = None,
     ) -> list[dict[str, Any]]:
         """Search for documents using vector similarity.
 
-        Returns a list of dicts with keys: document_id, snippet, score, metadata.
+        Returns a list of dicts with keys: document_id, snippet, content (the
+        full chunk), score, metadata. ``diversify`` fetches more candidates
+        with their vectors and re-ranks them with MMR (see diversity.py).
         """
         if not self.enabled:
             return []
@@ -270,44 +1717,22 @@ class QdrantVectorStore:
             if self._client is None:
                 raise RuntimeError("Qdrant client unavailable")
 
-            embedding = self._embed(query)
-
-            conditions: list[Any] = []
-            if filter_tags:
-                conditions.append(
-                    qmodels.FieldCondition(
-                        key="metadata.tags",
-                        match=qmodels.MatchAny(any=filter_tags),
-                    )
-                )
-            if filter_status:
-                conditions.append(
-                    qmodels.FieldCondition(
-                        key="metadata.status",
-                        match=qmodels.MatchValue(value=filter_status),
-                    )
-                )
-            query_filter = qmodels.Filter(must=conditions) if conditions else None
-
-            results = self._qdrant_search(embedding, query_filter, top_k * 2)
-
-            # Deduplicate by document_id (multiple chunks may match)
-            seen_docs: dict[str, dict[str, Any]] = {}
-            for hit in results:
-                payload = hit.payload or {}
-                doc_id = payload.get("document_id", "")
-                if not doc_id or doc_id in seen_docs:
-                    continue
-                seen_docs[doc_id] = {
-                    "document_id": doc_id,
-                    "snippet": (payload.get("content") or "")[:500],
-                    "score": hit.score,
-                    "metadata": payload.get("metadata") or {},
-                }
-                if len(seen_docs) >= top_k:
-                    break
-
-            return list(seen_docs.values())
+            embedding = self.query_cache.get_or_embed(
+                self.embedding_space,
+                query,
+                lambda text: self._embed_batch([self._query_input(text)])[0],
+            )
+            query_filter = _search_filter(filter_tags, filter_status)
+            results = self._qdrant_search_groups(
+                embedding,
+                query,
+                query_filter,
+                _search_fetch_limit(top_k, diversify),
+                with_vectors=diversify,
+            )
+            if diversify:
+                results = _diversify(embedding, results, top_k, mmr_lambda)
+            return _dedupe_hits(results, top_k, _fetch_chunk_texts(results))
         except Exception as exc:
             logger.error("Vector search failed: %s", exc)
             health_registry.mark_unhealthy("qdrant", str(exc))
@@ -342,6 +1767,7 @@ class QdrantVectorStore:
                 raise RuntimeError("Qdrant client unavailable")
 
             self._qdrant_delete(document_id)
+            _delete_chunk_texts(document_id=document_id)
             duration_ms = int((time.monotonic() - t0) * 1000)
             logger.info(
                 "vector_sync",
@@ -369,24 +1795,35 @@ class QdrantVectorStore:
     # -- Retryable Qdrant SDK helpers --
 
     @sync_retry(service_name="qdrant")
-    def _qdrant_upsert(self, points: list[Any]) -> None:
+    def _qdrant_upsert(self, points: list[Any], wait: bool = True) -> None:
         if self._client is None:
             raise RuntimeError("Qdrant client unavailable")
-        self._client.upsert(collection_name=self.collection, points=points, wait=True)
+        self._client.upsert(collection_name=self.collection, points=points, wait=wait)
 
     @sync_retry(service_name="qdrant")
-    def _qdrant_search(
-        self, embedding: list[float], query_filter: Any, limit: int
+    def _qdrant_search_groups(
+        self,
+        embedding: list[float],
+        query: str,
+        query_filter: Any,
+        top_k: int,
+        with_vectors: bool = False,
     ) -> list[Any]:
+        """Best-scoring chunk of each of the top_k documents, in score order."""
         if self._client is None:
             raise RuntimeError("Qdrant client unavailable")
-        return self._client.search(
+        result = self._client.query_points_groups(
             collection_name=self.collection,
-            query_vector=embedding,
-            limit=limit,
-            query_filter=query_filter,
-            with_payload=True,
+            **_group_query_kwargs(
+                embedding,
+                query,
+                query_filter,
+                top_k,
+                with_vectors,
+                hybrid=self._hybrid_enabled(),
+            ),
         )
+        return [group.hits[0] for group in result.groups if group.hits]
 
     @sync_retry(service_name="qdrant")
     def _qdrant_count(self) -> int:
@@ -399,14 +1836,7 @@ class QdrantVectorStore:
     def _qdrant_delete(self, document_id: str) -> None:
         if self._client is None:
             raise RuntimeError("Qdrant client unavailable")
-        filter_condition = qmodels.Filter(
-            must=[
-                qmodels.FieldCondition(
-                    key="document_id",
-                    match=qmodels.MatchValue(value=document_id),
-                )
-            ]
-        )
+        filter_condition = _document_filter(document_id)
         self._client.delete(
             collection_name=self.collection,
             points_selector=qmodels.FilterSelector(filter=filter_condition),
@@ -414,19 +1844,66 @@ class QdrantVectorStore:
         )
 
     @sync_retry(service_name="qdrant")
-    def _qdrant_set_payload(
-        self, document_id: str, payload_update: dict[str, Any]
+    def _qdrant_delete_points(self, point_ids: list[str]) -> None:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        self._client.delete(
+            collection_name=self.collection,
+            points_selector=qmodels.PointIdsList(points=point_ids),
+            wait=True,
+        )
+
+    @sync_retry(service_name="qdrant")
+    def _qdrant_overwrite_payloads(
+        self, payloads: list[tuple[str, dict[str, Any]]]
     ) -> None:
         if self._client is None:
             raise RuntimeError("Qdrant client unavailable")
-        filter_condition = qmodels.Filter(
-            must=[
-                qmodels.FieldCondition(
-                    key="document_id",
-                    match=qmodels.MatchValue(value=document_id),
+        self._client.batch_update_points(
+            collection_name=self.collection,
+            update_operations=[
+                qmodels.OverwritePayloadOperation(
+                    overwrite_payload=qmodels.SetPayload(
+                        payload=payload, points=[point_id]
+                    )
                 )
-            ]
+                for point_id, payload in payloads
+            ],
+            wait=True,
         )
+
+    @sync_retry(service_name="qdrant")
+    def _qdrant_get_document_payloads(self, document_id: str) -> dict[str, dict]:
+        """Return ``{point_id: payload}`` for every indexed chunk of a document."""
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        filter_condition = _document_filter(document_id)
+        payloads: dict[str, dict] = {}
+        offset = None
+        while True:
+            points, next_offset = self._client.scroll(
+                collection_name=self.collection,
+                scroll_filter=filter_condition,
+                limit=100,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+                **_timeout_kwargs(SCROLL_TIMEOUT),
+            )
+            for point in points:
+                payloads[str(point.id)] = point.payload or {}
+            if next_offset is None:
+                break
+            offset = next_offset
+        return payloads
+
+    @sync_retry(service_name="qdrant")
+    def _qdrant_set_payload(
+        self, document_id: str, payload_update: dict[str, Any]
+    ) -> None:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        filter_condition = _document_filter(document_id)
         self._client.set_payload(
             collection_name=self.collection,
             payload=payload_update,
@@ -480,15 +1957,9 @@ class QdrantVectorStore:
             raise RuntimeError("Qdrant client unavailable")
         result = self._client.count(
             collection_name=self.collection,
-            count_filter=qmodels.Filter(
-                must=[
-                    qmodels.FieldCondition(
-                        key="document_id",
-                        match=qmodels.MatchValue(value=document_id),
-                    )
-                ]
-            ),
+            count_filter=_document_filter(document_id),
             exact=True,
+            **_timeout_kwargs(COUNT_TIMEOUT),
         )
         return result.count
 
@@ -505,66 +1976,879 @@ class QdrantVectorStore:
             logger.error("Vector count by doc failed for %s: %s", document_id, exc)
             return -1
 
-    def list_document_ids(self) -> set[str]:
-        """Scroll through all points and return unique document_ids."""
-        if not self.enabled:
-            return set()
-        try:
-            self._ensure_client()
-            if self._client is None:
-                return set()
-            doc_ids: set[str] = set()
-            offset = None
-            while True:
-                points, next_offset = self._client.scroll(
-                    collection_name=self.collection,
-                    limit=100,
-                    offset=offset,
-                    with_payload=["document_id"],
-                )
-                for point in points:
-                    did = (point.payload or {}).get("document_id")
-                    if did:
-                        doc_ids.add(did)
-                if next_offset is None:
-                    break
-                offset = next_offset
-            return doc_ids
-        except Exception as exc:
-            logger.error("Failed to list document IDs from Qdrant: %s", exc)
-            return set()
-
-
-_cached_store: QdrantVectorStore | None = None
-
+    @sync_retry(service_name="qdrant")
+    def _qdrant_scroll_document_ids(
+        self, offset: Any, limit: int
+    ) -> tuple[list[Any], Any]:
+        """One scroll page carrying only the document_id payload key."""
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        return self._client.scroll(
+            collection_name=self.collection,
+            limit=limit,
+            offset=offset,
+            with_payload=["document_id"],
+            with_vectors=False,
+            **_timeout_kwargs(SCROLL_TIMEOUT),
+        )
+
+    def _scan_segment(self, segment: _ScrollSegment, limit: int) -> Iterator[set[str]]:
+        offset = segment.offset
+        while True:
+            points, next_offset = self._qdrant_scroll_document_ids(offset, limit)
+            ids, ended = _page_document_ids(points, segment)
+            if ids:
+                yield ids
+            if ended or next_offset is None or segment.past(next_offset):
+                return
+            offset = next_offset
+
+    def iter_document_ids(
+        self, page_size: int | None = None, segments: int | None = None
+    ) -> Iterator[str]:
+        """Yield every distinct document_id in the collection once.
+
+        ``segments`` disjoint point-id ranges are scrolled concurrently,
+        ``page_size`` points per request, fetching only the document_id
+        payload key. Only the ids already yielded are held, so memory grows
+        with documents rather than points. Qdrant errors propagate.
+        """
+        if not self.enabled:
+            return
+        self._ensure_client()
+        if self._client is None:
+            return
+        limit = page_size or SCROLL_PAGE_SIZE
+        ranges = _scroll_segments(segments or SCROLL_SEGMENTS)
+        seen: set[str] = set()
+        if len(ranges) == 1:
+            for ids in self._scan_segment(ranges[0], limit):
+                yield from ids - seen
+                seen |= ids
+            return
+
+        pages: queue.Queue = queue.Queue(maxsize=len(ranges) * 2)
+        stop = threading.Event()
+
+        def offer(item: Any) -> None:
+            # Bounded so a slow consumer throttles the scans
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def scan(segment: _ScrollSegment) -> None:
+            try:
+                for ids in self._scan_segment(segment, limit):
+                    if stop.is_set():
+                        return
+                    offer(ids)
+                offer(_SEGMENT_DONE)
+            except Exception as exc:
+                offer(exc)
+
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            for segment in ranges:
+                pool.submit(scan, segment)
+            try:
+                remaining = len(ranges)
+                while remaining:
+                    item = pages.get()
+                    if item is _SEGMENT_DONE:
+                        remaining -= 1
+                        continue
+                    if isinstance(item, Exception):
+                        raise item
+                    yield from item - seen
+                    seen |= item
+            finally:
+                stop.set()
+
+    def list_document_ids(self) -> set[str]:
+        """Unique document_ids in the collection (see iter_document_ids)."""
+        try:
+            return set(self.iter_document_ids())
+        except Exception as exc:
+            logger.error("Failed to list document IDs from Qdrant: %s", exc)
+            return set()
+
+
+class AsyncQdrantVectorStore(_QdrantStoreBase):
+    """Asyncio counterpart of QdrantVectorStore for the async API routes.
+
+    Same public API, backed by AsyncQdrantClient and AsyncOpenAI, so a slow
+    embedding or Qdrant call no longer blocks the event loop. Chunking,
+    incremental diffing and the embedding cache are shared with the sync
+    store; cache lookups that may reach PostgreSQL run in a worker thread.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._client: AsyncQdrantClient | None = None
+        self._openai: AsyncOpenAI | None = None
+
+    def _sdk_classes(self) -> tuple[Any, Any]:
+        return AsyncOpenAI, AsyncQdrantClient
+
+    def _ensure_client(self) -> None:
+        # Constructing the async clients does no I/O; connections open lazily
+        if not self.enabled:
+            return
+        if self._client is None:
+            self._client = AsyncQdrantClient(  # type: ignore[call-arg]
+                **qdrant_client_kwargs(self.url, self.api_key)
+            )
+        if self._openai is None:
+            self._openai = AsyncOpenAI(**self._openai_kwargs())  # type: ignore[arg-type]
+
+    async def _hybrid_enabled(self) -> bool:
+        """See QdrantVectorStore._hybrid_enabled."""
+        if not HYBRID_SEARCH:
+            return False
+        if self.collection not in _sparse_support:
+            _sparse_support[self.collection] = _has_sparse_vector(
+                await self._qdrant_collection_info()
+            )
+        return _sparse_support[self.collection]
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_collection_info(self) -> Any:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        return await self._client.get_collection(self.collection)
+
+    async def _embed(self, text: str) -> list[float]:
+        return (await self._embed_texts([text]))[0]
+
+    async def _embed_query(self, text: str) -> list[float]:
+        return (await self._embed_batch([self._query_input(text)]))[0]
+
+    @async_retry(service_name="openai")
+    async def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed several texts in one OpenAI request, preserving input order."""
+        self._ensure_client()
+        if not self.enabled or self._openai is None:
+            raise RuntimeError("Vector store not enabled")
+        response = await self._openai.embeddings.create(
+            **self._embedding_request(texts)
+        )
+        return self._record_usage(response, len(texts))
+
+    async def _embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """See QdrantVectorStore._embed_texts."""
+        keys = [_content_hash(text) for text in texts]
+        vectors = await asyncio.to_thread(
+            self.embedding_cache.get_many, self.embedding_space, keys
+        )
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing:
+            text_by_key = dict(zip(keys, texts, strict=True))
+            to_embed = [text_by_key[key] for key in missing]
+            fresh: list[list[float]] = []
+            for batch in _batch_inputs(
+                to_embed,
+                EMBED_BATCH_SIZE,
+                EMBED_BATCH_TOKENS,
+                self.token_counter.count,
+            ):
+                fresh.extend(await self._embed_batch_split_on_error(batch))
+            new_vectors = dict(zip(missing, fresh, strict=True))
+            await asyncio.to_thread(
+                self.embedding_cache.put_many, self.embedding_space, new_vectors
+            )
+            vectors.update(new_vectors)
+        return [vectors[key] for key in keys]
+
+    async def _embed_batch_split_on_error(self, texts: list[str]) -> list[list[float]]:
+        try:
+            return await self._embed_batch(texts)
+        except Exception as exc:
+            if len(texts) == 1 or not _is_input_error(exc):
+                raise
+            logger.warning(
+                "Embedding batch of %d rejected (%s); splitting", len(texts), exc
+            )
+            mid = len(texts) // 2
+            return await self._embed_batch_split_on_error(
+                texts[:mid]
+            ) + await self._embed_batch_split_on_error(texts[mid:])
+
+    async def upsert_document(
+        self,
+        *,
+        document_id: str,
+        content: str,
+        metadata: dict[str, Any] | None = None,
+        parent_id: str | None = None,
+        is_human_readable: bool = False,
+    ) -> VectorSyncResult:
+        """See QdrantVectorStore.upsert_document."""
+        if not self.enabled:
+            return VectorSyncResult(status="skipped")
+        t0 = time.monotonic()
+        try:
+            self._ensure_client()
+            if self._client is None:
+                raise RuntimeError("Qdrant client unavailable")
+
+            existing = await self._qdrant_get_document_payloads(document_id)
+            # Tokenising and hashing a large body would stall the event loop
+            plan = await asyncio.to_thread(
+                _plan_chunk_updates,
+                document_id=document_id,
+                content=content,
+                metadata=metadata,
+                parent_id=parent_id,
+                is_human_readable=is_human_readable,
+                existing=existing,
+                counter=self.token_counter,
+            )
+
+            if plan.changed:
+                embeddings = await self._embed_texts(
+                    [text for _, text, _ in plan.changed]
+                )
+            if CHUNK_TEXT_STORE == "pg":
+                await asyncio.to_thread(_write_chunk_texts, plan.rows)
+            if plan.changed:
+                hybrid = await self._hybrid_enabled()
+                await self._qdrant_upsert(
+                    _build_points(plan.changed, embeddings, hybrid)
+                )
+            if plan.payload_only:
+                await self._qdrant_overwrite_payloads(plan.payload_only)
+            if plan.stale_ids:
+                await self._qdrant_delete_points(plan.stale_ids)
+                if CHUNK_TEXT_STORE == "pg":
+                    await asyncio.to_thread(_delete_chunk_texts, plan.stale_ids)
+
+            duration_ms = int((time.monotonic() - t0) * 1000)
+            logger.info(
+                "vector_sync",
+                extra={
+                    "action": "upsert",
+                    "document_id": document_id,
+                    "chunks": plan.total_chunks,
+                    "chunks_embedded": len(plan.changed),
+                    "chunks_unchanged": plan.total_chunks - len(plan.changed),
+                    "chunks_deleted": len(plan.stale_ids),
+                    "duration_ms": duration_ms,
+                },
+            )
+            return VectorSyncResult(status="ready", chunks_created=plan.total_chunks)
+        except Exception as exc:  # pragma: no cover - network/SDK errors
+            duration_ms = int((time.monotonic() - t0) * 1000)
+            logger.error(
+                "vector_sync_error",
+                extra={
+                    "action": "upsert",
+                    "document_id": document_id,
+                    "error": str(exc),
+                    "duration_ms": duration_ms,
+                },
+            )
+            health_registry.mark_unhealthy("qdrant", str(exc))
+            return VectorSyncResult(status="error", error=str(exc))
+
+    async def search(
+        self,
+        *,
+        query: str,
+        top_k: int = 5,
+        filter_tags: list[str] | None = None,
+        filter_status: str | None = None,
+        diversify: bool = False,
+        mmr_lambda: float | None = None,
+    ) -> list[dict[str, Any]]:
+        """See QdrantVectorStore.search."""
+        if not self.enabled:
+            return []
+        try:
+            self._ensure_client()
+            if self._client is None:
+                raise RuntimeError("Qdrant client unavailable")
+
+            embedding = await self.query_cache.aget_or_embed(
+                self.embedding_space, query, self._embed_query
+            )
+            query_filter = _search_filter(filter_tags, filter_status)
+            results = await self._qdrant_search_groups(
+                embedding,
+                query,
+                query_filter,
+                _search_fetch_limit(top_k, diversify),
+                with_vectors=diversify,
+            )
+            if diversify:
+                results = _diversify(embedding, results, top_k, mmr_lambda)
+            texts = None
+            if CHUNK_TEXT_STORE == "pg":
+                texts = await asyncio.to_thread(_fetch_chunk_texts, results)
+            return _dedupe_hits(results, top_k, texts)
+        except Exception as exc:
+            logger.error("Vector search failed: %s", exc)
+            health_registry.mark_unhealthy("qdrant", str(exc))
+            return []
+
+    async def count(self) -> int:
+        """Return the number of vectors in the collection."""
+        if not self.enabled:
+            return -1
+        try:
+            self._ensure_client()
+            if self._client is None:
+                return -1
+            return await self._qdrant_count()
+        except Exception as exc:
+            logger.error("Vector count failed: %s", exc)
+            health_registry.mark_unhealthy("qdrant", str(exc))
+            return -1
+
+    async def delete_document(self, document_id: str) -> VectorSyncResult:
+        """See QdrantVectorStore.delete_document."""
+        if not self.enabled:
+            return VectorSyncResult(status="skipped")
+        t0 = time.monotonic()
+        try:
+            self._ensure_client()
+            if self._client is None:
+                raise RuntimeError("Qdrant client unavailable")
+
+            await self._qdrant_delete(document_id)
+            if CHUNK_TEXT_STORE == "pg":
+                await asyncio.to_thread(_delete_chunk_texts, document_id=document_id)
+            duration_ms = int((time.monotonic() - t0) * 1000)
+            logger.info(
+                "vector_sync",
+                extra={
+                    "action": "delete",
+                    "document_id": document_id,
+                    "duration_ms": duration_ms,
+                },
+            )
+            return VectorSyncResult(status="deleted")
+        except Exception as exc:  # pragma: no cover
+            duration_ms = int((time.monotonic() - t0) * 1000)
+            logger.error(
+                "vector_sync_error",
+                extra={
+                    "action": "delete",
+                    "document_id": document_id,
+                    "error": str(exc),
+                    "duration_ms": duration_ms,
+                },
+            )
+            health_registry.mark_unhealthy("qdrant", str(exc))
+            return VectorSyncResult(status="error", error=str(exc))
+
+    async def update_metadata(
+        self, document_id: str, parent_id: str | None = None
+    ) -> VectorSyncResult:
+        """See QdrantVectorStore.update_metadata."""
+        if not self.enabled:
+            return VectorSyncResult(status="skipped")
+        try:
+            self._ensure_client()
+            if self._client is None:
+                raise RuntimeError("Qdrant client unavailable")
+            payload_update: dict[str, Any] = {}
+            if parent_id is not None:
+                payload_update["parent_id"] = parent_id
+            if not payload_update:
+                return VectorSyncResult(status="skipped")
+            await self._qdrant_set_payload(document_id, payload_update)
+            logger.info(
+                "vector_sync",
+                extra={
+                    "action": "update_metadata",
+                    "document_id": document_id,
+                    "fields": list(payload_update.keys()),
+                },
+            )
+            return VectorSyncResult(status="ready")
+        except Exception as exc:
+            logger.error(
+                "vector_sync_error",
+                extra={
+                    "action": "update_metadata",
+                    "document_id": document_id,
+                    "error": str(exc),
+                },
+            )
+            return VectorSyncResult(status="error", error=str(exc))
+
+    async def count_by_document_id(self, document_id: str) -> int:
+        """Return the number of vectors for a specific document."""
+        if not self.enabled:
+            return -1
+        try:
+            self._ensure_client()
+            if self._client is None:
+                return -1
+            return await self._qdrant_count_by_doc(document_id)
+        except Exception as exc:
+            logger.error("Vector count by doc failed for %s: %s", document_id, exc)
+            return -1
+
+    async def _scan_segment(
+        self, segment: _ScrollSegment, limit: int
+    ) -> AsyncIterator[set[str]]:
+        offset = segment.offset
+        while True:
+            points, next_offset = await self._qdrant_scroll_document_ids(offset, limit)
+            ids, ended = _page_document_ids(points, segment)
+            if ids:
+                yield ids
+            if ended or next_offset is None or segment.past(next_offset):
+                return
+            offset = next_offset
+
+    async def iter_document_ids(
+        self, page_size: int | None = None, segments: int | None = None
+    ) -> AsyncIterator[str]:
+        """Async counterpart of QdrantVectorStore.iter_document_ids."""
+        if not self.enabled:
+            return
+        self._ensure_client()
+        if self._client is None:
+            return
+        limit = page_size or SCROLL_PAGE_SIZE
+        ranges = _scroll_segments(segments or SCROLL_SEGMENTS)
+        pages: asyncio.Queue = asyncio.Queue(maxsize=len(ranges) * 2)
+
+        async def scan(segment: _ScrollSegment) -> None:
+            try:
+                async for ids in self._scan_segment(segment, limit):
+                    await pages.put(ids)
+                await pages.put(_SEGMENT_DONE)
+            except Exception as exc:
+                await pages.put(exc)
+
+        tasks = [asyncio.create_task(scan(segment)) for segment in ranges]
+        seen: set[str] = set()
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await pages.get()
+                if item is _SEGMENT_DONE:
+                    remaining -= 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                for did in item - seen:
+                    yield did
+                seen |= item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def list_document_ids(self) -> set[str]:
+        """Unique document_ids in the collection (see iter_document_ids)."""
+        try:
+            return {did async for did in self.iter_document_ids()}
+        except Exception as exc:
+            logger.error("Failed to list document IDs from Qdrant: %s", exc)
+            return set()
+
+    # -- Retryable Qdrant SDK helpers --
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_upsert(self, points: list[Any]) -> None:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        await self._client.upsert(
+            collection_name=self.collection, points=points, wait=True
+        )
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_search_groups(
+        self,
+        embedding: list[float],
+        query: str,
+        query_filter: Any,
+        top_k: int,
+        with_vectors: bool = False,
+    ) -> list[Any]:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        result = await self._client.query_points_groups(
+            collection_name=self.collection,
+            **_group_query_kwargs(
+                embedding,
+                query,
+                query_filter,
+                top_k,
+                with_vectors,
+                hybrid=await self._hybrid_enabled(),
+            ),
+        )
+        return [group.hits[0] for group in result.groups if group.hits]
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_count(self) -> int:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        info = await self._client.get_collection(self.collection)
+        return info.points_count or 0
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_delete(self, document_id: str) -> None:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        await self._client.delete(
+            collection_name=self.collection,
+            points_selector=qmodels.FilterSelector(
+                filter=_document_filter(document_id)
+            ),
+            wait=True,
+        )
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_delete_points(self, point_ids: list[str]) -> None:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        await self._client.delete(
+            collection_name=self.collection,
+            points_selector=qmodels.PointIdsList(points=point_ids),
+            wait=True,
+        )
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_overwrite_payloads(
+        self, payloads: list[tuple[str, dict[str, Any]]]
+    ) -> None:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        await self._client.batch_update_points(
+            collection_name=self.collection,
+            update_operations=[
+                qmodels.OverwritePayloadOperation(
+                    overwrite_payload=qmodels.SetPayload(
+                        payload=payload, points=[point_id]
+                    )
+                )
+                for point_id, payload in payloads
+            ],
+            wait=True,
+        )
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_get_document_payloads(self, document_id: str) -> dict[str, dict]:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        payloads: dict[str, dict] = {}
+        offset = None
+        while True:
+            points, next_offset = await self._client.scroll(
+                collection_name=self.collection,
+                scroll_filter=_document_filter(document_id),
+                limit=100,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+                **_timeout_kwargs(SCROLL_TIMEOUT),
+            )
+            for point in points:
+                payloads[str(point.id)] = point.payload or {}
+            if next_offset is None:
+                break
+            offset = next_offset
+        return payloads
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_set_payload(
+        self, document_id: str, payload_update: dict[str, Any]
+    ) -> None:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        await self._client.set_payload(
+            collection_name=self.collection,
+            payload=payload_update,
+            points=qmodels.FilterSelector(filter=_document_filter(document_id)),
+            wait=True,
+        )
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_count_by_doc(self, document_id: str) -> int:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        result = await self._client.count(
+            collection_name=self.collection,
+            count_filter=_document_filter(document_id),
+            exact=True,
+            **_timeout_kwargs(COUNT_TIMEOUT),
+        )
+        return result.count
+
+    @async_retry(service_name="qdrant")
+    async def _qdrant_scroll_document_ids(
+        self, offset: Any, limit: int
+    ) -> tuple[list[Any], Any]:
+        if self._client is None:
+            raise RuntimeError("Qdrant client unavailable")
+        return await self._client.scroll(
+            collection_name=self.collection,
+            limit=limit,
+            offset=offset,
+            with_payload=["document_id"],
+            with_vectors=False,
+            **_timeout_kwargs(SCROLL_TIMEOUT),
+        )
+
+
+_cached_store: QdrantVectorStore | None = None
+_cached_async_store: AsyncQdrantVectorStore | None = None
+
 
 def get_vector_store(refresh: bool = False) -> QdrantVectorStore:
     global _cached_store
     if refresh or _cached_store is None:
-        _cached_store = QdrantVectorStore()
+        if VECTOR_BACKEND == "local":
+            from agent_data.local_vector_store import LocalVectorStore
+
+            _cached_store = LocalVectorStore()
+        else:
+            _cached_store = QdrantVectorStore()
     return _cached_store
 
 
+def get_async_vector_store(refresh: bool = False) -> AsyncQdrantVectorStore:
+    global _cached_async_store
+    if refresh or _cached_async_store is None:
+        if VECTOR_BACKEND == "local":
+            from agent_data.local_vector_store import AsyncLocalVectorStore
+
+            # Shares the sync store's index: one writer per memory-mapped file
+            _cached_async_store = AsyncLocalVectorStore(get_vector_store())
+        else:
+            _cached_async_store = AsyncQdrantVectorStore()
+    return _cached_async_store
+
+
+def alias_target(client: Any, alias: str) -> str | None:
+    """Collection a Qdrant alias points at, or None when it is not an alias."""
+    for description in client.get_aliases().aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+
+class CollectionManager:
+    """Create the Qdrant collection and its payload indexes, and report drift.
+
+    Runs once at startup. An existing collection is never recreated: a
+    vector size or distance mismatch, or a payload index with the wrong
+    type, is reported as drift for an operator to resolve.
+
+    New collections also get the BM25 sparse vector used by hybrid search.
+    Qdrant cannot add it to an existing collection, so a collection created
+    without it keeps dense-only search until it is re-indexed.
+
+    The configured name may be an alias set by a blue/green re-index; the
+    collection it points at is the one inspected.
+
+    QDRANT_QUANTIZATION and QDRANT_ON_DISK are applied to new collections
+    and, unlike the vector layout, also to existing ones once explicitly
+    set: Qdrant rebuilds the quantized vectors in the background while
+    search keeps working. Left unset, an existing collection keeps whatever
+    it was configured with.
+    """
+
+    def __init__(self, store: QdrantVectorStore) -> None:
+        self.store = store
+
+    def ensure(self) -> dict[str, Any]:
+        report: dict[str, Any] = {
+            "collection": self.store.collection,
+            "status": "skipped",
+            "created": False,
+            "indexes_created": [],
+            "drift": [],
+            "sparse_vectors": False,
+            "quantization": QUANTIZATION,
+            "quantization_updated": False,
+        }
+        if not self.store.enabled or self.store.backend != "qdrant":
+            return report
+        quantization = quantization_config()
+        if self.store.dimensions and self.store.dimensions != VECTOR_SIZE:
+            report["drift"].append(
+                f"embedding dimensions {self.store.dimensions} != "
+                f"QDRANT_VECTOR_SIZE {VECTOR_SIZE}"
+            )
+        self.store._ensure_client()
+        client = self.store._client
+        if client is None:
+            raise RuntimeError("Qdrant client unavailable")
+
+        target = alias_target(client, self.store.collection)
+        if target:
+            report["alias_of"] = target
+        if not target and not client.collection_exists(self.store.collection):
+            extra: dict[str, Any] = {}
+            if quantization is not None:
+                extra["quantization_config"] = quantization
+            client.create_collection(
+                collection_name=self.store.collection,
+                vectors_config=qmodels.VectorParams(
+                    size=VECTOR_SIZE,
+                    distance=qmodels.Distance(VECTOR_DISTANCE),
+                    on_disk=VECTORS_ON_DISK,
+                ),
+                sparse_vectors_config=self._sparse_config(),
+                **extra,
+            )
+            report["created"] = True
+            report["sparse_vectors"] = HYBRID_SEARCH
+            payload_schema: dict[str, Any] = {}
+        else:
+            info = client.get_collection(target or self.store.collection)
+            report["drift"].extend(self._vector_drift(info.config.params.vectors))
+            report["sparse_vectors"] = HYBRID_SEARCH and _has_sparse_vector(info)
+            if HYBRID_SEARCH and not report["sparse_vectors"]:
+                logger.warning(
+                    "Collection %s has no %r sparse vector; hybrid search "
+                    "disabled until it is re-indexed",
+                    self.store.collection,
+                    sparse_vectors.SPARSE_VECTOR_NAME,
+                )
+            payload_schema = info.payload_schema or {}
+            report["quantization_updated"] = self._apply_quantization(
+                client, target or self.store.collection, info, quantization
+            )
+        # Writes and searches through this store follow the collection just
+        # inspected, not whatever the live collection had at startup
+        _sparse_support[self.store.collection] = report["sparse_vectors"]
+
+        for field, schema in PAYLOAD_INDEXES.items():
+            existing = payload_schema.get(field)
+            if existing is None:
+                client.create_payload_index(
+                    collection_name=self.store.collection,
+                    field_name=field,
+                    field_schema=qmodels.PayloadSchemaType(schema),
+                    wait=True,
+                )
+                report["indexes_created"].append(field)
+            elif (
+                str(getattr(existing.data_type, "value", existing.data_type)) != schema
+            ):
+                report["drift"].append(
+                    f"payload index {field}: expected {schema}, "
+                    f"found {getattr(existing.data_type, 'value', existing.data_type)}"
+                )
+
+        report["status"] = "drift" if report["drift"] else "ok"
+        logger.info(
+            "vector_collection",
+            extra={
+                "collection": self.store.collection,
+                "created": report["created"],
+                "indexes_created": report["indexes_created"],
+                "drift": report["drift"],
+                "sparse_vectors": report["sparse_vectors"],
+                "quantization": QUANTIZATION,
+                "quantization_updated": report["quantization_updated"],
+            },
+        )
+        return report
+
+    @staticmethod
+    def _apply_quantization(
+        client: Any, collection: str, info: Any, quantization: Any
+    ) -> bool:
+        """Bring an existing collection to the explicitly set QDRANT_QUANTIZATION
+        and QDRANT_ON_DISK; True if changed.
+
+        Neither is ever reverted to a default: a collection quantized or
+        moved to disk by other means is left alone while they are unset.
+        """
+        current = quantization_profile(
+            getattr(info.config, "quantization_config", None)
+        )
+        vectors = info.config.params.vectors
+        if not hasattr(vectors, "size"):
+            return False  # named vectors, already reported as drift
+        changes: dict[str, Any] = {}
+        if quantization is not None and current != QUANTIZATION:
+            changes["quantization_config"] = quantization
+        if VECTORS_ON_DISK is not None and bool(vectors.on_disk) != VECTORS_ON_DISK:
+            changes["vectors_config"] = {
+                "": qmodels.VectorParamsDiff(on_disk=VECTORS_ON_DISK)
+            }
+        if not changes:
+            return False
+        client.update_collection(collection_name=collection, **changes)
+        logger.info(
+            "Collection %s updated: quantization %s -> %s, on_disk %s -> %s",
+            collection,
+            current,
+            QUANTIZATION if "quantization_config" in changes else current,
+            bool(vectors.on_disk),
+            bool(vectors.on_disk) if VECTORS_ON_DISK is None else VECTORS_ON_DISK,
+        )
+        return True
+
+    @staticmethod
+    def _sparse_config() -> dict[str, Any] | None:
+        if not HYBRID_SEARCH:
+            return None
+        # Documents store BM25 term weights; Qdrant supplies the IDF factor
+        return {
+            sparse_vectors.SPARSE_VECTOR_NAME: qmodels.SparseVectorParams(
+                modifier=qmodels.Modifier.IDF
+            )
+        }
+
+    @staticmethod
+    def _vector_drift(vectors: Any) -> list[str]:
+        if not hasattr(vectors, "size"):
+            # Named vectors: the store only writes the default unnamed vector
+            return ["vectors: expected a single unnamed vector"]
+        drift = []
+        if vectors.size != VECTOR_SIZE:
+            drift.append(f"vector size: expected {VECTOR_SIZE}, found {vectors.size}")
+        distance = getattr(vectors.distance, "value", vectors.distance)
+        if distance != VECTOR_DISTANCE:
+            drift.append(f"distance: expected {VECTOR_DISTANCE}, found {distance}")
+        return drift
+
+
+_collection_status: dict[str, Any] | None = None
+
+
+def ensure_collection() -> dict[str, Any]:
+    """Bootstrap the configured collection; the report is kept for /health."""
+    global _collection_status
+    _sparse_support.clear()
+    try:
+        _collection_status = CollectionManager(get_vector_store()).ensure()
+    except Exception as exc:
+        logger.error("Qdrant collection bootstrap failed: %s", exc)
+        _collection_status = {
+            "collection": get_vector_store().collection,
+            "status": "error",
+            "error": str(exc),
+        }
+    return _collection_status
+
+
+def get_collection_status() -> dict[str, Any] | None:
+    return _collection_status
+
+
 def ensure_vector_store_enabled() -> bool:
     return get_vector_store().enabled
 
 
 def upsert_documents(
-    updates: Iterable[tuple[str, str, dict[str, Any] | None, str | None, bool]],
-) -> VectorSyncResult:
-    store = get_vector_store()
-    result = VectorSyncResult(status="skipped")
-    for doc_id, content, metadata, parent_id, is_hr in updates:
-        result = store.upsert_document(
-            document_id=doc_id,
-            content=content,
-            metadata=metadata,
-            parent_id=parent_id,
-            is_human_readable=is_hr,
-        )
-        if result.status == "error":
-            break
-    return result
+    documents: Iterable[VectorDocument],
+) -> dict[str, VectorSyncResult]:
+    return get_vector_store().upsert_documents(documents)
 
 
 def delete_document(document_id: str) -> VectorSyncResult:
@@ -0,0 +1,258 @@
+"""Write-behind queue for document vector synchronisation.
+
+Document writes are acknowledged once PostgreSQL has them with
+``vector_status: pending``; embedding and the Qdrant upsert happen here,
+on asyncio worker tasks. Jobs carry only a document_id: the worker reloads
+the latest revision, so repeated updates to one document that arrive while
+it is queued (or within the debounce window) coalesce into a single embed.
+The debounce window is a timer per document, so workers never sit idle
+waiting it out.
+
+A sync that raises, or returns a result with ``status == "error"``, is
+retried with exponential backoff. Once the retries are used up the
+``give_up`` callback records the failure (``vector_status: error``), so
+the document does not stay pending forever.
+
+Pending work survives a restart because the ``pending`` status lives in
+PostgreSQL; ``start`` re-enqueues whatever the ``recover`` callback finds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# "background" (write-behind) or "inline" (sync before the response)
+VECTOR_SYNC_MODE = os.getenv("VECTOR_SYNC_MODE", "background")
+VECTOR_SYNC_WORKERS = int(os.getenv("VECTOR_SYNC_WORKERS", "2"))
+# Quiet period before a queued document is synced, to absorb edit bursts
+VECTOR_SYNC_DEBOUNCE = float(os.getenv("VECTOR_SYNC_DEBOUNCE_SECONDS", "0.5"))
+# Retries of a failed sync before give_up; the delay doubles up to the cap
+VECTOR_SYNC_MAX_RETRIES = int(os.getenv("VECTOR_SYNC_MAX_RETRIES", "3"))
+VECTOR_SYNC_RETRY_SECONDS = float(os.getenv("VECTOR_SYNC_RETRY_SECONDS", "2"))
+VECTOR_SYNC_RETRY_MAX_SECONDS = float(os.getenv("VECTOR_SYNC_RETRY_MAX_SECONDS", "60"))
+
+QUEUE_DEPTH = Gauge(
+    "agent_vector_sync_queue_depth", "Documents waiting for vector sync"
+)
+SYNC_LAG = Histogram(
+    "agent_vector_sync_lag_seconds",
+    "Time from the first pending write to the finished vector sync (seconds)",
+)
+SYNC_COALESCED = Counter(
+    "agent_vector_sync_coalesced_total",
+    "Document updates merged into an already queued vector sync",
+)
+SYNC_RESULTS = Counter(
+    "agent_vector_sync_total", "Finished write-behind vector syncs", ["status"]
+)
+SYNC_RETRIES = Counter(
+    "agent_vector_sync_retries_total", "Failed vector syncs scheduled for a retry"
+)
+
+logger = logging.getLogger(__name__)
+
+SyncFn = Callable[[str], Awaitable[Any]]
+GiveUpFn = Callable[[str, str], Awaitable[Any]]
+
+
+class VectorSyncQueue:
+    """Coalescing asyncio work queue keyed by document_id."""
+
+    def __init__(self) -> None:
+        # document_id -> monotonic time of the first write still unsynced
+        self._pending: dict[str, float] = {}
+        self._in_flight: set[str] = set()
+        # document_id -> failed attempts since its last successful sync
+        self._attempts: dict[str, int] = {}
+        # Debounce and retry delays not yet elapsed
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._timer_fired = asyncio.Event()
+        self._queue: asyncio.Queue[str] | None = None
+        self._workers: list[asyncio.Task] = []
+        self._give_up: GiveUpFn | None = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(
+        self,
+        sync: SyncFn,
+        *,
+        workers: int = VECTOR_SYNC_WORKERS,
+        recover: Callable[[], Iterable[str]] | None = None,
+        give_up: GiveUpFn | None = None,
+    ) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._timer_fired = asyncio.Event()
+        self._give_up = give_up
+        self._workers = [
+            asyncio.create_task(
+                self._worker(self._queue, sync), name=f"vector-sync-{i}"
+            )
+            for i in range(max(1, workers))
+        ]
+        if recover is not None:
+            try:
+                recovered = await asyncio.to_thread(lambda: list(recover()))
+            except Exception as exc:
+                logger.warning("Vector sync recovery scan failed: %s", exc)
+                recovered = []
+            for document_id in recovered:
+                self.enqueue(document_id)
+            if recovered:
+                logger.info("Recovered %d pending vector syncs", len(recovered))
+
+    async def stop(self) -> None:
+        """Cancel the workers; unfinished documents stay pending in PostgreSQL."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for timer in self._timers.values():
+            timer.cancel()
+        self._workers = []
+        self._queue = None
+        self._pending.clear()
+        self._in_flight.clear()
+        self._attempts.clear()
+        self._timers.clear()
+        self._timer_fired.set()
+        QUEUE_DEPTH.set(0)
+
+    def enqueue(self, document_id: str) -> bool:
+        """Schedule a sync; False when the queue is not running."""
+        if not self.running or self._queue is None:
+            return False
+        if document_id in self._pending:
+            SYNC_COALESCED.inc()
+            return True
+        self._pending[document_id] = time.monotonic()
+        if document_id not in self._in_flight:
+            self._schedule(document_id, VECTOR_SYNC_DEBOUNCE)
+        # An in-flight document is re-queued by its worker when it finishes
+        QUEUE_DEPTH.set(len(self._pending))
+        return True
+
+    async def join(self) -> None:
+        """Wait until every queued document has been synced or given up."""
+        while self._queue is not None:
+            await self._queue.join()
+            if not self._timers:
+                return
+            self._timer_fired.clear()
+            await self._timer_fired.wait()
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        oldest = min(self._pending.values(), default=None)
+        return {
+            "running": self.running,
+            "depth": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "oldest_pending_seconds": round(now - oldest, 3) if oldest else 0.0,
+        }
+
+    def _schedule(self, document_id: str, delay: float) -> None:
+        """Put ``document_id`` on the queue once ``delay`` seconds have passed."""
+        if self._queue is None:
+            return
+        if delay <= 0:
+            self._queue.put_nowait(document_id)
+            return
+        self._timers[document_id] = asyncio.get_running_loop().call_later(
+            delay, self._release, document_id
+        )
+
+    def _release(self, document_id: str) -> None:
+        self._timers.pop(document_id, None)
+        if self._queue is not None:
+            self._queue.put_nowait(document_id)
+        self._timer_fired.set()
+
+    async def _worker(self, queue: asyncio.Queue[str], sync: SyncFn) -> None:
+        while True:
+            document_id = await queue.get()
+            try:
+                # Writes from here on need a fresh sync after this one
+                first_seen = self._pending.pop(document_id, None)
+                if first_seen is None:
+                    continue
+                self._in_flight.add(document_id)
+                QUEUE_DEPTH.set(len(self._pending))
+                error: str | None = None
+                try:
+                    result = await sync(document_id)
+                    if getattr(result, "status", None) == "error":
+                        error = getattr(result, "error", None) or "vector sync failed"
+                except Exception as exc:
+                    error = str(exc) or type(exc).__name__
+                finally:
+                    self._in_flight.discard(document_id)
+                SYNC_RESULTS.labels(status="error" if error else "ok").inc()
+                SYNC_LAG.observe(time.monotonic() - first_seen)
+                if document_id in self._pending:
+                    # Written again meanwhile: that revision gets its own sync
+                    self._attempts.pop(document_id, None)
+                    self._schedule(
+                        document_id,
+                        self._pending[document_id]
+                        + VECTOR_SYNC_DEBOUNCE
+                        - time.monotonic(),
+                    )
+                elif error is None:
+                    self._attempts.pop(document_id, None)
+                else:
+                    await self._retry_or_give_up(document_id, first_seen, error)
+            finally:
+                queue.task_done()
+
+    async def _retry_or_give_up(
+        self, document_id: str, first_seen: float, error: str
+    ) -> None:
+        attempt = self._attempts.get(document_id, 0) + 1
+        if attempt <= VECTOR_SYNC_MAX_RETRIES:
+            self._attempts[document_id] = attempt
+            self._pending[document_id] = first_seen
+            QUEUE_DEPTH.set(len(self._pending))
+            delay = min(
+                VECTOR_SYNC_RETRY_MAX_SECONDS,
+                VECTOR_SYNC_RETRY_SECONDS * 2 ** (attempt - 1),
+            )
+            SYNC_RETRIES.inc()
+            logger.warning(
+                "Vector sync failed for %s (attempt %d), retrying in %.1fs: %s",
+                document_id,
+                attempt,
+                delay,
+                error,
+            )
+            self._schedule(document_id, delay)
+            return
+        self._attempts.pop(document_id, None)
+        logger.error(
+            "Vector sync failed for %s after %d attempts: %s",
+            document_id,
+            attempt,
+            error,
+        )
+        if self._give_up is None:
+            return
+        try:
+            await self._give_up(document_id, error)
+        except Exception as exc:
+            # Still pending in PostgreSQL; the next restart recovers it
+            logger.error(
+                "Recording vector sync failure for %s failed: %s", document_id, exc
+            )
+
+
+vector_sync_queue = VectorSyncQueue()
@@ -60,6 +60,17 @@ MCP_TOOLS = [
                     "description": "Maximum number of results (default: 5)",
                     "default": 5,
                 },
+                "diversify": {
+                    "type": "boolean",
+                    "description": "Re-rank results for coverage (MMR) so near-duplicate documents do not crowd out others; useful for overview questions",
+                    "default": False,
+                },
+                "mmr_lambda": {
+                    "type": "number",
+                    "description": "With diversify: 1.0 ranks by relevance only, lower values favour diverse results (default: 0.5)",
+                    "minimum": 0,
+                    "maximum": 1,
+                },
             },
             "required": ["query"],
         },
@@ -179,10 +190,18 @@ MCP_TOOLS = [
 
 
 # Tool implementations
-async def search_knowledge(query: str, limit: int = 5) -> dict[str, Any]:
+async def search_knowledge(
+    query: str,
+    limit: int = 5,
+    diversify: bool = False,
+    mmr_lambda: float | None = None,
+) -> dict[str, Any]:
     """Execute RAG search via Agent Data /chat endpoint (hybrid)"""
+    body: dict[str, Any] = {"message": query}
+    if diversify:
+        body["routing"] = {"diversify": True, "mmr_lambda": mmr_lambda}
     try:
-        response = await _hybrid_request("POST", "/chat", json={"message": query})
+        response = await _hybrid_request("POST", "/chat", json=body)
         response.raise_for_status()
         return response.json()
     except httpx.HTTPError as e:
@@ -384,6 +403,8 @@ async def execute_tool(tool_name: str, request: Request):
         result = await search_knowledge(
             query=body.get("query", ""),
             limit=body.get("limit", 5),
+            diversify=body.get("diversify", False),
+            mmr_lambda=body.get("mmr_lambda"),
         )
     elif tool_name == "list_documents":
         result = await list_documents(path=body.get("path", ""))
@@ -172,6 +172,17 @@ async def list_tools() -> list[Tool]:
                         "type": "string",
                         "description": "Optional session identifier for readiness gate and chat history binding",
                     },
+                    "diversify": {
+                        "type": "boolean",
+                        "description": "Re-rank results for coverage (MMR) so near-duplicate documents do not crowd out others; useful for overview questions",
+                        "default": False,
+                    },
+                    "mmr_lambda": {
+                        "type": "number",
+                        "description": "With diversify: 1.0 ranks by relevance only, lower values favour diverse results (default: 0.5)",
+                        "minimum": 0,
+                        "maximum": 1,
+                    },
                 },
                 "required": ["query"],
             },
@@ -344,14 +355,14 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="batch_read",
-            description="Read multiple documents in one call. Max 20 paths. Returns truncated content by default, use full=true for complete content.",
+            description="Read multiple documents in one call. Max 500 paths. Returns truncated content by default, use full=true for complete content.",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "paths": {
                         "type": "array",
                         "items": {"type": "string"},
-                        "description": "List of document paths to read (max 20)",
+                        "description": "List of document paths to read (max 500)",
                     },
                     "full": {
                         "type": "boolean",
@@ -376,11 +387,14 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             if name == "search_knowledge":
                 query = arguments.get("query", "")
                 session_id = arguments.get("session_id", _STDIO_SESSION_ID)
+                body = {"message": query, "session_id": session_id}
+                if arguments.get("diversify"):
+                    body["routing"] = {
+                        "diversify": True,
+                        "mmr_lambda": arguments.get("mmr_lambda"),
+                    }
                 response = await _request_with_fallback(
-                    client,
-                    "POST",
-                    "/chat",
-                    json={"message": query, "session_id": session_id},
+                    client, "POST", "/chat", json=body
                 )
                 if response.status_code == 200:
                     data = response.json()
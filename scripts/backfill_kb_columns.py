@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Backfill the promoted kb_documents columns on a live table.
+
+The hot JSONB fields (document_id, parent_id, deleted_at, revision,
+updated_at, vector_status, metadata.tags, metadata.title) and the
+full-text search_vector also live in real columns that set_doc/update_doc
+keep in sync. Rows written before the columns existed have them NULL;
+this fills them without taking the table offline:
+
+  1. ensure_tables adds any missing column (nullable, no rewrite)
+  2. rows are synced in short key-ordered batches, each its own
+     transaction; rows already in sync are skipped, so a re-run or a
+     resume with --after only touches what is left
+  3. the column indexes, including the search_vector GIN index, are built
+     CONCURRENTLY, so writes keep flowing; an invalid index from an
+     interrupted build is rebuilt
+
+Full-text search switches to the indexed search_vector by itself once
+the index is valid. Once it has finished, set PG_HOT_COLUMNS=1 so reads
+filter on the columns too. Re-run it after
+unaccent is installed: the kb_search config gains it on startup and the
+stale search vectors are rewritten.
+
+Environment:
+  PG_DSN or PG_HOST/PG_PORT/PG_USER/PG_PASSWORD/PG_DATABASE
+
+Usage:
+  python -m scripts.backfill_kb_columns
+  python -m scripts.backfill_kb_columns --batch 500 --sleep 0.2
+  python -m scripts.backfill_kb_columns --after <last key> --skip-indexes
+
+Exit codes:
+  0 — Backfill (and index build) complete
+  1 — PostgreSQL unreachable or a batch failed
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any
+
+from agent_data import pg_store
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dsn", default=None, help="defaults to PG_DSN / PG_*")
+    parser.add_argument("--batch", type=int, default=1000, help="rows per batch")
+    parser.add_argument(
+        "--sleep", type=float, default=0.05, help="pause between batches (s)"
+    )
+    parser.add_argument("--after", default="", help="resume after this key")
+    parser.add_argument("--skip-indexes", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        pg_store.init_pool(args.dsn, minconn=1, maxconn=1)
+        pg_store.ensure_tables()
+    except Exception as exc:
+        print(f"[ERROR] PostgreSQL unavailable: {exc}")
+        return 1
+
+    report: dict[str, Any] = {"scanned": 0, "updated": 0, "batches": 0}
+    started = time.perf_counter()
+    after = args.after
+    while True:
+        try:
+            last, scanned, updated = pg_store.backfill_kb_columns(
+                after, max(1, args.batch)
+            )
+        except Exception as exc:
+            print(f"[ERROR] Batch after {after!r} failed: {exc}")
+            print(f"[INFO] Resume with --after {after!r}")
+            return 1
+        if last is None:
+            break
+        after = last
+        report["scanned"] += scanned
+        report["updated"] += updated
+        report["batches"] += 1
+        print(
+            f"[INFO] {report['scanned']} scanned, {report['updated']} updated,"
+            f" last key {last!r}"
+        )
+        time.sleep(args.sleep)
+    report["backfill_s"] = round(time.perf_counter() - started, 2)
+
+    if not args.skip_indexes:
+        started = time.perf_counter()
+        report["indexes_built"] = pg_store.build_kb_column_indexes()
+        report["indexes_s"] = round(time.perf_counter() - started, 2)
+
+    pg_store.close_pool()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
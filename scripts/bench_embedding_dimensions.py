@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark reduced embedding dimensions against the full-size baseline.
+
+A sample of chunks is exported from the configured collection (or read back
+from a previous export) and embedded once at full size. Every candidate
+dimension is then derived the way the v3 models shorten vectors: keep the
+first N components and re-normalise. For each dimension the script reports:
+
+  recall@k   overlap of the top-k chunks with the full-dimension top-k
+  p50 / p99  exact in-process search latency over the sample (ms)
+  bytes      float32 storage per vector
+
+Queries are the opening sentence of randomly picked sample chunks unless
+--query is given. Search is exact NumPy so only the dimension changes
+between runs; absolute Qdrant latency is measured by bench_grouped_search.
+
+Environment:
+  QDRANT_URL, QDRANT_API_KEY, OPENAI_API_KEY, QDRANT_COLLECTION (optional)
+
+Usage:
+  python -m scripts.bench_embedding_dimensions --sample-size 2000 \\
+      --export /tmp/sample.jsonl --dims 1536 1024 768 512 256
+  python -m scripts.bench_embedding_dimensions --sample /tmp/sample.jsonl
+
+Exit codes:
+  0 — Benchmark completed
+  1 — Vector store not configured or sample empty
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from agent_data import vector_store
+
+
+def _export_sample(store: Any, size: int) -> list[str]:
+    texts: list[str] = []
+    offset = None
+    in_pg = vector_store.CHUNK_TEXT_STORE == "pg"
+    while len(texts) < size:
+        points, offset = store._client.scroll(
+            collection_name=store.collection,
+            limit=min(256, size - len(texts)),
+            offset=offset,
+            with_payload=False if in_pg else ["content"],
+            with_vectors=False,
+        )
+        if in_pg:
+            from agent_data import pg_store
+
+            found = pg_store.get_chunk_texts([str(p.id) for p in points])
+            batch = [found.get(str(p.id)) for p in points]
+        else:
+            batch = [(p.payload or {}).get("content") for p in points]
+        texts.extend(text for text in batch if text)
+        if offset is None:
+            break
+    return texts
+
+
+def _embed_full(store: Any, texts: list[str]) -> np.ndarray:
+    # Bypass the store's dimension setting: the baseline is the native size
+    store.dimensions = None
+    vectors: list[list[float]] = []
+    for batch in vector_store._batch_inputs(
+        texts, vector_store.EMBED_BATCH_SIZE, vector_store.EMBED_BATCH_TOKENS
+    ):
+        vectors.extend(store._embed_batch(batch))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def _shorten(matrix: np.ndarray, dim: int) -> np.ndarray:
+    cut = matrix[:, :dim]
+    norms = np.linalg.norm(cut, axis=1, keepdims=True)
+    return cut / np.where(norms == 0, 1.0, norms)
+
+
+def _top_k(corpus: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = corpus @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, int(round(len(ordered) * pct)) - 1)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sample", type=Path, help="JSONL exported earlier")
+    parser.add_argument("--export", type=Path, help="write the sample here")
+    parser.add_argument("--sample-size", type=int, default=2000)
+    parser.add_argument("--query", action="append", dest="queries")
+    parser.add_argument("--queries", type=int, default=50, dest="query_count")
+    parser.add_argument("--dims", type=int, nargs="+", default=[1024, 768, 512, 256])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    store = vector_store.get_vector_store()
+    if not store.enabled:
+        print("[ERROR] Vector store not configured (QDRANT_URL/API_KEY/OPENAI)")
+        return 1
+    store._ensure_client()
+
+    if args.sample:
+        lines = args.sample.read_text(encoding="utf-8").splitlines()
+        texts = [json.loads(line)["content"] for line in lines if line]
+    else:
+        texts = _export_sample(store, args.sample_size)
+    if not texts:
+        print("[ERROR] Sample is empty")
+        return 1
+    if args.export:
+        args.export.write_text(
+            "".join(
+                json.dumps({"content": t}, ensure_ascii=False) + "\n" for t in texts
+            ),
+            encoding="utf-8",
+        )
+
+    rng = random.Random(args.seed)
+    queries = args.queries or [
+        text.split(". ")[0][:300]
+        for text in rng.sample(texts, min(args.query_count, len(texts)))
+    ]
+    full_corpus = _embed_full(store, texts)
+    full_queries = _embed_full(store, queries)
+    native = full_corpus.shape[1]
+    k = min(args.top_k, len(texts))
+
+    baseline_corpus = _shorten(full_corpus, native)
+    baseline_queries = _shorten(full_queries, native)
+    truth = [set(_top_k(baseline_corpus, q, k)) for q in baseline_queries]
+
+    report: dict[str, Any] = {
+        "collection": store.collection,
+        "model": store.embedding_model,
+        "sample_chunks": len(texts),
+        "queries": len(queries),
+        "top_k": k,
+        "dimensions": {},
+    }
+    for dim in sorted({native, *(d for d in args.dims if d <= native)}, reverse=True):
+        corpus = _shorten(full_corpus, dim)
+        query_vectors = _shorten(full_queries, dim)
+        latencies: list[float] = []
+        recalls: list[float] = []
+        for _ in range(args.rounds):
+            for q, expected in zip(query_vectors, truth, strict=True):
+                t0 = time.perf_counter()
+                found = _top_k(corpus, q, k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                recalls.append(len(expected.intersection(found)) / k)
+        report["dimensions"][str(dim)] = {
+            f"recall_at_{k}": round(statistics.mean(recalls), 4),
+            "latency_ms_p50": round(statistics.median(latencies), 3),
+            "latency_ms_p99": round(_percentile(latencies, 0.99), 3),
+            "bytes_per_vector": dim * 4,
+        }
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
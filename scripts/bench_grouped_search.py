@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark grouped vector search against the legacy over-fetch + dedup path.
+
+For each query the script runs both strategies against the configured
+collection and reports latency, payload bytes transferred and how many
+distinct documents came back:
+
+  legacy   query_points(limit=top_k * 2, full payload), dedup in Python
+  grouped  query_points_groups(group_by="document_id", group_size=1),
+           dense + BM25 fused with RRF when the collection has sparse vectors
+
+Query embeddings are computed once up front so only Qdrant time is measured.
+
+Environment:
+  QDRANT_URL, QDRANT_API_KEY, OPENAI_API_KEY, QDRANT_COLLECTION (optional)
+
+Usage:
+  python -m scripts.bench_grouped_search --query "deploy checklist" --rounds 20
+
+Exit codes:
+  0 — Benchmark completed
+  1 — Vector store not configured
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any
+
+from agent_data import vector_store
+
+DEFAULT_QUERIES = [
+    "deployment checklist",
+    "how to rotate API keys",
+    "qdrant vector sync",
+    "session readiness gate",
+    "postgres connection pool",
+]
+
+
+def _payload_bytes(points: list[Any]) -> int:
+    return sum(len(json.dumps(p.payload or {}, default=str)) for p in points)
+
+
+def _run_legacy(
+    store: Any, query: str, embedding: list[float], top_k: int
+) -> tuple[int, int]:
+    response = store._client.query_points(
+        collection_name=store.collection,
+        query=embedding,
+        limit=top_k * 2,
+        with_payload=True,
+    )
+    points = response.points
+    return _payload_bytes(points), len(vector_store._dedupe_hits(points, top_k))
+
+
+def _run_grouped(
+    store: Any, query: str, embedding: list[float], top_k: int
+) -> tuple[int, int]:
+    hits = store._qdrant_search_groups(embedding, query, None, top_k)
+    return _payload_bytes(hits), len(vector_store._dedupe_hits(hits, top_k))
+
+
+def _summarize(samples: list[tuple[float, int, int]]) -> dict[str, Any]:
+    latencies = sorted(s[0] for s in samples)
+    p95_index = max(0, int(round(len(latencies) * 0.95)) - 1)
+    return {
+        "runs": len(samples),
+        "latency_ms_p50": round(statistics.median(latencies), 2),
+        "latency_ms_p95": round(latencies[p95_index], 2),
+        "payload_bytes_mean": round(statistics.mean(s[1] for s in samples)),
+        "documents_mean": round(statistics.mean(s[2] for s in samples), 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--query", action="append", dest="queries")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    store = vector_store.get_vector_store()
+    if not store.enabled:
+        print("[ERROR] Vector store not configured (QDRANT_URL/API_KEY/OPENAI)")
+        return 1
+    store._ensure_client()
+
+    queries = args.queries or DEFAULT_QUERIES
+    embeddings = {q: store._embed_batch([q])[0] for q in queries}
+
+    strategies = {"legacy": _run_legacy, "grouped": _run_grouped}
+    samples: dict[str, list[tuple[float, int, int]]] = {n: [] for n in strategies}
+    for _ in range(args.rounds):
+        for query in queries:
+            for name, run in strategies.items():
+                t0 = time.perf_counter()
+                nbytes, ndocs = run(store, query, embeddings[query], args.top_k)
+                elapsed_ms = (time.perf_counter() - t0) * 1000
+                samples[name].append((elapsed_ms, nbytes, ndocs))
+
+    report = {
+        "collection": store.collection,
+        "top_k": args.top_k,
+        "queries": len(queries),
+        "rounds": args.rounds,
+        **{name: _summarize(runs) for name, runs in samples.items()},
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Compare the Qdrant REST and gRPC transports on the same workload.
+
+Each transport gets a scratch collection loaded with the same seeded
+random vectors, then runs the calls the vector store makes:
+
+  upsert   batches of points with document_id/content payloads
+  search   query_points_groups, one best chunk per document
+  count    exact count filtered by document_id
+  scroll   every chunk of one document, payload only
+  delete   filter delete of one document
+
+Clients are built with vector_store.qdrant_client_kwargs, so the pool and
+timeout settings (QDRANT_HTTP_*, QDRANT_TIMEOUT) apply as in the service.
+Reported per transport and operation: p50 / p99 latency (ms) and calls/s.
+
+Start a local Qdrant with both ports published first:
+
+  docker run --rm -p 6333:6333 -p 6334:6334 qdrant/qdrant
+
+Usage:
+  python -m scripts.bench_qdrant_transport
+  python -m scripts.bench_qdrant_transport --points 20000 --dim 1536 \\
+      --transports rest grpc --searches 500
+
+Exit codes:
+  0 — Report written
+  1 — Qdrant unreachable or qdrant-client not installed
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import statistics
+import time
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from agent_data import vector_store
+
+CHUNKS_PER_DOCUMENT = 8
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    return ordered[max(0, math.ceil(len(ordered) * pct) - 1)]
+
+
+def _summary(latencies: list[float]) -> dict[str, float]:
+    ordered = sorted(latencies)
+    total = sum(ordered) / 1000
+    return {
+        "calls": len(ordered),
+        "latency_ms_p50": round(statistics.median(ordered), 2),
+        "latency_ms_p99": round(_percentile(ordered, 0.99), 2),
+        "calls_per_s": round(len(ordered) / total, 1) if total else 0.0,
+    }
+
+
+def _timed(latencies: list[float], call: Callable[[], Any]) -> Any:
+    t0 = time.perf_counter()
+    result = call()
+    latencies.append((time.perf_counter() - t0) * 1000)
+    return result
+
+
+def _run(
+    client: Any,
+    name: str,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    args: argparse.Namespace,
+) -> dict[str, dict[str, float]]:
+    qm = vector_store.qmodels
+    documents = math.ceil(len(vectors) / CHUNKS_PER_DOCUMENT)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=qm.VectorParams(
+            size=vectors.shape[1], distance=qm.Distance.COSINE
+        ),
+    )
+    client.create_payload_index(
+        collection_name=name,
+        field_name="document_id",
+        field_schema=qm.PayloadSchemaType.KEYWORD,
+        wait=True,
+    )
+    timings: dict[str, list[float]] = {
+        op: [] for op in ("upsert", "search", "count", "scroll", "delete")
+    }
+
+    for start in range(0, len(vectors), args.batch):
+        batch = vectors[start : start + args.batch]
+        points = [
+            qm.PointStruct(
+                id=start + i,
+                vector=vector.tolist(),
+                payload={
+                    "document_id": f"doc-{(start + i) // CHUNKS_PER_DOCUMENT}",
+                    "content": f"chunk {start + i}",
+                },
+            )
+            for i, vector in enumerate(batch)
+        ]
+        _timed(
+            timings["upsert"],
+            lambda points=points: client.upsert(
+                collection_name=name, points=points, wait=True
+            ),
+        )
+
+    for query in queries:
+        _timed(
+            timings["search"],
+            lambda query=query: client.query_points_groups(
+                collection_name=name,
+                query=query.tolist(),
+                group_by="document_id",
+                group_size=1,
+                limit=args.top_k,
+                with_payload=["document_id", "content"],
+            ),
+        )
+
+    for doc in range(min(args.documents, documents)):
+        condition = vector_store._document_filter(f"doc-{doc}")
+        _timed(
+            timings["count"],
+            lambda c=condition: client.count(
+                collection_name=name, count_filter=c, exact=True
+            ),
+        )
+        _timed(
+            timings["scroll"],
+            lambda c=condition: client.scroll(
+                collection_name=name,
+                scroll_filter=c,
+                limit=100,
+                with_payload=True,
+                with_vectors=False,
+            ),
+        )
+        _timed(
+            timings["delete"],
+            lambda c=condition: client.delete(
+                collection_name=name,
+                points_selector=qm.FilterSelector(filter=c),
+                wait=True,
+            ),
+        )
+
+    return {op: _summary(samples) for op, samples in timings.items() if samples}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:6333")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument(
+        "--transports",
+        nargs="+",
+        default=list(vector_store.QDRANT_TRANSPORTS),
+        choices=vector_store.QDRANT_TRANSPORTS,
+    )
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=vector_store.VECTOR_SIZE)
+    parser.add_argument("--batch", type=int, default=vector_store.BULK_UPSERT_POINTS)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument(
+        "--documents", type=int, default=100, help="count/scroll/delete"
+    )
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="keep the collections")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if vector_store.QdrantClient is None:
+        print("[ERROR] qdrant-client not installed")
+        return 1
+
+    rng = np.random.default_rng(args.seed)
+    vectors = rng.standard_normal((args.points, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.searches, args.dim), dtype=np.float32)
+
+    report: dict[str, Any] = {
+        "url": args.url,
+        "points": args.points,
+        "dimensions": args.dim,
+        "grpc_port": vector_store.QDRANT_GRPC_PORT,
+        "transports": {},
+    }
+    for transport in args.transports:
+        client = vector_store.QdrantClient(
+            **vector_store.qdrant_client_kwargs(args.url, args.api_key, transport)
+        )
+        try:
+            client.get_collections()
+        except Exception as exc:
+            print(f"[ERROR] Qdrant unreachable over {transport}: {exc}")
+            return 1
+        name = f"transport_bench_{transport}_{os.getpid()}"
+        started = time.perf_counter()
+        try:
+            operations = _run(client, name, vectors, queries, args)
+        finally:
+            if not args.keep:
+                client.delete_collection(collection_name=name)
+            client.close()
+        report["transports"][transport] = {
+            "wall_s": round(time.perf_counter() - started, 2),
+            **operations,
+        }
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
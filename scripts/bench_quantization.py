@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Compare Qdrant quantization profiles on a local dataset.
+
+Every profile (none, int8, binary, product) gets a scratch collection
+loaded with the same vectors. Held-out sample vectors are used as queries,
+so the exact top-k over the corpus is the ground truth. Each quantized
+profile is searched with and without rescoring. Reported per run:
+
+  ram_mb / disk_mb   estimated footprint: quantized vectors and the HNSW
+                     graph in RAM, originals on disk once quantized
+  recall@k           overlap with the exact top-k
+  p50 / p99          client-side query latency (ms)
+
+The dataset is JSONL with a "content" field (as written by
+bench_embedding_dimensions --export) and optionally a precomputed "vector";
+rows without one are embedded with the configured model.
+
+Environment:
+  QDRANT_URL, QDRANT_API_KEY (or --url for a local Qdrant),
+  OPENAI_API_KEY when rows need embedding
+
+Usage:
+  python -m scripts.bench_quantization --sample /tmp/sample.jsonl
+  python -m scripts.bench_quantization --sample /tmp/sample.jsonl \\
+      --url http://localhost:6333 --profiles none int8 binary --oversampling 3
+
+--url :memory: runs the whole flow in-process as a dry run; the embedded
+client ignores quantization, so its figures only reflect exact search.
+
+Exit codes:
+  0 — Report written
+  1 — Dataset empty or Qdrant/embedding not configured
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from agent_data import vector_store
+
+HNSW_M = 16
+UPLOAD_BATCH = 256
+
+
+def _load(path: Path, store: Any) -> np.ndarray | None:
+    rows = [
+        json.loads(line)
+        for line in path.read_text(encoding="utf-8").splitlines()
+        if line.strip()
+    ]
+    missing = [i for i, row in enumerate(rows) if "vector" not in row]
+    if missing:
+        if not store.enabled:
+            return None
+        store._ensure_client()
+        texts = [rows[i]["content"] for i in missing]
+        vectors: list[list[float]] = []
+        for batch in vector_store._batch_inputs(
+            texts, vector_store.EMBED_BATCH_SIZE, vector_store.EMBED_BATCH_TOKENS
+        ):
+            vectors.extend(store._embed_batch(batch))
+        for i, vector in zip(missing, vectors, strict=True):
+            rows[i]["vector"] = vector
+    if not rows:
+        return None
+    matrix = np.asarray([row["vector"] for row in rows], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def _exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> list[set[int]]:
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def _footprint(profile: str, count: int, dim: int) -> dict[str, float]:
+    original = count * dim * 4
+    quantized = {
+        "none": 0,
+        "int8": count * dim,
+        "binary": count * math.ceil(dim / 8),
+        "product": count * dim * 4 / int(vector_store.PQ_COMPRESSION.lstrip("x")),
+    }[profile]
+    graph = count * HNSW_M * 2 * 4
+    on_disk = profile != "none"
+    return {
+        "ram_mb": round((quantized + graph + (0 if on_disk else original)) / 1e6, 2),
+        "disk_mb": round((original if on_disk else 0) / 1e6, 2),
+    }
+
+
+def _load_collection(
+    client: Any, name: str, profile: str, corpus: np.ndarray, timeout: float
+) -> None:
+    quantization = vector_store.quantization_config(profile)
+    extra = {"quantization_config": quantization} if quantization else {}
+    client.create_collection(
+        collection_name=name,
+        vectors_config=vector_store.qmodels.VectorParams(
+            size=corpus.shape[1],
+            distance=vector_store.qmodels.Distance.COSINE,
+            on_disk=True if quantization else None,
+        ),
+        **extra,
+    )
+    for start in range(0, len(corpus), UPLOAD_BATCH):
+        batch = corpus[start : start + UPLOAD_BATCH]
+        client.upsert(
+            collection_name=name,
+            points=vector_store.qmodels.Batch(
+                ids=list(range(start, start + len(batch))), vectors=batch.tolist()
+            ),
+            wait=True,
+        )
+    # Quantized data and the HNSW graph are built by the optimizer
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get_collection(name).status
+        if getattr(status, "value", status) == "green":
+            return
+        time.sleep(0.5)
+    print(f"[WARN] {name} not green after {timeout:.0f}s; measuring anyway")
+
+
+def _measure(
+    client: Any,
+    name: str,
+    queries: np.ndarray,
+    truth: list[set[int]],
+    k: int,
+    rounds: int,
+    search_params: Any,
+) -> dict[str, float]:
+    latencies: list[float] = []
+    recalls: list[float] = []
+    for _ in range(rounds):
+        for query, expected in zip(queries, truth, strict=True):
+            t0 = time.perf_counter()
+            response = client.query_points(
+                collection_name=name,
+                query=query.tolist(),
+                limit=k,
+                search_params=search_params,
+                with_payload=False,
+            )
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found = {int(point.id) for point in response.points}
+            recalls.append(len(expected & found) / k)
+    ordered = sorted(latencies)
+    return {
+        f"recall_at_{k}": round(statistics.mean(recalls), 4),
+        "latency_ms_p50": round(statistics.median(ordered), 2),
+        "latency_ms_p99": round(ordered[max(0, math.ceil(len(ordered) * 0.99) - 1)], 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sample", type=Path, required=True)
+    parser.add_argument("--url", default=None, help="defaults to QDRANT_URL")
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=list(vector_store.QUANTIZATION_PROFILES),
+        choices=vector_store.QUANTIZATION_PROFILES,
+    )
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--oversampling", type=float, default=vector_store.SEARCH_OVERSAMPLING
+    )
+    parser.add_argument("--index-timeout", type=float, default=300.0)
+    parser.add_argument("--keep", action="store_true", help="keep the collections")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    store = vector_store.get_vector_store()
+    url = args.url or store.url
+    if not url or vector_store.QdrantClient is None:
+        print("[ERROR] Qdrant not configured (QDRANT_URL or --url)")
+        return 1
+    vectors = _load(args.sample, store)
+    if vectors is None or len(vectors) <= args.top_k:
+        print("[ERROR] Sample is empty or needs embedding without OPENAI_API_KEY")
+        return 1
+
+    order = list(range(len(vectors)))
+    random.Random(args.seed).shuffle(order)
+    held_out = min(args.queries, len(vectors) // 10 or 1)
+    queries = vectors[order[:held_out]]
+    corpus = vectors[order[held_out:]]
+    k = min(args.top_k, len(corpus))
+    truth = _exact_top_k(corpus, queries, k)
+
+    if url == ":memory:":
+        # In-process client: exercises the flow, but ignores quantization
+        client = vector_store.QdrantClient(location=":memory:")
+    else:
+        client = vector_store.QdrantClient(
+            url=url, api_key=None if args.url else store.api_key, timeout=60
+        )
+    report: dict[str, Any] = {
+        "corpus": len(corpus),
+        "queries": held_out,
+        "dimensions": corpus.shape[1],
+        "top_k": k,
+        "oversampling": args.oversampling,
+        "profiles": {},
+    }
+    for profile in args.profiles:
+        name = f"qbench_{profile}_{os.getpid()}"
+        try:
+            _load_collection(client, name, profile, corpus, args.index_timeout)
+            footprint = _footprint(profile, len(corpus), corpus.shape[1])
+            variants = [(profile, None)]
+            if profile != "none":
+                variants = [
+                    (
+                        f"{profile}+rescore" if rescore else profile,
+                        vector_store.quantization_search_params(
+                            profile, args.oversampling, rescore
+                        ),
+                    )
+                    for rescore in (False, True)
+                ]
+            for label, params in variants:
+                report["profiles"][label] = {
+                    **footprint,
+                    **_measure(client, name, queries, truth, k, args.rounds, params),
+                }
+        finally:
+            if not args.keep:
+                client.delete_collection(collection_name=name)
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -25,8 +25,9 @@ def _setup_pg_mocks():
         if key in store:
             store[key].update(updates)
 
-    def fake_stream(collection):
-        return [{"_key": k, **v} for k, v in store.items()]
+    def fake_stream(collection, *, live_only=False, **_):
+        rows = [{"_key": k, **v} for k, v in store.items()]
+        return [r for r in rows if not live_only or r.get("deleted_at") is None]
 
     return store, fake_get, fake_set, fake_update, fake_stream
 
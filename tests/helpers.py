@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 from collections.abc import Iterator
 from contextlib import contextmanager
+from typing import Any
 
 
 @contextmanager
@@ -23,3 +24,38 @@ def temporary_env(**overrides: str | None) -> Iterator[None]:
                 os.environ[key] = original[key]
             else:
                 os.environ.pop(key, None)
+
+
+class AsyncStoreAdapter:
+    """Expose a synchronous fake vector store through the async store API.
+
+    Every callable attribute becomes a coroutine function that delegates to
+    the wrapped store, so call assertions on the fake keep working.
+    """
+
+    def __init__(self, store: Any) -> None:
+        self._store = store
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._store, name)
+        if not callable(attr):
+            return attr
+
+        async def _call(*args: Any, **kwargs: Any) -> Any:
+            return attr(*args, **kwargs)
+
+        return _call
+
+
+def upsert_serially(store: Any, documents: Any) -> dict[str, Any]:
+    """Bulk ``upsert_documents`` for fakes: one ``upsert_document`` per input."""
+    return {
+        doc.document_id: store.upsert_document(
+            document_id=doc.document_id,
+            content=doc.content,
+            metadata=doc.metadata,
+            parent_id=doc.parent_id,
+            is_human_readable=doc.is_human_readable,
+        )
+        for doc in documents
+    }
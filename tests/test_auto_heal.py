@@ -11,6 +11,7 @@ Verifies:
 
 from __future__ import annotations
 
+import asyncio
 from unittest.mock import patch
 
 import pytest
@@ -18,6 +19,7 @@ from fastapi.testclient import TestClient
 
 import agent_data.server as server
 import agent_data.vector_store as vs_mod
+from tests.helpers import AsyncStoreAdapter, upsert_serially
 
 # ---- Fake vector store ----
 
@@ -53,6 +55,9 @@ class FakeVectorStore:
         ]
         return vs_mod.VectorSyncResult(status="ready", chunks_created=len(chunks))
 
+    def upsert_documents(self, documents):
+        return upsert_serially(self, documents)
+
     def delete_document(self, document_id):
         if document_id in self.vectors:
             del self.vectors[document_id]
@@ -98,6 +103,9 @@ def pg_mocks(monkeypatch):
     def fake_get(collection, key):
         return store.get(key)
 
+    def fake_get_many(collection, keys):
+        return [store.get(key) for key in keys]
+
     def fake_set(collection, key, data):
         store[key] = dict(data)
 
@@ -105,11 +113,13 @@ def pg_mocks(monkeypatch):
         if key in store:
             store[key].update(updates)
 
-    def fake_stream(collection):
-        return [{"_key": k, **v} for k, v in store.items()]
+    def fake_stream(collection, *, live_only=False, **_):
+        rows = [{"_key": k, **v} for k, v in store.items()]
+        return [r for r in rows if not live_only or r.get("deleted_at") is None]
 
     patches = {
         "get": patch("agent_data.pg_store.get_doc", side_effect=fake_get),
+        "get_many": patch("agent_data.pg_store.get_docs", side_effect=fake_get_many),
         "set": patch("agent_data.pg_store.set_doc", side_effect=fake_set),
         "update": patch("agent_data.pg_store.update_doc", side_effect=fake_update),
         "stream": patch("agent_data.pg_store.stream_docs", side_effect=fake_stream),
@@ -125,6 +135,9 @@ def fake_vs(monkeypatch):
     store = FakeVectorStore()
     monkeypatch.setattr(vs_mod, "get_vector_store", lambda refresh=False: store)
     monkeypatch.setattr(vs_mod, "delete_document", store.delete_document)
+    monkeypatch.setattr(
+        vs_mod, "get_async_vector_store", lambda refresh=False: AsyncStoreAdapter(store)
+    )
     return store
 
 
@@ -400,3 +413,36 @@ class TestAutoHealPartialFailure:
 
         # Final status reflects remaining issue
         assert data["audit_after"]["ghost_count"] == 1
+
+
+# ===================================================================
+# Test: Qdrant scans run off the event loop
+# ===================================================================
+
+
+class TestScansOffEventLoop:
+    def test_audit_and_cleanup_scan_qdrant_in_worker_threads(
+        self, client, fake_vs, monkeypatch
+    ):
+        _create(client, "doc-1", "Content")
+        on_loop: list[bool] = []
+
+        def list_document_ids():
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return set(fake_vs.vectors) | {"gone"}
+
+        monkeypatch.setattr(fake_vs, "list_document_ids", list_document_ids)
+
+        r = client.post("/kb/audit-sync", json={"auto_heal": True}, headers=HEADERS)
+        assert r.status_code == 200
+        r = client.post("/kb/cleanup-orphans", json={"dry_run": True}, headers=HEADERS)
+        assert r.status_code == 200
+        assert r.json()["orphans_found"] == 1
+        r = client.post("/kb/reindex-missing", headers=HEADERS)
+        assert r.status_code == 200
+
+        assert on_loop and not any(on_loop)
@@ -0,0 +1,386 @@
+"""Unit tests for the blue/green collection re-index."""
+
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agent_data import collection_reindex, vector_store
+
+
+class FakeQdrant:
+    """Collections, aliases and per-collection points keyed by document."""
+
+    def __init__(self, collections=(), aliases=None):
+        self.points: dict[str, dict[str, str]] = {name: {} for name in collections}
+        self.aliases: dict[str, str] = dict(aliases or {})
+        self.alias_calls: list[list] = []
+        self.events: list[str] = []
+
+    def get_aliases(self):
+        return SimpleNamespace(
+            aliases=[
+                SimpleNamespace(alias_name=alias, collection_name=target)
+                for alias, target in self.aliases.items()
+            ]
+        )
+
+    def get_collections(self):
+        return SimpleNamespace(
+            collections=[SimpleNamespace(name=name) for name in self.points]
+        )
+
+    def collection_exists(self, name):
+        return name in self.points
+
+    def create_collection(self, collection_name, vectors_config, sparse_vectors_config):
+        self.points[collection_name] = {}
+
+    def create_payload_index(self, collection_name, field_name, field_schema, wait):
+        pass
+
+    def delete_collection(self, collection_name):
+        del self.points[collection_name]
+
+    def update_collection_aliases(self, change_aliases_operations):
+        self.alias_calls.append(change_aliases_operations)
+        for op in change_aliases_operations:
+            if getattr(op, "delete_alias", None):
+                del self.aliases[op.delete_alias.alias_name]
+            else:
+                create = op.create_alias
+                self.aliases[create.alias_name] = create.collection_name
+
+
+class FakeStore:
+    backend = "qdrant"
+    enabled = True
+    dimensions = None
+
+    def __init__(self, client: FakeQdrant, collection: str):
+        self._client = client
+        self.collection = collection
+
+    def _ensure_client(self):
+        pass
+
+    def for_collection(self, collection):
+        return FakeStore(self._client, collection)
+
+    def upsert_documents(self, documents):
+        self._client.events.append(f"upsert {len(documents)}")
+        points = self._client.points[self.collection]
+        results = {}
+        for doc in documents:
+            if doc.content == "FAIL":
+                results[doc.document_id] = vector_store.VectorSyncResult(
+                    status="error", error="embedding failed"
+                )
+                continue
+            points[doc.document_id] = doc.content
+            results[doc.document_id] = vector_store.VectorSyncResult(status="ready")
+        return results
+
+    def delete_document(self, document_id):
+        self._client.points[self.collection].pop(document_id, None)
+
+
+def _to_document(doc_id, row):
+    body = row.get("body")
+    return vector_store.VectorDocument(doc_id, body) if body else None
+
+
+@pytest.fixture(autouse=True)
+def no_health_refresh(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(vector_store, "ensure_collection", lambda: {})
+    monkeypatch.setattr(vector_store, "_sparse_support", {})
+
+
+@pytest.mark.unit
+def test_builds_next_version_and_switches_alias_atomically():
+    client = FakeQdrant(
+        collections=["test_documents_v1"],
+        aliases={"test_documents": "test_documents_v1"},
+    )
+    rows = [
+        {"_key": "a", "body": "alpha", "revision": 1},
+        {"_key": "c", "body": "", "revision": 1},
+        {"_key": "d", "body": "gone", "deleted_at": "2026-01-01"},
+    ]
+    job = collection_reindex.BlueGreenReindex(
+        FakeStore(client, "test_documents"), lambda: rows, _to_document, batch_size=2
+    )
+
+    progress = job.run().to_dict()
+
+    assert progress["phase"] == "completed"
+    assert progress["target"] == "test_documents_v2"
+    assert progress["source"] == "test_documents_v1"
+    assert progress["processed_docs"] == progress["total_docs"] == 3
+    assert progress["indexed"] == 1
+    assert progress["skipped"] == 2
+    assert progress["errors"] == []
+    assert client.aliases == {"test_documents": "test_documents_v2"}
+    # One request deletes and recreates the alias
+    assert len(client.alias_calls) == 1
+    assert len(client.alias_calls[0]) == 2
+    assert client.points["test_documents_v2"] == {"a": "alpha"}
+    # The old collection is kept for rollback
+    assert "test_documents_v1" in client.points
+
+
+@pytest.mark.unit
+def test_catch_up_applies_writes_made_during_the_build():
+    client = FakeQdrant(collections=["kb_v1"], aliases={"kb": "kb_v1"})
+    passes = [
+        [
+            {"_key": "a", "body": "old", "revision": 1},
+            {"_key": "b", "body": "bravo", "revision": 1},
+        ],
+        [
+            {"_key": "a", "body": "new", "revision": 2},
+            {"_key": "c", "body": "charlie", "revision": 1},
+        ],
+    ]
+    job = collection_reindex.BlueGreenReindex(
+        FakeStore(client, "kb"), lambda: passes.pop(0), _to_document
+    )
+
+    progress = job.run()
+
+    assert progress.phase == "completed"
+    assert progress.caught_up == 3
+    assert client.points["kb_v2"] == {"a": "new", "c": "charlie"}
+
+
+@pytest.mark.unit
+def test_failed_documents_are_retried_and_block_the_switch():
+    client = FakeQdrant(collections=["kb_v1"], aliases={"kb": "kb_v1"})
+    rows = [
+        {"_key": "a", "body": "alpha", "revision": 1},
+        {"_key": "b", "body": "FAIL", "revision": 1},
+    ]
+    store = FakeStore(client, "kb")
+
+    progress = collection_reindex.BlueGreenReindex(
+        store, lambda: rows, _to_document
+    ).run()
+
+    # Retried in catch-up, still failing: the alias stays on the old collection
+    assert progress.phase == "failed"
+    assert "1 documents still fail to index" in progress.error
+    assert progress.error_count == 2
+    assert client.events == ["upsert 2", "upsert 1"]
+    assert client.aliases == {"kb": "kb_v1"}
+
+    # A failure that clears on retry is indexed before the switch
+    passes = [rows, [rows[0], {"_key": "b", "body": "bravo", "revision": 1}]]
+    progress = collection_reindex.BlueGreenReindex(
+        store, lambda: passes.pop(0), _to_document
+    ).run()
+
+    assert progress.phase == "completed"
+    assert client.aliases == {"kb": "kb_v3"}
+    assert client.points["kb_v3"] == {"a": "alpha", "b": "bravo"}
+
+
+@pytest.mark.unit
+def test_writes_after_catch_up_are_resynced_once_the_alias_switches():
+    client = FakeQdrant(collections=["kb_v1"], aliases={"kb": "kb_v1"})
+    rows = [{"_key": "a", "body": "alpha", "revision": 1}]
+    resynced = []
+
+    def resync(since):
+        # The write path now resolves the alias to the new collection
+        resynced.append((since, dict(client.aliases)))
+        return 3
+
+    before = time.time()
+    progress = collection_reindex.BlueGreenReindex(
+        FakeStore(client, "kb"), lambda: rows, _to_document, resync=resync
+    ).run()
+
+    assert progress.phase == "completed"
+    assert progress.resynced == 3
+    [(since, aliases)] = resynced
+    assert aliases == {"kb": "kb_v2"}
+    margin = collection_reindex.REINDEX_RESYNC_MARGIN_SECONDS
+    assert before - margin <= since <= time.time() - margin
+
+    def broken(since):
+        raise ConnectionError("pg down")
+
+    progress = collection_reindex.BlueGreenReindex(
+        FakeStore(client, "kb"), lambda: rows, _to_document, resync=broken
+    ).run()
+
+    assert progress.phase == "failed"
+    assert "switched to kb_v3" in progress.error
+    assert "pg down" in progress.error
+
+
+class PointsQdrant(FakeQdrant):
+    """Keeps the written points and each collection's sparse vector config."""
+
+    def __init__(self, collections=(), aliases=None):
+        super().__init__(collections, aliases)
+        self.sparse = dict.fromkeys(self.points)
+
+    def create_collection(
+        self, collection_name, vectors_config, sparse_vectors_config, **kwargs
+    ):
+        super().create_collection(collection_name, vectors_config, None)
+        self.sparse[collection_name] = sparse_vectors_config
+
+    def get_collection(self, collection_name):
+        name = self.aliases.get(collection_name, collection_name)
+        params = SimpleNamespace(sparse_vectors=self.sparse[name])
+        return SimpleNamespace(config=SimpleNamespace(params=params))
+
+    def scroll(self, collection_name, **kwargs):
+        return [], None
+
+    def upsert(self, collection_name, points, wait):
+        name = self.aliases.get(collection_name, collection_name)
+        for point in points:
+            self.points[name][point.payload["document_id"]] = point
+
+
+@pytest.mark.unit
+def test_build_writes_sparse_vectors_when_live_collection_is_dense_only(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setenv("QDRANT_URL", "https://example.qdrant.io")
+    monkeypatch.setenv("QDRANT_API_KEY", "qdrant-key")
+    monkeypatch.setenv("OPENAI_API_KEY", "openai-key")
+    monkeypatch.setattr(vector_store, "HYBRID_SEARCH", True)
+    client = PointsQdrant(collections=["kb_v1"], aliases={"kb": "kb_v1"})
+    store = vector_store.QdrantVectorStore()
+    store.collection = "kb"
+    store._client = client
+    store._openai = SimpleNamespace(
+        embeddings=SimpleNamespace(
+            create=lambda model, input, **kw: SimpleNamespace(
+                data=[
+                    SimpleNamespace(index=i, embedding=[0.5]) for i in range(len(input))
+                ]
+            )
+        )
+    )
+    # The live collection predates hybrid search
+    store.upsert_document(document_id="old", content="before the re-index")
+    assert "bm25" not in client.points["kb_v1"]["old"].vector
+
+    rows = [{"_key": "a", "body": "release notes for TD-131", "revision": 1}]
+    progress = collection_reindex.BlueGreenReindex(
+        store, lambda: rows, _to_document
+    ).run()
+
+    assert progress.phase == "completed"
+    assert progress.sparse_vectors is True
+    assert "bm25" in client.points["kb_v2"]["a"].vector
+
+
+@pytest.mark.unit
+def test_concrete_collection_requires_replace_flag():
+    client = FakeQdrant(collections=["kb"])
+    rows = [{"_key": "a", "body": "alpha", "revision": 1}]
+
+    refused = collection_reindex.BlueGreenReindex(
+        FakeStore(client, "kb"), lambda: rows, _to_document
+    ).run()
+
+    assert refused.phase == "failed"
+    assert "replace_collection" in refused.error
+    assert client.aliases == {}
+
+    replaced = collection_reindex.BlueGreenReindex(
+        FakeStore(client, "kb"), lambda: rows, _to_document, replace_collection=True
+    ).run()
+
+    assert replaced.phase == "completed"
+    assert client.aliases == {"kb": "kb_v1"}
+    assert "kb" not in client.points
+
+
+@pytest.mark.unit
+def test_rollback_points_alias_at_previous_version():
+    client = FakeQdrant(
+        collections=["kb_v1", "kb_v2", "kb_v3"], aliases={"kb": "kb_v3"}
+    )
+    store = FakeStore(client, "kb")
+
+    result = collection_reindex.rollback(store)
+
+    assert result == {"alias": "kb", "previous": "kb_v3", "collection": "kb_v2"}
+    assert client.aliases == {"kb": "kb_v2"}
+
+    collection_reindex.rollback(store, "kb_v3")
+    assert client.aliases == {"kb": "kb_v3"}
+    with pytest.raises(ValueError):
+        collection_reindex.rollback(store, "kb_v9")
+
+
+@pytest.mark.unit
+def test_build_streams_rows_in_batches_without_loading_the_corpus():
+    client = FakeQdrant(collections=["kb_v1"], aliases={"kb": "kb_v1"})
+    passes = []
+
+    def stream():
+        passes.append(1)
+        for i in range(5):
+            if len(passes) == 1:
+                client.events.append(f"row {i}")
+            yield {"_key": f"d{i}", "body": f"body {i}", "revision": 1}
+
+    def count():
+        client.events.append("count")
+        return 5
+
+    progress = collection_reindex.BlueGreenReindex(
+        FakeStore(client, "kb"), stream, _to_document, count_docs=count, batch_size=2
+    ).run()
+
+    assert progress.phase == "completed"
+    # Each batch is upserted before the next rows are read
+    assert client.events == [
+        "count",
+        "row 0",
+        "row 1",
+        "upsert 2",
+        "row 2",
+        "row 3",
+        "upsert 2",
+        "row 4",
+        "upsert 1",
+    ]
+    assert progress.processed_docs == progress.total_docs == 5
+
+
+@pytest.mark.unit
+def test_progress_without_a_count_leaves_total_and_eta_unknown():
+    progress = collection_reindex.ReindexProgress(job_id="j", alias="kb")
+    progress.started_at -= 10
+    progress.processed_docs = 25
+
+    report = progress.to_dict()
+
+    assert report["total_docs"] is None
+    assert report["percent"] is None
+    assert report["eta_seconds"] is None
+
+
+@pytest.mark.unit
+def test_progress_reports_eta_while_running():
+    progress = collection_reindex.ReindexProgress(job_id="j", alias="kb")
+    progress.started_at -= 10
+    progress.total_docs = 100
+    progress.processed_docs = 25
+
+    report = progress.to_dict()
+
+    assert report["running"] is True
+    assert report["percent"] == 25.0
+    assert report["eta_seconds"] == pytest.approx(30, rel=0.05)
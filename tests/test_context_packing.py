@@ -0,0 +1,98 @@
+"""Unit tests for token-budgeted prompt context packing."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from agent_data import context_packing, vector_store
+
+
+def _counter():
+    return vector_store.get_token_counter("text-embedding-3-small")
+
+
+def _entry(document_id: str, text: str, score: float):
+    return SimpleNamespace(document_id=document_id, snippet=text, score=score)
+
+
+PROSE = (
+    "The retention policy keeps audit records for seven years and moves them "
+    "to cold storage after the first ninety days of inactivity."
+)
+OTHER = (
+    "Deployments run through the staging cluster first; a canary receives five "
+    "percent of traffic for an hour before the full rollout starts."
+)
+
+
+@pytest.mark.unit
+def test_near_duplicates_are_detected_by_minhash():
+    base = context_packing.minhash(context_packing.shingles(PROSE * 3))
+    edited = context_packing.minhash(
+        context_packing.shingles((PROSE * 3).replace("seven", "eight", 1))
+    )
+    unrelated = context_packing.minhash(context_packing.shingles(OTHER * 3))
+
+    assert context_packing.similarity(base, base) == 1.0
+    assert context_packing.similarity(base, edited) >= 0.8
+    assert context_packing.similarity(base, unrelated) < 0.2
+
+
+@pytest.mark.unit
+def test_packs_best_scores_first_and_drops_duplicates():
+    entries = [
+        _entry("low", OTHER, 0.2),
+        _entry("best", PROSE, 0.9),
+        _entry("copy", PROSE + " ", 0.8),
+    ]
+
+    packed = context_packing.pack_context(
+        entries, budget=1000, counter=_counter(), by_score=True
+    )
+
+    assert [e.document_id for e in packed.entries] == ["best", "low"]
+    assert packed.duplicates == 1
+    assert packed.text == f"Source: best\n{PROSE}\n\nSource: low\n{OTHER}"
+    assert packed.tokens == _counter().count(packed.text)
+
+
+@pytest.mark.unit
+def test_keeps_the_callers_order_by_default():
+    # An MMR pick can place a lower-scoring, more novel chunk first
+    entries = [_entry("novel", OTHER, 0.4), _entry("best", PROSE, 0.9)]
+
+    packed = context_packing.pack_context(entries, budget=1000, counter=_counter())
+
+    assert [e.document_id for e in packed.entries] == ["novel", "best"]
+
+
+@pytest.mark.unit
+def test_budget_cuts_the_crossing_chunk_and_skips_what_cannot_fit():
+    counter = _counter()
+    long_text = " ".join(f"word{i}" for i in range(400))
+    entries = [
+        _entry("first", OTHER, 0.9),
+        _entry("long", long_text, 0.8),
+        _entry("tail", PROSE, 0.1),
+    ]
+
+    packed = context_packing.pack_context(entries, budget=200, counter=counter)
+
+    assert [e.document_id for e in packed.entries] == ["first", "long"]
+    assert packed.truncated == 1
+    assert packed.over_budget == 1
+    assert packed.tokens <= 200
+    assert counter.count(packed.text) <= 200
+    assert packed.text.split("\n\n")[1].startswith("Source: long\nword0 word1")
+
+
+@pytest.mark.unit
+def test_prefers_full_chunk_text_over_snippet():
+    entry = _entry("doc", "short snippet", 0.5)
+    entry.prompt_text = PROSE
+
+    packed = context_packing.pack_context([entry], counter=_counter())
+
+    assert packed.text == f"Source: doc\n{PROSE}"
@@ -0,0 +1,32 @@
+"""Unit tests for MMR diversity re-ranking."""
+
+from __future__ import annotations
+
+import pytest
+
+from agent_data import diversity
+
+QUERY = [1.0, 0.0, 0.0]
+# Two near-copies of the best match, then a less relevant distinct document
+CANDIDATES = [
+    [0.95, 0.31, 0.0],
+    [0.94, 0.33, 0.0],
+    [0.80, 0.0, 0.60],
+]
+
+
+@pytest.mark.unit
+def test_mmr_prefers_a_distinct_document_over_a_near_copy():
+    assert diversity.mmr_select(QUERY, CANDIDATES, 2, lambda_=0.5) == [0, 2]
+
+
+@pytest.mark.unit
+def test_lambda_one_keeps_relevance_order():
+    assert diversity.mmr_select(QUERY, CANDIDATES, 3, lambda_=1.0) == [0, 1, 2]
+
+
+@pytest.mark.unit
+def test_mmr_handles_small_and_empty_candidate_sets():
+    assert diversity.mmr_select(QUERY, CANDIDATES[:1], 5) == [0]
+    assert diversity.mmr_select(QUERY, [], 5) == []
+    assert diversity.mmr_select(QUERY, CANDIDATES, 0) == []
@@ -0,0 +1,185 @@
+"""Tests for the in-process memory-mapped vector backend."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from agent_data import local_vector_store, vector_store
+
+
+@pytest.fixture(autouse=True)
+def offline_store(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("APP_ENV", "test")
+    monkeypatch.setattr(local_vector_store, "LOCAL_VECTOR_PATH", str(tmp_path))
+    monkeypatch.setattr(vector_store, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(vector_store, "_collection_status", None)
+    vector_store.get_embedding_cache().clear()
+    vector_store.get_query_embedding_cache().clear()
+    yield
+    monkeypatch.setattr(vector_store, "VECTOR_BACKEND", "qdrant")
+    vector_store.get_vector_store(refresh=True)
+    vector_store.get_async_vector_store(refresh=True)
+    vector_store.get_embedding_cache().clear()
+    vector_store.get_query_embedding_cache().clear()
+
+
+def _store() -> local_vector_store.LocalVectorStore:
+    store = vector_store.get_vector_store(refresh=True)
+    assert isinstance(store, local_vector_store.LocalVectorStore)
+    return store
+
+
+@pytest.mark.unit
+def test_backend_selected_by_env_and_enabled_offline():
+    store = _store()
+
+    assert store.enabled is True
+    assert store.embedding_model.startswith("feature-hash-")
+    assert vector_store.ensure_collection()["status"] == "skipped"
+
+
+@pytest.mark.unit
+def test_search_ranks_exactly_and_groups_by_document():
+    store = _store()
+    store.upsert_document(document_id="deploy", content="deployment checklist")
+    store.upsert_document(document_id="keys", content="rotate api keys")
+    store.upsert_document(
+        document_id="mixed",
+        content="deployment notes",
+        metadata={"tags": ["ops"], "status": "published"},
+    )
+
+    results = store.search(query="deployment checklist", top_k=2)
+
+    assert [r["document_id"] for r in results] == ["deploy", "mixed"]
+    assert results[0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+    filtered = store.search(query="deployment", filter_tags=["ops"])
+    assert [r["document_id"] for r in filtered] == ["mixed"]
+    assert store.search(query="deployment", filter_status="draft") == []
+
+
+@pytest.mark.unit
+def test_filter_postings_follow_writes():
+    store = _store()
+    store.upsert_document(
+        document_id="a", content="deployment notes", metadata={"tags": ["ops"]}
+    )
+    store.upsert_document(
+        document_id="b", content="deployment plan", metadata={"tags": ["dev"]}
+    )
+
+    def tagged(*tags):
+        results = store.search(query="deployment", filter_tags=list(tags))
+        return sorted(r["document_id"] for r in results)
+
+    assert tagged("ops") == ["a"]
+    assert tagged("ops", "dev") == ["a", "b"]
+
+    # Re-tagging, deleting and adding documents rebuild the postings
+    store.upsert_document(
+        document_id="b", content="deployment plan", metadata={"tags": ["ops"]}
+    )
+    assert tagged("ops") == ["a", "b"]
+    assert tagged("dev") == []
+    store.delete_document("a")
+    store.upsert_document(
+        document_id="c", content="deployment runbook", metadata={"tags": ["ops"]}
+    )
+    assert tagged("ops") == ["b", "c"]
+
+
+@pytest.mark.unit
+def test_incremental_update_and_delete(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(vector_store, "CHUNK_TOKENS", 50)
+    monkeypatch.setattr(vector_store, "CHUNK_OVERLAP_TOKENS", 0)
+    store = _store()
+    paragraphs = [f"para{i} " + "w" * 80 for i in range(3)]
+    store.upsert_document(document_id="doc", content="\n\n".join(paragraphs))
+    assert store.count_by_document_id("doc") == 3
+
+    result = store.upsert_document(document_id="doc", content=paragraphs[0])
+
+    assert result.status == "ready"
+    assert store.count_by_document_id("doc") == 1
+    assert store.update_metadata("doc", parent_id="folder").status == "ready"
+    payloads = store._client.document_payloads("doc")
+    assert [p["parent_id"] for p in payloads.values()] == ["folder"]
+
+    store.delete_document("doc")
+    assert store.count() == 0
+    assert store.list_document_ids() == set()
+
+
+@pytest.mark.unit
+def test_index_reloads_from_disk_and_compacts(tmp_path):
+    store = _store()
+    for i in range(3):
+        store.upsert_document(document_id=f"d{i}", content=f"document number {i}")
+    store.delete_document("d0")
+    store.delete_document("d1")
+    store.upsert_document(document_id="d2", content="document number two")
+    index = store._client
+    assert len(index._ids) == 4
+
+    reloaded = local_vector_store.MmapVectorIndex(tmp_path, store.collection)
+
+    # Three dead rows against one live row triggers compaction on load
+    assert reloaded.count() == 1
+    assert len(reloaded._ids) == 1
+    assert reloaded.vectors_path.stat().st_size == reloaded.dim * 4
+    assert reloaded.document_ids() == {"d2"}
+
+
+@pytest.mark.unit
+def test_reload_drops_vectors_without_sidecar_record(tmp_path):
+    store = _store()
+    store.upsert_document(document_id="a", content="alpha")
+    index = store._client
+    # Simulate a crash between the vector append and the sidecar write
+    with index.vectors_path.open("ab") as fh:
+        fh.write(b"\0" * index.dim * 4)
+
+    reloaded = local_vector_store.MmapVectorIndex(tmp_path, store.collection)
+
+    assert reloaded.vectors_path.stat().st_size == reloaded.dim * 4
+    assert (
+        reloaded.search_groups(
+            local_vector_store._hash_embedding("alpha", reloaded.dim), None, 5
+        )[0].payload["document_id"]
+        == "a"
+    )
+
+
+@pytest.mark.unit
+def test_async_facade_shares_the_sync_index():
+    store = _store()
+    async_store = vector_store.get_async_vector_store(refresh=True)
+
+    async def run():
+        await async_store.upsert_document(document_id="a", content="alpha beta")
+        return await async_store.search(query="alpha beta", top_k=1)
+
+    results = asyncio.run(run())
+
+    assert results[0]["document_id"] == "a"
+    assert store.count() == 1
+
+
+@pytest.mark.unit
+def test_diversified_search_skips_near_copies():
+    store = _store()
+    store.upsert_document(document_id="law-v1", content="retention law audit records")
+    store.upsert_document(document_id="law-v2", content="retention law audit records")
+    store.upsert_document(document_id="ops", content="retention runbook")
+
+    plain = store.search(query="retention law audit", top_k=2)
+    diverse = store.search(query="retention law audit", top_k=2, diversify=True)
+
+    assert {r["document_id"] for r in plain} == {"law-v1", "law-v2"}
+    ids = {r["document_id"] for r in diverse}
+    assert "ops" in ids
+    assert len(ids & {"law-v1", "law-v2"}) == 1
@@ -0,0 +1,365 @@
+"""Unit tests for the async PostgreSQL API and its pool metrics."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import pytest
+
+from agent_data import pg_store
+
+
+class FakeServerCursor:
+    """Named cursor: records the query and yields every document."""
+
+    def __init__(self, pool: FakeAsyncPool | FakeSyncPool, name: str):
+        self.pool = pool
+        self.name = name
+        self.itersize = 100
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=()):
+        self.pool.streams.append((self.name, self.itersize, sql, params))
+
+    async def __aiter__(self):
+        for key, data in self.pool.docs.items():
+            yield key, data
+
+    def __iter__(self):
+        for key, data in self.pool.docs.items():
+            yield {"key": key, "data": data}
+
+
+class FakeAsyncPool:
+    """Answers SELECT data with one JSONB row and SELECT key, data with all."""
+
+    def __init__(self, docs: dict[str, dict]):
+        self.docs = docs
+        self.statements: list[tuple[str, tuple]] = []
+        self.streams: list[tuple] = []
+
+    @asynccontextmanager
+    async def connection(self):
+        yield self
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    def cursor(self, name=""):
+        return FakeServerCursor(self, name)
+
+    async def execute(self, sql, params=()):
+        self.statements.append((sql, params))
+        if sql.startswith("SELECT data"):
+            rows = [(self.docs[params[0]],)] if params[0] in self.docs else []
+        elif sql.startswith("SELECT key"):
+            rows = list(self.docs.items())
+        else:
+            rows = [()] if params["key"] in self.docs else []
+
+        async def fetchone():
+            return rows[0] if rows else None
+
+        async def fetchall():
+            return rows
+
+        return SimpleNamespace(fetchone=fetchone, fetchall=fetchall, rowcount=len(rows))
+
+    def get_stats(self):
+        return {"pool_size": 3, "pool_available": 1, "pool_max": 10}
+
+
+class FakeSyncPool:
+    """psycopg2 pool handing out one connection with a named cursor."""
+
+    def __init__(self, docs: dict[str, dict]):
+        self.docs = docs
+        self.streams: list[tuple] = []
+        self.autocommit = True
+        self.rollbacks = 0
+        self.returned = 0
+
+    def getconn(self):
+        return self
+
+    def putconn(self, conn):
+        self.returned += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def cursor(self, name=None, cursor_factory=None):
+        self.streams.append(("autocommit", self.autocommit))
+        cur = FakeServerCursor(self, name)
+        cur.execute = lambda sql, params=(): self.streams.append(
+            (cur.name, cur.itersize, sql, params)
+        )
+        return cur
+
+
+@pytest.mark.unit
+def test_async_calls_run_sync_functions_in_threads_without_a_pool(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(pg_store, "_async_pool", None)
+    calls = []
+    monkeypatch.setattr(
+        pg_store, "get_doc", lambda collection, key: calls.append(key) or {"k": key}
+    )
+
+    assert asyncio.run(pg_store.aget_doc("kb_documents", "doc")) == {"k": "doc"}
+    assert calls == ["doc"]
+
+
+@pytest.mark.unit
+def test_async_pool_serves_queries_and_reports_metrics(monkeypatch: pytest.MonkeyPatch):
+    pool = FakeAsyncPool({"doc": {"title": "T"}})
+    monkeypatch.setattr(pg_store, "_async_pool", pool)
+    monkeypatch.setattr(
+        pg_store, "get_doc", lambda *_: pytest.fail("sync path used with a pool")
+    )
+
+    def sample(metric, suffix=""):
+        name = metric.describe()[0].name + suffix
+        return next(
+            s.value for m in metric.collect() for s in m.samples if s.name == name
+        )
+
+    waits_before = sample(pg_store.POOL_WAIT, "_count")
+
+    async def run():
+        return (
+            await pg_store.aget_doc("kb_documents", "doc"),
+            await pg_store.aget_doc("kb_documents", "missing"),
+            [doc async for doc in pg_store.astream_docs("kb_documents")],
+            await pg_store.aget_docs("kb_documents", ["missing", "doc", "doc"]),
+            await pg_store.aupdate_doc("kb_documents", "doc", {"title": "U"}),
+        )
+
+    doc, missing, docs, many, updated = asyncio.run(run())
+
+    assert (doc, missing) == ({"title": "T"}, None)
+    assert many == [None, {"title": "T"}, {"title": "T"}]
+    assert docs == [{"_key": "doc", "title": "T"}]
+    assert updated is True
+    assert pool.statements[0] == (
+        "SELECT data FROM kb_documents WHERE key = %s",
+        ("doc",),
+    )
+    assert pool.streams == [
+        ("stream_kb_documents", 500, "SELECT key, data FROM kb_documents", ())
+    ]
+    assert sample(pg_store.POOL_WAIT, "_count") == waits_before + 5
+    assert sample(pg_store.POOL_SIZE) == 3
+    assert sample(pg_store.POOL_AVAILABLE) == 1
+    with pytest.raises(ValueError):
+        asyncio.run(pg_store.aget_doc("users", "doc"))
+
+
+@pytest.mark.unit
+def test_stream_docs_reads_a_named_cursor_lazily(monkeypatch: pytest.MonkeyPatch):
+    pool = FakeSyncPool({"a": {"title": "A"}, "b": {"title": "B"}})
+    monkeypatch.setattr(pg_store, "_pool", pool)
+
+    rows = pg_store.stream_docs(
+        "kb_documents", fields=("title",), live_only=True, itersize=2
+    )
+    assert pool.streams == []
+    assert next(rows) == {"_key": "a", "title": "A"}
+    rows.close()
+
+    sql = pool.streams[1][2]
+    assert pool.streams[0] == ("autocommit", False)
+    assert pool.streams[1][:2] == ("stream_kb_documents", 2)
+    assert "jsonb_each(data)" in sql
+    assert sql.endswith("FROM kb_documents WHERE data->>'deleted_at' IS NULL")
+    assert pool.streams[1][3] == (["title"],)
+    assert (pool.rollbacks, pool.returned) == (1, 1)
+
+
+@pytest.mark.unit
+def test_async_stream_without_a_pool_pulls_batches_in_threads(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(pg_store, "_async_pool", None)
+    pool = FakeSyncPool({f"d{i}": {"n": i} for i in range(5)})
+    monkeypatch.setattr(pg_store, "_pool", pool)
+
+    async def run():
+        return [
+            doc["n"] async for doc in pg_store.astream_docs("kb_documents", itersize=2)
+        ]
+
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+    assert pool.streams[1][:2] == ("stream_kb_documents", 2)
+    assert (pool.rollbacks, pool.returned) == (1, 1)
+
+
+@pytest.mark.unit
+def test_kb_document_writes_sync_the_promoted_columns(monkeypatch: pytest.MonkeyPatch):
+    upsert = pg_store._upsert_sql("kb_documents")
+    update = pg_store._update_sql("kb_documents")
+
+    for name in pg_store.KB_COLUMNS:
+        assert f"{name} = EXCLUDED.{name}" in upsert
+        assert f"{name} = " in update
+    assert "(data || %(updates)s::jsonb)#>>'{metadata,title}'" in update
+    assert pg_store._update_sql("metadata_store") == (
+        "UPDATE metadata_store SET data = data || %(updates)s WHERE key = %(key)s"
+    )
+
+    monkeypatch.setattr(pg_store, "PG_HOT_COLUMNS", True)
+    assert pg_store._stream_query("kb_documents", None, True)[0].endswith(
+        "WHERE deleted_at IS NULL"
+    )
+    assert pg_store._stream_query("metadata_store", None, True)[0].endswith(
+        "WHERE data->>'deleted_at' IS NULL"
+    )
+
+
+@pytest.mark.unit
+def test_search_docs_ranks_and_filters_in_one_query(monkeypatch: pytest.MonkeyPatch):
+    executed = []
+    index_valid: list[tuple] = []
+
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params):
+            executed.append((sql, params))
+
+        def fetchone(self):
+            return index_valid[0] if index_valid else None
+
+        def fetchall(self):
+            return [{"key": "a", "data": {"document_id": "a"}, "rank": 0.5}]
+
+    @contextmanager
+    def conn():
+        yield SimpleNamespace(cursor=lambda **_: Cursor())
+
+    monkeypatch.setattr(pg_store, "_conn", conn)
+    monkeypatch.setattr(pg_store, "_kb_search_indexed", False)
+    monkeypatch.setattr(pg_store, "_kb_search_checked_at", float("-inf"))
+
+    hits = pg_store.search_docs(
+        "kb_documents", ["qdrant", "ops"], tags=["x"], status="published", limit=3
+    )
+
+    assert hits == [({"_key": "a", "document_id": "a"}, 0.5)]
+    assert "indisvalid" in executed[0][0]
+    sql, params = executed[1]
+    assert "websearch_to_tsquery('kb_search', %(query)s)" in sql
+    # Until the backfill has indexed the column the vector is computed per row
+    assert "search_vector" not in sql
+    assert "to_tsvector('kb_search'::regconfig" in sql
+    assert "ORDER BY rank DESC LIMIT %(limit)s" in sql
+    assert "data#>'{metadata,tags}' ?| %(tags)s" in sql
+    assert "tenant_id" not in sql
+    assert params == {
+        "query": "qdrant or ops",
+        "limit": 3,
+        "tags": ["x"],
+        "status": "published",
+    }
+    assert pg_store.search_docs("kb_documents", []) == []
+    with pytest.raises(ValueError):
+        pg_store.search_docs("metadata_store", ["x"])
+
+    # The missing index is not looked up again on every search
+    index_valid.append((True,))
+    pg_store.search_docs("kb_documents", ["qdrant"])
+    assert "indisvalid" not in executed[-2][0]
+    assert "search_vector" not in executed[-1][0]
+
+    # Once it is valid the indexed column is used, hot columns or not
+    monkeypatch.setattr(pg_store, "_kb_search_checked_at", float("-inf"))
+    pg_store.search_docs("kb_documents", ["qdrant"])
+    sql, _ = executed[-1]
+    assert "ts_rank(search_vector, q, 32)" in sql
+    assert "search_vector @@ q" in sql
+    assert "data->>'deleted_at' IS NULL" in sql
+    executed.clear()
+    pg_store.search_docs("kb_documents", ["qdrant"])
+    assert len(executed) == 1 and "search_vector @@ q" in executed[0][0]
+
+
+@pytest.mark.unit
+def test_doc_ids_updated_since_includes_deleted_documents(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    executed = []
+
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params):
+            executed.append((sql, params))
+
+        def fetchall(self):
+            return [("a",), ("b",)]
+
+    @contextmanager
+    def conn():
+        yield SimpleNamespace(cursor=lambda **_: Cursor())
+
+    monkeypatch.setattr(pg_store, "_conn", conn)
+    since = datetime(2026, 1, 1, tzinfo=UTC)
+
+    assert pg_store.doc_ids_updated_since("kb_documents", since) == ["a", "b"]
+    sql, params = executed[-1]
+    assert "kb_timestamptz(data->>'updated_at') >= %s" in sql
+    assert "deleted_at" not in sql
+    assert params == (since,)
+
+    monkeypatch.setattr(pg_store, "PG_HOT_COLUMNS", True)
+    pg_store.doc_ids_updated_since("kb_documents", since)
+    assert "WHERE updated_at >= %s" in executed[-1][0]
+    with pytest.raises(ValueError):
+        pg_store.doc_ids_updated_since("metadata_store", since)
+
+
+@pytest.mark.unit
+def test_startup_upgrades_search_config_without_touching_the_table():
+    executed: list[str] = []
+
+    class Cursor:
+        def execute(self, sql, params=None):
+            executed.append(" ".join(sql.split()))
+
+        def fetchone(self):
+            # unaccent installed after the config was created without it
+            return (True, False)
+
+    pg_store._ensure_kb_search(Cursor())
+
+    assert not any("kb_documents" in sql for sql in executed)
+    assert any("CREATE TEXT SEARCH CONFIGURATION kb_search" in s for s in executed)
+    assert executed[-1] == (
+        "ALTER TEXT SEARCH CONFIGURATION kb_search"
+        " ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple"
+    )
+    assert "idx_kb_documents_search" in pg_store.KB_COLUMN_INDEXES
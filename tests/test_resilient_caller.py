@@ -10,6 +10,8 @@ from agent_data.resilient_client import (
     ResilientCaller,
     ServiceHealthRegistry,
     ServiceStatus,
+    async_retry,
+    bootstrap_qdrant_collection,
     discover_services,
     probe_openai,
     probe_qdrant,
@@ -64,6 +66,36 @@ class TestSyncRetry:
         assert call_count == 1  # No retries for ValueError
 
 
+@pytest.mark.unit
+class TestAsyncRetry:
+    def test_succeeds_after_transient_failure(self):
+        call_count = 0
+
+        @async_retry(max_retries=3, service_name="test")
+        async def flaky_func():
+            nonlocal call_count
+            call_count += 1
+            if call_count < 3:
+                raise TimeoutError("temporary")
+            return "success"
+
+        assert asyncio.run(flaky_func()) == "success"
+        assert call_count == 3
+
+    def test_no_retry_on_value_error(self):
+        call_count = 0
+
+        @async_retry(max_retries=3, service_name="test")
+        async def bad_args_func():
+            nonlocal call_count
+            call_count += 1
+            raise ValueError("bad input")
+
+        with pytest.raises(ValueError):
+            asyncio.run(bad_args_func())
+        assert call_count == 1
+
+
 # ---------------------------------------------------------------------------
 # ServiceHealthRegistry tests
 # ---------------------------------------------------------------------------
@@ -209,6 +241,16 @@ class TestProbes:
         result = asyncio.run(_run())
         assert result is False
 
+    def test_bootstrap_collection_reports_drift(self):
+        report = {"status": "drift", "drift": ["vector size: expected 1536"]}
+        with patch("agent_data.vector_store.ensure_collection", return_value=report):
+            assert asyncio.run(bootstrap_qdrant_collection()) is False
+        with patch(
+            "agent_data.vector_store.ensure_collection",
+            return_value={"status": "ok", "drift": []},
+        ):
+            assert asyncio.run(bootstrap_qdrant_collection()) is True
+
     def test_probe_openai_with_key(self, monkeypatch):
         monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
         result = asyncio.run(probe_openai())
@@ -3,6 +3,7 @@ from unittest.mock import MagicMock, patch
 import pytest
 from fastapi.testclient import TestClient
 
+from tests.helpers import AsyncStoreAdapter
 from tests.langroid_test_stubs import install_langroid_stubs
 
 install_langroid_stubs()
@@ -20,6 +21,11 @@ def stub_vector_store(monkeypatch: pytest.MonkeyPatch):
     store.update_metadata.return_value = VectorSyncResult(status="skipped")
 
     monkeypatch.setattr(server.vector_store, "get_vector_store", lambda: store)
+    monkeypatch.setattr(
+        server.vector_store,
+        "get_async_vector_store",
+        lambda refresh=False: AsyncStoreAdapter(store),
+    )
     monkeypatch.setenv("API_KEY", "test-api-key-for-ci")
     return store
 
@@ -99,9 +105,9 @@ def test_query_knowledge_calls_agent_llm_response(mock_agent: MagicMock):
 @pytest.mark.unit
 @patch("agent_data.server.agent")
 @patch("agent_data.server._ensure_pg", return_value=True)
-@patch("agent_data.pg_store.stream_docs")
+@patch("agent_data.pg_store.search_docs")
 def test_query_knowledge_returns_context(
-    mock_stream: MagicMock, mock_ensure_pg: MagicMock, mock_agent: MagicMock
+    mock_search: MagicMock, mock_ensure_pg: MagicMock, mock_agent: MagicMock
 ):
     client = TestClient(server.app)
 
@@ -112,16 +118,14 @@ def test_query_knowledge_returns_context(
     mock_reply.content = "Langroid is great"
     mock_agent.llm_response.return_value = mock_reply
 
-    documents = [
-        {
-            "_key": "doc-1",
-            "document_id": "doc-1",
-            "content": {"body": "Langroid helps orchestrate multi-agent systems."},
-            "metadata": {"tags": ["langroid", "ai"]},
-        }
-    ]
+    document = {
+        "_key": "doc-1",
+        "document_id": "doc-1",
+        "content": {"body": "Langroid helps orchestrate multi-agent systems."},
+        "metadata": {"tags": ["langroid", "ai"]},
+    }
 
-    mock_stream.return_value = documents
+    mock_search.return_value = [(document, 0.4)]
 
     payload = {
         "query": "What is Langroid?",
@@ -136,7 +140,85 @@ def test_query_knowledge_returns_context(
     assert resp.status_code == 200
     data = resp.json()
     assert data["context"][0]["document_id"] == "doc-1"
+    assert data["context"][0]["score"] == 0.4
     assert data["usage"]["qdrant_hits"] == 1
+    assert data["usage"]["prompt_tokens"] > data["usage"]["context_tokens"] > 0
+    # Filters and ranking run in PostgreSQL
+    mock_search.assert_called_once_with(
+        server.KB_COLLECTION,
+        ["what", "langroid"],
+        tags=["langroid"],
+        tenant_id=None,
+        status=None,
+        limit=3,
+    )
+
+
+@pytest.mark.unit
+@patch("agent_data.server.agent")
+def test_query_knowledge_packs_full_chunks_and_drops_duplicates(
+    mock_agent: MagicMock, stub_vector_store: MagicMock
+):
+    client = TestClient(server.app)
+
+    mock_agent.history = None
+    mock_agent.llm_response.return_value = MagicMock(content="ok")
+    chunk = "Audit records are kept for seven years in cold storage. " * 20
+    stub_vector_store.enabled = True
+    stub_vector_store.search.return_value = [
+        {"document_id": doc_id, "snippet": chunk[:500], "content": chunk, "score": s}
+        for doc_id, s in (("doc-1", 0.9), ("doc-1-copy", 0.8))
+    ]
+
+    resp = client.post(
+        "/chat",
+        json={"query": "How long are audit records kept?"},
+        headers={"X-API-Key": "test-api-key-for-ci"},
+    )
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [c["document_id"] for c in data["context"]] == ["doc-1"]
+    assert data["context"][0]["snippet"] == chunk[:500]
+    assert data["usage"]["qdrant_hits"] == 2
+    prompt = mock_agent.llm_response.call_args.args[0]
+    assert chunk.strip() in prompt
+    assert "doc-1-copy" not in prompt
+    assert data["usage"]["prompt_tokens"] > data["usage"]["context_tokens"] > 0
+
+
+@pytest.mark.unit
+@patch("agent_data.server.agent")
+def test_query_routing_and_mcp_search_request_diversified_results(
+    mock_agent: MagicMock, stub_vector_store: MagicMock
+):
+    import asyncio
+
+    client = TestClient(server.app)
+    mock_agent.history = None
+    mock_agent.llm_response.return_value = MagicMock(content="ok")
+    stub_vector_store.enabled = True
+    stub_vector_store.search.return_value = []
+
+    resp = client.post(
+        "/chat",
+        json={
+            "query": "Overview of the retention laws",
+            "routing": {"diversify": True, "mmr_lambda": 0.3},
+        },
+        headers={"X-API-Key": "test-api-key-for-ci"},
+    )
+    assert resp.status_code == 200
+    kwargs = stub_vector_store.search.call_args.kwargs
+    assert (kwargs["diversify"], kwargs["mmr_lambda"]) == (True, 0.3)
+
+    asyncio.run(
+        server._dispatch_mcp_tool(
+            "search_knowledge", {"query": "Overview", "diversify": True}
+        )
+    )
+    kwargs = stub_vector_store.search.call_args.kwargs
+    assert (kwargs["diversify"], kwargs["mmr_lambda"]) == (True, None)
 
 
 @pytest.mark.unit
@@ -897,9 +979,9 @@ def test_patch_document_ambiguous_match(
 # ---------------------------------------------------------------------------
 @pytest.mark.unit
 @patch("agent_data.server._ensure_pg", return_value=True)
-@patch("agent_data.pg_store.get_doc")
+@patch("agent_data.pg_store.get_docs")
 def test_batch_read_multiple_docs(
-    mock_get_doc: MagicMock,
+    mock_get_docs: MagicMock,
     mock_ensure_pg: MagicMock,
     monkeypatch: pytest.MonkeyPatch,
 ):
@@ -921,14 +1003,8 @@ def test_batch_read_multiple_docs(
         "deleted_at": None,
     }
 
-    def get_doc_side_effect(collection, key):
-        if key == "doc__a":
-            return doc_a
-        if key == "doc__b":
-            return doc_b
-        return None
-
-    mock_get_doc.side_effect = get_doc_side_effect
+    docs = {"doc__a": doc_a, "doc__b": doc_b}
+    mock_get_docs.side_effect = lambda collection, keys: [docs.get(k) for k in keys]
 
     resp = client.post(
         "/documents/batch",
@@ -952,12 +1028,17 @@ def test_batch_read_multiple_docs(
     # Third doc is missing
     assert body["items"][2]["error"] == "not_found"
 
+    # All paths are fetched in one call
+    mock_get_docs.assert_called_once_with(
+        server.KB_COLLECTION, ["doc__a", "doc__b", "doc__missing"]
+    )
+
 
 @pytest.mark.unit
 @patch("agent_data.server._ensure_pg", return_value=True)
-@patch("agent_data.pg_store.get_doc")
+@patch("agent_data.pg_store.get_docs")
 def test_batch_read_full_mode(
-    mock_get_doc: MagicMock,
+    mock_get_docs: MagicMock,
     mock_ensure_pg: MagicMock,
     monkeypatch: pytest.MonkeyPatch,
 ):
@@ -965,13 +1046,15 @@ def test_batch_read_full_mode(
     client = TestClient(server.app)
 
     big_body = "C" * 800
-    mock_get_doc.return_value = {
-        "document_id": "doc/c",
-        "content": {"body": big_body},
-        "metadata": {"title": "C"},
-        "revision": 1,
-        "deleted_at": None,
-    }
+    mock_get_docs.return_value = [
+        {
+            "document_id": "doc/c",
+            "content": {"body": big_body},
+            "metadata": {"title": "C"},
+            "revision": 1,
+            "deleted_at": None,
+        }
+    ]
 
     resp = client.post(
         "/documents/batch",
@@ -1003,7 +1086,7 @@ def test_batch_read_exceeds_max_rejected(monkeypatch: pytest.MonkeyPatch):
     monkeypatch.setenv("API_KEY", "test-api-key-for-ci")
     client = TestClient(server.app)
 
-    paths = [f"doc/{i}" for i in range(21)]
+    paths = [f"doc/{i}" for i in range(server._BATCH_READ_MAX_PATHS + 1)]
     resp = client.post(
         "/documents/batch",
         json={"paths": paths},
@@ -0,0 +1,42 @@
+import unicodedata
+
+import pytest
+
+from agent_data import sparse_vectors
+
+
+@pytest.mark.unit
+def test_tokenize_keeps_compounds_and_their_parts():
+    tokens = sparse_vectors.tokenize("Fix TD-131 in Nghị định 01/2024")
+
+    assert "td-131" in tokens
+    assert {"td", "131"} <= set(tokens)
+    assert "01/2024" in tokens
+    assert "nghị" in tokens
+
+
+@pytest.mark.unit
+def test_tokenize_normalizes_unicode_forms():
+    decomposed = unicodedata.normalize("NFD", "Nghị định")
+
+    assert sparse_vectors.tokenize(decomposed) == sparse_vectors.tokenize("Nghị định")
+
+
+@pytest.mark.unit
+def test_document_vector_saturates_term_frequency():
+    indices, values = sparse_vectors.document_vector("qdrant qdrant qdrant rollout")
+    weights = dict(zip(indices, values, strict=True))
+    repeated = weights[sparse_vectors._term_index("qdrant")]
+    single = weights[sparse_vectors._term_index("rollout")]
+
+    assert indices == sorted(indices)
+    assert single < repeated < 3 * single
+    assert repeated < sparse_vectors.BM25_K1 + 1
+
+
+@pytest.mark.unit
+def test_query_vector_has_unit_weight_per_distinct_term():
+    indices, values = sparse_vectors.query_vector("deploy deploy checklist")
+
+    assert len(indices) == 2
+    assert values == [1.0, 1.0]
@@ -7,6 +7,7 @@ and reindex-missing functionality.
 
 from __future__ import annotations
 
+from types import SimpleNamespace
 from unittest.mock import patch
 
 import pytest
@@ -14,6 +15,8 @@ from fastapi.testclient import TestClient
 
 import agent_data.server as server
 import agent_data.vector_store as vs_mod
+from agent_data import collection_reindex
+from tests.helpers import AsyncStoreAdapter, upsert_serially
 
 # ---- Fake vector store ----
 
@@ -46,6 +49,9 @@ class FakeVectorStore:
         ]
         return vs_mod.VectorSyncResult(status="ready", chunks_created=len(chunks))
 
+    def upsert_documents(self, documents):
+        return upsert_serially(self, documents)
+
     def delete_document(self, document_id):
         if document_id in self.vectors:
             del self.vectors[document_id]
@@ -91,6 +97,9 @@ def pg_mocks(monkeypatch):
     def fake_get(collection, key):
         return store.get(key)
 
+    def fake_get_many(collection, keys):
+        return [store.get(key) for key in keys]
+
     def fake_set(collection, key, data):
         store[key] = dict(data)
 
@@ -98,11 +107,13 @@ def pg_mocks(monkeypatch):
         if key in store:
             store[key].update(updates)
 
-    def fake_stream(collection):
-        return [{"_key": k, **v} for k, v in store.items()]
+    def fake_stream(collection, *, live_only=False, **_):
+        rows = [{"_key": k, **v} for k, v in store.items()]
+        return [r for r in rows if not live_only or r.get("deleted_at") is None]
 
     patches = {
         "get": patch("agent_data.pg_store.get_doc", side_effect=fake_get),
+        "get_many": patch("agent_data.pg_store.get_docs", side_effect=fake_get_many),
         "set": patch("agent_data.pg_store.set_doc", side_effect=fake_set),
         "update": patch("agent_data.pg_store.update_doc", side_effect=fake_update),
         "stream": patch("agent_data.pg_store.stream_docs", side_effect=fake_stream),
@@ -118,6 +129,9 @@ def fake_vs(monkeypatch):
     store = FakeVectorStore()
     monkeypatch.setattr(vs_mod, "get_vector_store", lambda refresh=False: store)
     monkeypatch.setattr(vs_mod, "delete_document", store.delete_document)
+    monkeypatch.setattr(
+        vs_mod, "get_async_vector_store", lambda refresh=False: AsyncStoreAdapter(store)
+    )
     return store
 
 
@@ -398,6 +412,20 @@ class TestReindexMissing:
         assert r.status_code == 200
         assert r.json()["ghost_count"] == 0
 
+    def test_in_place_reindex_refused_while_blue_green_runs(
+        self, client, fake_vs, monkeypatch
+    ):
+        job = SimpleNamespace(
+            progress=collection_reindex.ReindexProgress(job_id="j", alias="kb")
+        )
+        monkeypatch.setattr(collection_reindex, "_active", job)
+
+        r = client.post("/kb/reindex", headers=HEADERS, json={"mode": "in_place"})
+
+        assert r.status_code == 409
+        assert r.json()["code"] == "CONFLICT"
+        assert r.json()["details"]["progress"]["job_id"] == "j"
+
 
 # ===================================================================
 # Cleanup Max Delete Safety Test
@@ -5,12 +5,22 @@ import pytest
 
 from agent_data import vector_store
 
+# get_collection answer for fakes: a collection without the bm25 vector
+DENSE_ONLY_COLLECTION = SimpleNamespace(
+    config=SimpleNamespace(params=SimpleNamespace(sparse_vectors=None)),
+    points_count=0,
+)
+
 
 @pytest.fixture(autouse=True)
 def reset_vector_store():
     vector_store.get_vector_store(refresh=True)
+    vector_store.get_embedding_cache().clear()
+    vector_store.get_query_embedding_cache().clear()
     yield
     vector_store.get_vector_store(refresh=True)
+    vector_store.get_embedding_cache().clear()
+    vector_store.get_query_embedding_cache().clear()
 
 
 def test_vector_store_disabled_without_env(monkeypatch: pytest.MonkeyPatch):
@@ -48,9 +58,12 @@ def test_vector_store_upsert_success(monkeypatch: pytest.MonkeyPatch):
             self.embeddings = FakeEmbeddings()
 
     class FakeQdrantClient:
-        def __init__(self, url: str, api_key: str, timeout: int):
+        def __init__(self, url: str, api_key: str, timeout: int, **kwargs):
             captured["client"] = MagicMock(url=url, api_key=api_key, timeout=timeout)
 
+        def get_collection(self, collection_name):
+            return DENSE_ONLY_COLLECTION
+
         def upsert(self, collection_name, points, wait):
             captured["upsert"] = {
                 "collection": collection_name,
@@ -58,6 +71,9 @@ def test_vector_store_upsert_success(monkeypatch: pytest.MonkeyPatch):
                 "wait": wait,
             }
 
+        def scroll(self, **kwargs):
+            return [], None
+
     monkeypatch.setattr(vector_store, "OpenAI", FakeOpenAI)
     monkeypatch.setattr(vector_store, "QdrantClient", FakeQdrantClient)
 
@@ -101,6 +117,9 @@ def test_vector_store_delete(monkeypatch: pytest.MonkeyPatch):
         def __init__(self, *args, **kwargs):
             pass
 
+        def get_collection(self, collection_name):
+            return DENSE_ONLY_COLLECTION
+
         def upsert(self, *args, **kwargs):
             pass
 
@@ -127,18 +146,21 @@ def test_vector_store_delete(monkeypatch: pytest.MonkeyPatch):
 # ============================================================================
 
 
-def test_split_text_short():
+def _counter():
+    return vector_store.get_token_counter("text-embedding-3-small")
+
+
+def test_chunk_text_short():
     """Short text should not be split."""
     text = "This is a short document."
-    chunks = vector_store._split_text(text, chunk_size=4000, overlap=400)
-    assert len(chunks) == 1
-    assert chunks[0] == text
+    chunks = vector_store._chunk_text(text, _counter(), max_tokens=800)
+    assert [c.text for c in chunks] == [text]
+    assert chunks[0].tokens == _counter().count(text)
 
 
-def test_split_text_long():
-    """Long text should be split into multiple chunks."""
-    # Create a 10000 char document
-    text = "This is paragraph one. " * 100  # ~2300 chars
+def test_chunk_text_long_respects_token_budget():
+    """Long text is split; every chunk fits and reports its exact size."""
+    text = "This is paragraph one. " * 100
     text += "\n\n"
     text += "This is paragraph two. " * 100
     text += "\n\n"
@@ -148,32 +170,79 @@ def test_split_text_long():
     text += "\n\n"
     text += "Final paragraph content. " * 50
 
-    # With chunk_size=4000, overlap=400, expect 3+ chunks
-    chunks = vector_store._split_text(text, chunk_size=4000, overlap=400)
+    counter = _counter()
+    chunks = vector_store._chunk_text(text, counter, max_tokens=400, overlap=40)
 
     assert len(chunks) > 1
-    # Each chunk should be <= chunk_size (approximately)
     for chunk in chunks:
-        assert len(chunk) <= 4500  # Allow some slack for word boundaries
+        assert chunk.tokens <= 400
+        if counter.exact:
+            assert chunk.tokens == len(counter.encoding.encode_ordinary(chunk.text))
     # Content should be preserved
-    assert "paragraph one" in chunks[0]
-    assert "Final paragraph" in chunks[-1]
+    assert "paragraph one" in chunks[0].text
+    assert "Final paragraph" in chunks[-1].text
+
+
+def test_chunk_text_overlap():
+    """Chunks cut for size repeat trailing paragraphs of the previous one."""
+    paragraphs = [f"Paragraph {i}. " + "word " * 30 for i in range(6)]
+    text = "\n\n".join(paragraphs)
+
+    chunks = vector_store._chunk_text(
+        text, _counter(), max_tokens=80, overlap=40, spans=True
+    )
+
+    assert len(chunks) >= 3
+    assert chunks[0].text.startswith("Paragraph 0.")
+    assert chunks[1].text.startswith("Paragraph 1.")
+    assert "Paragraph 5." in chunks[-1].text
+    # Spans locate each chunk, overlap included, in the source text
+    for chunk in chunks:
+        assert text[chunk.start : chunk.end].split() == chunk.text.split()
+    assert chunks[1].start < chunks[0].end
 
 
-def test_split_text_overlap():
-    """Chunks should have overlapping content."""
-    # Create text with clear markers
-    text = (
-        "MARKER_START " + ("x" * 3800) + " MARKER_MID " + ("y" * 3800) + " MARKER_END"
+@pytest.mark.unit
+def test_chunk_text_keeps_code_fences_and_breaks_at_headings():
+    fence = "```python\ndef f(x):\n\n    return x * 2\n```"
+    text = "\n\n".join(
+        [
+            "# Intro",
+            "Opening paragraph. " * 20,
+            fence,
+            "## Usage",
+            "Usage notes. " * 20,
+        ]
     )
 
-    chunks = vector_store._split_text(text, chunk_size=4000, overlap=400)
+    chunks = vector_store._chunk_text(text, _counter(), max_tokens=200, overlap=0)
 
-    assert len(chunks) >= 2
-    # First chunk should start with MARKER_START
-    assert "MARKER_START" in chunks[0]
-    # Last chunk should contain MARKER_END
-    assert "MARKER_END" in chunks[-1]
+    assert [c.text.splitlines()[0] for c in chunks] == ["# Intro", "## Usage"]
+    assert fence in chunks[0].text
+
+
+@pytest.mark.unit
+def test_chunk_text_splits_oversized_blocks_without_dropping_text():
+    counter = _counter()
+    long_word = "x" * 3000
+    text = "Sentence one is here. " * 60 + long_word
+
+    chunks = vector_store._chunk_text(text, counter, max_tokens=64, overlap=0)
+
+    assert all(c.tokens <= 64 for c in chunks)
+    joined = "".join(c.text for c in chunks)
+    assert joined.count("x") == 3000
+    assert joined.count("Sentence one is here.") == 60
+
+
+@pytest.mark.unit
+def test_token_counter_falls_back_to_byte_bound(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(vector_store, "tiktoken", None)
+    counter = vector_store.TokenCounter("text-embedding-3-small")
+
+    assert counter.exact is False
+    assert counter.count("héllo") == 6
+    assert counter.truncate("héllo", 2) == "h"
 
 
 def test_upsert_long_document_creates_multiple_chunks(monkeypatch: pytest.MonkeyPatch):
@@ -183,8 +252,8 @@ def test_upsert_long_document_creates_multiple_chunks(monkeypatch: pytest.Monkey
     monkeypatch.setenv("OPENAI_API_KEY", "openai-key")
     monkeypatch.setenv("APP_ENV", "test")
     # Set small chunk size for testing
-    monkeypatch.setenv("QDRANT_CHUNK_SIZE", "500")
-    monkeypatch.setenv("QDRANT_CHUNK_OVERLAP", "50")
+    monkeypatch.setenv("QDRANT_CHUNK_TOKENS", "120")
+    monkeypatch.setenv("QDRANT_CHUNK_OVERLAP_TOKENS", "20")
 
     # Force reload with new chunk settings
     import importlib
@@ -194,8 +263,13 @@ def test_upsert_long_document_creates_multiple_chunks(monkeypatch: pytest.Monkey
     captured_points: list = []
 
     class FakeEmbeddings:
-        def create(self, model: str, input: str):
-            return SimpleNamespace(data=[SimpleNamespace(embedding=[0.1] * 1536)])
+        def create(self, model: str, input: list[str]):
+            return SimpleNamespace(
+                data=[
+                    SimpleNamespace(index=i, embedding=[0.1] * 1536)
+                    for i in range(len(input))
+                ]
+            )
 
     class FakeOpenAI:
         def __init__(self, **kwargs):
@@ -205,15 +279,21 @@ def test_upsert_long_document_creates_multiple_chunks(monkeypatch: pytest.Monkey
         def __init__(self, *args, **kwargs):
             pass
 
+        def get_collection(self, collection_name):
+            return DENSE_ONLY_COLLECTION
+
         def upsert(self, collection_name, points, wait):
             captured_points.extend(points)
 
+        def scroll(self, **kwargs):
+            return [], None
+
     monkeypatch.setattr(vector_store, "OpenAI", FakeOpenAI)
     monkeypatch.setattr(vector_store, "QdrantClient", FakeQdrantClient)
 
     store = vector_store.get_vector_store(refresh=True)
 
-    # Create a 2500 char document (should create ~5 chunks with 500 char size)
+    # Two ~200-token paragraphs: several chunks at a 120-token budget
     long_content = "Section A. " + ("word " * 200) + "\n\n"  # ~1100 chars
     long_content += "Section B. " + ("text " * 200) + "\n\n"  # +~1100 chars
     long_content += "Section C. Final content here."
@@ -243,3 +323,1268 @@ def test_upsert_long_document_creates_multiple_chunks(monkeypatch: pytest.Monkey
     assert "Section A" in captured_points[0].payload["content"]
     # Last chunk should contain "Final content"
     assert "Final content" in captured_points[-1].payload["content"]
+
+
+# ============================================================================
+# BATCHED EMBEDDING TESTS
+# ============================================================================
+
+
+@pytest.mark.unit
+def test_batch_inputs_respects_count_and_token_limits():
+    texts = ["a" * 40] * 5  # ~11 estimated tokens each
+    assert [len(b) for b in vector_store._batch_inputs(texts, 2, 1000)] == [2, 2, 1]
+    assert [len(b) for b in vector_store._batch_inputs(texts, 10, 25)] == [2, 2, 1]
+    # An oversized single input still gets its own batch
+    assert vector_store._batch_inputs(["x" * 400], 10, 5) == [["x" * 400]]
+
+
+def _enable_store(monkeypatch: pytest.MonkeyPatch, embeddings_create, captured):
+    monkeypatch.setenv("QDRANT_URL", "https://example.qdrant.io")
+    monkeypatch.setenv("QDRANT_API_KEY", "qdrant-key")
+    monkeypatch.setenv("OPENAI_API_KEY", "openai-key")
+    monkeypatch.setenv("APP_ENV", "test")
+
+    class FakeOpenAI:
+        def __init__(self, **kwargs):
+            self.embeddings = SimpleNamespace(create=embeddings_create)
+
+    class FakeQdrantClient:
+        """Keeps upserted points so later upserts can diff against them."""
+
+        def __init__(self, *args, **kwargs):
+            self.points: dict[str, SimpleNamespace] = {}
+            self.deleted: list[str] = []
+            self.payload_updates: list[str] = []
+            self.upsert_waits: list[bool] = []
+
+        def get_collection(self, collection_name):
+            return DENSE_ONLY_COLLECTION
+
+        def upsert(self, collection_name, points, wait):
+            captured.extend(points)
+            self.upsert_waits.append(wait)
+            for point in points:
+                self.points[point.id] = SimpleNamespace(
+                    id=point.id, payload=dict(point.payload)
+                )
+
+        def scroll(self, collection_name, scroll_filter, limit, offset, **kwargs):
+            doc_id = scroll_filter.must[0].match.value
+            found = [
+                p for p in self.points.values() if p.payload["document_id"] == doc_id
+            ]
+            return found, None
+
+        def delete(self, collection_name, points_selector, wait):
+            for point_id in points_selector.points:
+                self.deleted.append(point_id)
+                self.points.pop(point_id, None)
+
+        def batch_update_points(self, collection_name, update_operations, wait):
+            for op in update_operations:
+                for point_id in op.overwrite_payload.points:
+                    self.payload_updates.append(point_id)
+                    self.points[point_id].payload = dict(op.overwrite_payload.payload)
+
+    monkeypatch.setattr(vector_store, "OpenAI", FakeOpenAI)
+    monkeypatch.setattr(vector_store, "QdrantClient", FakeQdrantClient)
+    return vector_store.get_vector_store(refresh=True)
+
+
+@pytest.mark.unit
+def test_upsert_embeds_chunks_in_batches(monkeypatch: pytest.MonkeyPatch):
+    """Chunks are sent in batched requests and mapped back by index."""
+    monkeypatch.setattr(vector_store, "CHUNK_TOKENS", 50)
+    monkeypatch.setattr(vector_store, "CHUNK_OVERLAP_TOKENS", 0)
+    monkeypatch.setattr(vector_store, "EMBED_BATCH_SIZE", 3)
+    requests: list[list[str]] = []
+
+    def create(model, input):
+        requests.append(list(input))
+        # Return out of order to verify results are re-sorted by index
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=[float(len(requests)), float(i)])
+                for i in reversed(range(len(input)))
+            ],
+            usage=SimpleNamespace(total_tokens=10 * len(input)),
+        )
+
+    points: list = []
+    store = _enable_store(monkeypatch, create, points)
+    content = " ".join(f"sentence{i:02d} " + "w" * 80 for i in range(7))
+
+    result = store.upsert_document(document_id="batched", content=content)
+
+    assert result.status == "ready"
+    assert result.chunks_created == 7
+    assert [len(r) for r in requests] == [3, 3, 1]
+    assert store.embed_calls == 3
+    assert store.embed_tokens == 70
+    assert points[0].vector == [1.0, 0.0]
+    assert points[4].vector == [2.0, 1.0]
+    assert points[6].vector == [3.0, 0.0]
+
+
+@pytest.mark.unit
+def test_rejected_batch_is_split_to_isolate_bad_chunk(monkeypatch: pytest.MonkeyPatch):
+    """A payload error on a batch retries halves; a lone bad input fails."""
+    monkeypatch.setattr(vector_store, "EMBED_BATCH_SIZE", 4)
+
+    class BadRequest(Exception):
+        status_code = 400
+
+    sizes: list[int] = []
+
+    def create(model, input):
+        sizes.append(len(input))
+        if any("BAD" in text for text in input):
+            raise BadRequest("invalid input")
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[1.0]) for i in range(len(input))]
+        )
+
+    store = _enable_store(monkeypatch, create, [])
+    assert len(store._embed_texts(["a", "b", "c", "d"])) == 4
+
+    sizes.clear()
+    with pytest.raises(BadRequest):
+        store._embed_texts(["e", "f", "BAD", "h"])
+    assert sizes == [4, 2, 2, 1]
+
+
+@pytest.mark.unit
+def test_reupsert_unchanged_content_uses_embedding_cache(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Embedding identical chunk text again costs no OpenAI calls."""
+    monkeypatch.setattr(vector_store, "CHUNK_TOKENS", 50)
+    monkeypatch.setattr(vector_store, "CHUNK_OVERLAP_TOKENS", 0)
+    requests: list[list[str]] = []
+
+    def create(model, input):
+        requests.append(list(input))
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=[0.5, float(i)])
+                for i in range(len(input))
+            ]
+        )
+
+    points: list = []
+    store = _enable_store(monkeypatch, create, points)
+    # Two identical paragraphs -> duplicate chunks are embedded once
+    content = "\n\n".join(
+        ["alpha " + "w" * 80, "alpha " + "w" * 80, "beta " + "x" * 80]
+    )
+
+    store.upsert_document(document_id="cached", content=content)
+    assert [len(r) for r in requests] == [2]
+
+    points.clear()
+    # Same text under another document: every chunk comes from the cache
+    result = store.upsert_document(document_id="cached-copy", content=content)
+
+    assert result.status == "ready"
+    assert len(requests) == 1
+    assert [p.vector for p in points] == [[0.5, 0.0], [0.5, 0.0], [0.5, 1.0]]
+    stats = store.embedding_cache.stats()
+    assert stats["misses"] == 2
+    assert stats["memory_hits"] == 2
+
+
+@pytest.mark.unit
+def test_configured_dimensions_are_requested_and_namespace_the_cache(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(vector_store, "EMBED_DIMENSIONS", 4)
+    requests: list[dict] = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        size = kwargs.get("dimensions", 8)
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=[0.5] * size)
+                for i in range(len(kwargs["input"]))
+            ]
+        )
+
+    points: list = []
+    store = _enable_store(monkeypatch, create, points)
+
+    result = store.upsert_document(document_id="short", content="small vectors")
+
+    assert result.status == "ready"
+    assert requests[0]["dimensions"] == 4
+    assert len(points[0].vector) == 4
+    assert store.embedding_space == f"{store.embedding_model}@4"
+
+    # Full-size vectors cached earlier for the same text are not reused
+    store.dimensions = None
+    store._embed_texts(["small vectors"])
+    assert len(requests) == 2
+    assert "dimensions" not in requests[1]
+
+
+@pytest.mark.unit
+def test_embedding_size_mismatch_fails_the_sync(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(vector_store, "EMBED_DIMENSIONS", 4)
+
+    def create(**kwargs):
+        # A model that ignores the dimensions parameter
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=[0.5] * 8)
+                for i in range(len(kwargs["input"]))
+            ]
+        )
+
+    points: list = []
+    store = _enable_store(monkeypatch, create, points)
+
+    result = store.upsert_document(document_id="wide", content="wide vectors")
+
+    assert result.status == "error"
+    assert "size mismatch" in result.error
+    assert points == []
+
+
+@pytest.mark.unit
+def test_embedding_cache_reads_through_to_postgres(monkeypatch: pytest.MonkeyPatch):
+    from agent_data import pg_store
+
+    stored: dict[str, list[float]] = {"abc": [1.0, 2.0]}
+    monkeypatch.setattr(
+        pg_store,
+        "get_embeddings",
+        lambda model, hashes: {h: stored[h] for h in hashes if h in stored},
+    )
+    monkeypatch.setattr(
+        pg_store, "put_embeddings", lambda model, items: stored.update(items)
+    )
+    cache = vector_store.EmbeddingCache(max_entries=1)
+
+    assert cache.get_many("m", ["abc", "def"]) == {"abc": [1.0, 2.0]}
+    cache.put_many("m", {"def": [3.0]})
+
+    assert stored["def"] == [3.0]
+    assert cache.stats() == {
+        "hits": 1,
+        "memory_hits": 0,
+        "pg_hits": 1,
+        "misses": 1,
+        "size": 1,
+    }
+
+
+@pytest.mark.unit
+def test_embedding_cache_ignores_postgres_errors(monkeypatch: pytest.MonkeyPatch):
+    from agent_data import pg_store
+
+    def boom(*args):
+        raise RuntimeError("Connection pool not initialized")
+
+    monkeypatch.setattr(pg_store, "get_embeddings", boom)
+    monkeypatch.setattr(pg_store, "put_embeddings", boom)
+    cache = vector_store.EmbeddingCache()
+
+    assert cache.get_many("m", ["abc"]) == {}
+    cache.put_many("m", {"abc": [1.0]})
+    assert cache.get_many("m", ["abc"]) == {"abc": [1.0]}
+
+
+@pytest.mark.unit
+def test_search_groups_by_document_server_side(monkeypatch: pytest.MonkeyPatch):
+    """One grouped query returns top_k distinct documents in score order."""
+
+    def create(model, input):
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[0.1])])
+
+    store = _enable_store(monkeypatch, create, [])
+    store._ensure_client()
+    calls: list[dict] = []
+
+    def hit(doc, score):
+        return SimpleNamespace(
+            score=score,
+            payload={"document_id": doc, "content": f"{doc} text", "metadata": {}},
+        )
+
+    def query_points_groups(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(
+            groups=[
+                SimpleNamespace(id="a", hits=[hit("a", 0.9)]),
+                SimpleNamespace(id="b", hits=[hit("b", 0.7)]),
+            ]
+        )
+
+    store._client.query_points_groups = query_points_groups
+
+    results = store.search(query="q", top_k=2, filter_tags=["ops"])
+
+    assert [r["document_id"] for r in results] == ["a", "b"]
+    assert results[0] == {
+        "document_id": "a",
+        "snippet": "a text",
+        "content": "a text",
+        "score": 0.9,
+        "metadata": {},
+    }
+    (call,) = calls
+    assert call["group_by"] == "document_id"
+    assert call["group_size"] == 1
+    assert call["limit"] == 2
+    assert call["with_payload"] == vector_store.SEARCH_PAYLOAD_FIELDS
+    assert call["query_filter"].must[0].key == "metadata.tags"
+
+
+@pytest.mark.unit
+def test_hybrid_search_fuses_dense_and_sparse_in_one_query(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    def create(model, input):
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[0.1])])
+
+    store = _enable_store(monkeypatch, create, [])
+    store._ensure_client()
+    monkeypatch.setitem(vector_store._sparse_support, store.collection, True)
+    calls: list[dict] = []
+
+    def query_points_groups(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(groups=[])
+
+    store._client.query_points_groups = query_points_groups
+
+    store.search(query="TD-131 rollout", top_k=3, filter_status="published")
+
+    (call,) = calls
+    assert call["query"].fusion.value == "rrf"
+    assert call["group_by"] == "document_id"
+    dense, sparse = call["prefetch"]
+    assert dense.query == [0.1]
+    assert sparse.using == "bm25"
+    assert (
+        sparse.query.indices
+        == vector_store.sparse_vectors.query_vector("TD-131 rollout")[0]
+    )
+    assert dense.filter is sparse.filter is call["query_filter"]
+
+
+@pytest.mark.unit
+def test_hybrid_upsert_writes_sparse_vector_per_chunk(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    def create(model, input):
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[0.5])])
+
+    captured: list = []
+    store = _enable_store(monkeypatch, create, captured)
+    monkeypatch.setitem(vector_store._sparse_support, store.collection, True)
+
+    store.upsert_document(document_id="doc", content="release notes for TD-131")
+
+    (point,) = captured
+    assert point.vector[""] == [0.5]
+    sparse = point.vector["bm25"]
+    assert (
+        sparse.indices,
+        sparse.values,
+    ) == vector_store.sparse_vectors.document_vector("release notes for TD-131")
+
+
+@pytest.mark.unit
+def test_sparse_support_is_read_from_the_collection_without_a_bootstrap(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    def create(model, input):
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[0.5])])
+
+    captured: list = []
+    store = _enable_store(monkeypatch, create, captured)
+    store._ensure_client()
+    monkeypatch.setattr(vector_store, "_collection_status", None)
+    monkeypatch.setattr(vector_store, "_sparse_support", {})
+    hybrid_info = SimpleNamespace(
+        config=SimpleNamespace(params=SimpleNamespace(sparse_vectors={"bm25": {}}))
+    )
+    qdrant_up = False
+
+    def get_collection(collection_name):
+        if not qdrant_up:
+            raise ConnectionError("refused")
+        return hybrid_info
+
+    store._client.get_collection = get_collection
+
+    # Qdrant unreachable: the write fails instead of going dense-only
+    failed = store.upsert_document(document_id="doc", content="first version")
+    assert failed.status == "error"
+    assert captured == []
+    assert store.collection not in vector_store._sparse_support
+
+    qdrant_up = True
+    store.upsert_document(document_id="doc", content="release notes for TD-131")
+
+    (point,) = captured
+    assert "bm25" in point.vector
+    assert vector_store._sparse_support[store.collection] is True
+
+
+# ============================================================================
+# INCREMENTAL RE-INDEX TESTS
+# ============================================================================
+
+
+@pytest.mark.unit
+def test_update_embeds_only_changed_chunks_and_prunes_stale(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(vector_store, "CHUNK_TOKENS", 50)
+    monkeypatch.setattr(vector_store, "CHUNK_OVERLAP_TOKENS", 0)
+    embedded: list[str] = []
+
+    def create(model, input):
+        embedded.extend(input)
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[0.1]) for i in range(len(input))]
+        )
+
+    store = _enable_store(monkeypatch, create, [])
+    paragraphs = [f"para{i} " + "w" * 80 for i in range(4)]
+    store.upsert_document(document_id="doc", content="\n\n".join(paragraphs))
+    qdrant = store._client
+    embedded.clear()
+
+    # Edit one paragraph and drop the last one
+    edited = [paragraphs[0], "para1 edited " + "z" * 70, paragraphs[2]]
+    result = store.upsert_document(document_id="doc", content="\n\n".join(edited))
+
+    assert result.status == "ready"
+    assert result.chunks_created == 3
+    assert embedded == [edited[1]]
+    # Chunk count changed, so unchanged chunks only get a payload rewrite
+    assert len(qdrant.payload_updates) == 2
+    assert len(qdrant.deleted) == 1
+    assert sorted(
+        p.payload["metadata"]["chunk_index"] for p in qdrant.points.values()
+    ) == [0, 1, 2]
+    assert all(
+        p.payload["metadata"]["total_chunks"] == 3 for p in qdrant.points.values()
+    )
+
+
+@pytest.mark.unit
+def test_pg_chunk_text_store_keeps_text_out_of_payloads(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    from agent_data import pg_store
+
+    monkeypatch.setattr(vector_store, "CHUNK_TOKENS", 50)
+    monkeypatch.setattr(vector_store, "CHUNK_OVERLAP_TOKENS", 0)
+    monkeypatch.setattr(vector_store, "CHUNK_TEXT_STORE", "pg")
+    rows: dict[str, tuple] = {}
+    lookups: list[list[str]] = []
+
+    def get_chunk_texts(point_ids):
+        lookups.append(list(point_ids))
+        return {pid: rows[pid][5] for pid in point_ids if pid in rows}
+
+    monkeypatch.setattr(
+        pg_store, "put_chunks", lambda new: rows.update((r[0], r) for r in new)
+    )
+    monkeypatch.setattr(pg_store, "get_chunk_texts", get_chunk_texts)
+    monkeypatch.setattr(
+        pg_store, "delete_chunks", lambda ids: [rows.pop(i) for i in ids]
+    )
+
+    def create(model, input):
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[0.1]) for i in range(len(input))]
+        )
+
+    store = _enable_store(monkeypatch, create, [])
+    paragraphs = [f"para{i} " + "w" * 80 for i in range(3)]
+    content = "\n\n".join(paragraphs)
+    store.upsert_document(document_id="doc", content=content)
+
+    qdrant = store._client
+    assert len(qdrant.points) == len(rows) == 3
+    assert all("content" not in p.payload for p in qdrant.points.values())
+    for point_id, document_id, index, start, end, text in rows.values():
+        assert point_id in qdrant.points and document_id == "doc"
+        assert content[start:end] == text == paragraphs[index]
+
+    store.upsert_document(document_id="doc", content="\n\n".join(paragraphs[:2]))
+    assert len(rows) == 2
+
+    calls: list[dict] = []
+    first = next(iter(rows))
+
+    def query_points_groups(**kwargs):
+        calls.append(kwargs)
+        hit = SimpleNamespace(id=first, score=0.8, payload=qdrant.points[first].payload)
+        return SimpleNamespace(groups=[SimpleNamespace(id="doc", hits=[hit])])
+
+    qdrant.query_points_groups = query_points_groups
+
+    (result,) = store.search(query="para0", top_k=3)
+
+    assert calls[0]["with_payload"] == ["document_id", "metadata"]
+    assert lookups == [[first]]
+    assert result["content"] == paragraphs[0]
+    assert result["snippet"] == paragraphs[0][:500]
+
+
+@pytest.mark.unit
+def test_bulk_upsert_batches_embeddings_and_points_across_documents(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(vector_store, "CHUNK_TOKENS", 50)
+    monkeypatch.setattr(vector_store, "CHUNK_OVERLAP_TOKENS", 0)
+    monkeypatch.setattr(vector_store, "BULK_UPSERT_POINTS", 2)
+    requests: list[list[str]] = []
+
+    def create(model, input):
+        requests.append(list(input))
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[0.1]) for i in range(len(input))]
+        )
+
+    captured: list = []
+    store = _enable_store(monkeypatch, create, captured)
+    docs = [
+        vector_store.VectorDocument(document_id="a", content="alphas " * 30),
+        vector_store.VectorDocument(document_id="b", content="beta"),
+        vector_store.VectorDocument(
+            document_id="c", content="gamma", metadata={"tags": ["x"]}
+        ),
+    ]
+
+    results = store.upsert_documents(docs)
+
+    assert list(results) == ["a", "b", "c"]
+    assert [r.status for r in results.values()] == ["ready"] * 3
+    assert results["a"].chunks_created == 2
+    # One embedding request for all four chunks of the three documents
+    assert len(requests) == 1 and len(requests[0]) == 4
+    # Two batches of two points: the last one is the wait=True barrier
+    assert store._client.upsert_waits == [False, True]
+    assert len(captured) == 4
+
+
+@pytest.mark.unit
+def test_bulk_upsert_isolates_failing_document(monkeypatch: pytest.MonkeyPatch):
+    class BadRequest(Exception):
+        status_code = 400
+
+    def create(model, input):
+        if any("poison" in text for text in input):
+            raise BadRequest("invalid input")
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[0.1]) for i in range(len(input))]
+        )
+
+    store = _enable_store(monkeypatch, create, [])
+    docs = [
+        vector_store.VectorDocument(document_id=doc_id, content=f"{doc_id} body")
+        for doc_id in ("ok-1", "poison", "ok-2")
+    ]
+
+    results = store.upsert_documents(docs)
+
+    assert results["poison"].status == "error"
+    assert results["ok-1"].status == results["ok-2"].status == "ready"
+    assert {p.payload["document_id"] for p in store._client.points.values()} == {
+        "ok-1",
+        "ok-2",
+    }
+
+
+@pytest.mark.unit
+def test_unchanged_document_makes_no_writes(monkeypatch: pytest.MonkeyPatch):
+    calls: list[list[str]] = []
+
+    def create(model, input):
+        calls.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[0.1])])
+
+    points: list = []
+    store = _enable_store(monkeypatch, create, points)
+    store.upsert_document(document_id="doc", content="Stable body", parent_id="a")
+    points.clear()
+
+    result = store.upsert_document(
+        document_id="doc", content="Stable body", parent_id="a"
+    )
+
+    assert result.status == "ready"
+    assert len(calls) == 1
+    assert points == []
+    assert store._client.payload_updates == []
+    assert store._client.deleted == []
+
+
+# ============================================================================
+# ASYNC STORE TESTS
+# ============================================================================
+
+
+def _enable_async_store(monkeypatch: pytest.MonkeyPatch, embeddings_create):
+    monkeypatch.setenv("QDRANT_URL", "https://example.qdrant.io")
+    monkeypatch.setenv("QDRANT_API_KEY", "qdrant-key")
+    monkeypatch.setenv("OPENAI_API_KEY", "openai-key")
+    monkeypatch.setenv("APP_ENV", "test")
+
+    class FakeAsyncOpenAI:
+        def __init__(self, **kwargs):
+            self.embeddings = SimpleNamespace(create=embeddings_create)
+
+    class FakeAsyncQdrantClient:
+        def __init__(self, *args, **kwargs):
+            self.points: dict[str, SimpleNamespace] = {}
+
+        async def get_collection(self, collection_name):
+            return DENSE_ONLY_COLLECTION
+
+        async def upsert(self, collection_name, points, wait):
+            for point in points:
+                self.points[point.id] = SimpleNamespace(
+                    id=point.id, payload=dict(point.payload), score=0.9
+                )
+
+        async def scroll(self, collection_name, limit, offset, **kwargs):
+            scroll_filter = kwargs.get("scroll_filter")
+            found = [
+                p
+                for p in self.points.values()
+                if scroll_filter is None
+                or p.payload["document_id"] == scroll_filter.must[0].match.value
+            ]
+            return found, None
+
+        async def delete(self, collection_name, points_selector, wait):
+            for point_id in points_selector.points:
+                self.points.pop(point_id, None)
+
+        async def batch_update_points(self, collection_name, update_operations, wait):
+            for op in update_operations:
+                for point_id in op.overwrite_payload.points:
+                    self.points[point_id].payload = dict(op.overwrite_payload.payload)
+
+        async def query_points_groups(self, collection_name, group_by, limit, **kwargs):
+            groups: dict[str, list] = {}
+            for point in self.points.values():
+                groups.setdefault(point.payload[group_by], []).append(point)
+            return SimpleNamespace(
+                groups=[
+                    SimpleNamespace(id=key, hits=hits[:1])
+                    for key, hits in list(groups.items())[:limit]
+                ]
+            )
+
+    monkeypatch.setattr(vector_store, "AsyncOpenAI", FakeAsyncOpenAI)
+    monkeypatch.setattr(vector_store, "AsyncQdrantClient", FakeAsyncQdrantClient)
+    return vector_store.get_async_vector_store(refresh=True)
+
+
+@pytest.mark.unit
+def test_async_store_upsert_search_and_prune(monkeypatch: pytest.MonkeyPatch):
+    import asyncio
+
+    monkeypatch.setattr(vector_store, "CHUNK_TOKENS", 50)
+    monkeypatch.setattr(vector_store, "CHUNK_OVERLAP_TOKENS", 0)
+
+    async def create(model, input):
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[0.1]) for i in range(len(input))],
+            usage=SimpleNamespace(total_tokens=5),
+        )
+
+    store = _enable_async_store(monkeypatch, create)
+    assert store.enabled is True
+    paragraphs = [f"para{i} " + "w" * 80 for i in range(3)]
+
+    async def run():
+        first = await store.upsert_document(
+            document_id="doc", content="\n\n".join(paragraphs)
+        )
+        second = await store.upsert_document(document_id="doc", content=paragraphs[0])
+        hits = await store.search(query="para0")
+        return first, second, hits, await store.list_document_ids()
+
+    first, second, hits, doc_ids = asyncio.run(run())
+
+    assert first.chunks_created == 3
+    assert second.status == "ready"
+    assert second.chunks_created == 1
+    assert len(store._client.points) == 1
+    assert [h["document_id"] for h in hits] == ["doc"]
+    assert doc_ids == {"doc"}
+    # Shortened doc reuses chunk 0; only the query needed a new embedding
+    assert store.embed_calls == 2
+
+
+@pytest.mark.unit
+def test_async_store_overlaps_concurrent_embeddings(monkeypatch: pytest.MonkeyPatch):
+    """Two upserts in flight wait on OpenAI together instead of in turn."""
+    import asyncio
+
+    in_flight = 0
+    both_waiting = None
+
+    async def create(model, input):
+        nonlocal in_flight
+        in_flight += 1
+        if in_flight == 2:
+            both_waiting.set()
+        await both_waiting.wait()
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[0.1])])
+
+    store = _enable_async_store(monkeypatch, create)
+
+    async def run():
+        nonlocal both_waiting
+        both_waiting = asyncio.Event()
+        return await asyncio.wait_for(
+            asyncio.gather(
+                store.upsert_document(document_id="a", content="first body"),
+                store.upsert_document(document_id="b", content="second body"),
+            ),
+            timeout=5,
+        )
+
+    results = asyncio.run(run())
+
+    assert [r.status for r in results] == ["ready", "ready"]
+
+
+@pytest.mark.unit
+def test_async_store_plans_chunks_off_the_event_loop(monkeypatch: pytest.MonkeyPatch):
+    import asyncio
+    import threading
+
+    async def create(model, input):
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[0.1]) for i in range(len(input))]
+        )
+
+    store = _enable_async_store(monkeypatch, create)
+    plan_chunk_updates = vector_store._plan_chunk_updates
+    planned_on = []
+
+    def plan(**kwargs):
+        planned_on.append(threading.get_ident())
+        return plan_chunk_updates(**kwargs)
+
+    monkeypatch.setattr(vector_store, "_plan_chunk_updates", plan)
+
+    async def run():
+        result = await store.upsert_document(document_id="doc", content="body")
+        return result, threading.get_ident()
+
+    result, loop_thread = asyncio.run(run())
+
+    assert result.status == "ready"
+    assert planned_on and planned_on[0] != loop_thread
+
+
+@pytest.mark.unit
+def test_qdrant_store_base_requires_sdk_classes():
+    with pytest.raises(TypeError, match="_sdk_classes"):
+        vector_store._QdrantStoreBase()
+
+
+# ============================================================================
+# QUERY EMBEDDING CACHE TESTS
+# ============================================================================
+
+
+@pytest.mark.unit
+def test_search_reuses_query_embedding(monkeypatch: pytest.MonkeyPatch):
+    requests: list[list[str]] = []
+
+    def create(model, input):
+        requests.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[0.1])])
+
+    store = _enable_store(monkeypatch, create, [])
+    store._ensure_client()
+    store._client.query_points_groups = lambda **kwargs: SimpleNamespace(groups=[])
+
+    store.search(query="deploy  checklist")
+    store.search(query=" deploy checklist\n")
+
+    assert requests == [["deploy checklist"]]
+    stats = store.query_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+@pytest.mark.unit
+def test_query_cache_expires_entries_after_ttl():
+    now = [100.0]
+    cache = vector_store.QueryEmbeddingCache(ttl_seconds=60, clock=lambda: now[0])
+    calls: list[str] = []
+
+    def embed(text):
+        calls.append(text)
+        return [float(len(calls))]
+
+    assert cache.get_or_embed("m", "q", embed) == [1.0]
+    now[0] += 59
+    assert cache.get_or_embed("m", "q", embed) == [1.0]
+    now[0] += 2
+    assert cache.get_or_embed("m", "q", embed) == [2.0]
+    assert cache.stats()["expired"] == 1
+
+
+@pytest.mark.unit
+def test_query_cache_single_flights_concurrent_misses():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = vector_store.QueryEmbeddingCache()
+    release = threading.Event()
+    calls: list[str] = []
+
+    def embed(text):
+        calls.append(text)
+        release.wait(timeout=5)
+        return [0.5]
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [
+            pool.submit(cache.get_or_embed, "m", "burst", embed) for _ in range(5)
+        ]
+        while cache.stats()["coalesced"] < 4:
+            time.sleep(0.001)
+        release.set()
+        results = [f.result(timeout=5) for f in futures]
+
+    assert results == [[0.5]] * 5
+    assert calls == ["burst"]
+
+
+@pytest.mark.unit
+def test_query_cache_single_flights_async_misses():
+    import asyncio
+
+    cache = vector_store.QueryEmbeddingCache()
+    calls: list[str] = []
+
+    async def embed(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return [0.5]
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.aget_or_embed("m", "burst", embed) for _ in range(5))
+        )
+
+    assert asyncio.run(run()) == [[0.5]] * 5
+    assert calls == ["burst"]
+    assert cache.stats()["coalesced"] == 4
+
+
+@pytest.mark.unit
+def test_query_cache_failure_propagates_to_waiters():
+    import asyncio
+
+    cache = vector_store.QueryEmbeddingCache()
+
+    async def embed(text):
+        await asyncio.sleep(0.01)
+        raise TimeoutError("openai timeout")
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.aget_or_embed("m", "q", embed) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, TimeoutError) for r in results)
+    assert cache.stats()["size"] == 0
+
+
+# ============================================================================
+# COLLECTION BOOTSTRAP TESTS
+# ============================================================================
+
+
+class FakeCollectionClient:
+    def __init__(self, exists: bool, vectors=None, payload_schema=None):
+        self.exists = exists
+        self.info = SimpleNamespace(
+            config=SimpleNamespace(params=SimpleNamespace(vectors=vectors)),
+            payload_schema=payload_schema or {},
+        )
+        self.created: list[dict] = []
+        self.indexed: list[tuple[str, str]] = []
+        self.updated: list[dict] = []
+
+    def collection_exists(self, name):
+        return self.exists
+
+    def get_aliases(self):
+        return SimpleNamespace(aliases=[])
+
+    def create_collection(
+        self, collection_name, vectors_config, sparse_vectors_config, **kwargs
+    ):
+        self.created.append(
+            {
+                "name": collection_name,
+                "vectors": vectors_config,
+                "sparse": sparse_vectors_config,
+                **kwargs,
+            }
+        )
+
+    def update_collection(self, collection_name, **kwargs):
+        self.updated.append({"name": collection_name, **kwargs})
+
+    def get_collection(self, name):
+        return self.info
+
+    def create_payload_index(self, collection_name, field_name, field_schema, wait):
+        self.indexed.append((field_name, field_schema.value))
+
+
+def _store_with_client(monkeypatch: pytest.MonkeyPatch, client):
+    store = _enable_store(monkeypatch, lambda **kw: None, [])
+    store._client = client
+    store._openai = object()
+    return store
+
+
+@pytest.mark.unit
+def test_collection_manager_creates_collection_and_indexes(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    client = FakeCollectionClient(exists=False)
+    store = _store_with_client(monkeypatch, client)
+
+    report = vector_store.CollectionManager(store).ensure()
+
+    assert report["status"] == "ok"
+    assert report["created"] is True
+    assert client.created[0]["vectors"].size == vector_store.VECTOR_SIZE
+    assert dict(client.indexed) == vector_store.PAYLOAD_INDEXES
+    sparse = client.created[0]["sparse"]["bm25"]
+    assert sparse.modifier.value == "idf"
+    assert report["sparse_vectors"] is True
+
+
+@pytest.mark.unit
+def test_collection_manager_reports_drift_without_recreating(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    from qdrant_client.http import models as qmodels
+
+    client = FakeCollectionClient(
+        exists=True,
+        vectors=qmodels.VectorParams(size=3072, distance=qmodels.Distance.COSINE),
+        payload_schema={
+            "document_id": SimpleNamespace(data_type=qmodels.PayloadSchemaType.KEYWORD),
+            "metadata.tags": SimpleNamespace(data_type=qmodels.PayloadSchemaType.TEXT),
+        },
+    )
+    store = _store_with_client(monkeypatch, client)
+
+    report = vector_store.CollectionManager(store).ensure()
+
+    assert report["status"] == "drift"
+    assert client.created == []
+    assert report["indexes_created"] == [
+        "parent_id",
+        "metadata.status",
+        "is_human_readable",
+    ]
+    assert report["drift"] == [
+        "vector size: expected 1536, found 3072",
+        "payload index metadata.tags: expected keyword, found text",
+    ]
+    # No sparse vector on the old collection: stays dense-only, not drift
+    assert report["sparse_vectors"] is False
+
+
+@pytest.mark.unit
+def test_collection_manager_flags_dimensions_not_matching_vector_size(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(vector_store, "EMBED_DIMENSIONS", 512)
+    client = FakeCollectionClient(exists=False)
+    store = _store_with_client(monkeypatch, client)
+
+    report = vector_store.CollectionManager(store).ensure()
+
+    assert report["status"] == "drift"
+    assert report["drift"] == [
+        f"embedding dimensions 512 != QDRANT_VECTOR_SIZE {vector_store.VECTOR_SIZE}"
+    ]
+
+
+@pytest.mark.unit
+def test_collection_manager_creates_quantized_collection(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(vector_store, "QUANTIZATION", "int8")
+    client = FakeCollectionClient(exists=False)
+    store = _store_with_client(monkeypatch, client)
+
+    report = vector_store.CollectionManager(store).ensure()
+
+    (created,) = client.created
+    assert report["quantization"] == "int8"
+    # Where the originals live is its own setting
+    assert created["vectors"].on_disk is None
+    scalar = created["quantization_config"].scalar
+    assert scalar.type.value == "int8" and scalar.always_ram is True
+
+    monkeypatch.setattr(vector_store, "VECTORS_ON_DISK", True)
+    client = FakeCollectionClient(exists=False)
+    vector_store.CollectionManager(_store_with_client(monkeypatch, client)).ensure()
+    assert client.created[0]["vectors"].on_disk is True
+
+
+@pytest.mark.unit
+def test_collection_manager_applies_quantization_to_existing_collection(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    from qdrant_client.http import models as qmodels
+
+    monkeypatch.setattr(vector_store, "QUANTIZATION", "binary")
+    vectors = qmodels.VectorParams(size=1536, distance=qmodels.Distance.COSINE)
+    client = FakeCollectionClient(exists=True, vectors=vectors)
+    store = _store_with_client(monkeypatch, client)
+
+    report = vector_store.CollectionManager(store).ensure()
+
+    assert report["quantization_updated"] is True
+    (update,) = client.updated
+    assert "vectors_config" not in update
+    assert vector_store.quantization_profile(update["quantization_config"]) == "binary"
+
+    # Already quantized: nothing to do
+    client.info.config.quantization_config = update["quantization_config"]
+    report = vector_store.CollectionManager(store).ensure()
+    assert report["quantization_updated"] is False
+    assert len(client.updated) == 1
+
+    # QDRANT_ON_DISK moves the originals without touching quantization
+    monkeypatch.setattr(vector_store, "VECTORS_ON_DISK", True)
+    report = vector_store.CollectionManager(store).ensure()
+    assert report["quantization_updated"] is True
+    assert client.updated[-1]["vectors_config"][""].on_disk is True
+    assert "quantization_config" not in client.updated[-1]
+    vectors.on_disk = True
+    vector_store.CollectionManager(store).ensure()
+    assert len(client.updated) == 2
+
+    monkeypatch.setattr(vector_store, "QUANTIZATION", "pq")
+    with pytest.raises(ValueError):
+        vector_store.CollectionManager(store).ensure()
+
+
+@pytest.mark.unit
+def test_collection_manager_leaves_existing_collection_without_explicit_settings(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    from qdrant_client.http import models as qmodels
+
+    vectors = qmodels.VectorParams(
+        size=1536, distance=qmodels.Distance.COSINE, on_disk=True
+    )
+    client = FakeCollectionClient(exists=True, vectors=vectors)
+    # Quantized and moved to disk outside this service
+    client.info.config.quantization_config = vector_store.quantization_config("int8")
+    store = _store_with_client(monkeypatch, client)
+
+    report = vector_store.CollectionManager(store).ensure()
+
+    assert report["quantization"] == "none"
+    assert report["quantization_updated"] is False
+    assert client.updated == []
+
+
+@pytest.mark.unit
+def test_quantized_search_oversamples_and_rescores(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(vector_store, "QUANTIZATION", "binary")
+    monkeypatch.setattr(vector_store, "SEARCH_OVERSAMPLING", 3.0)
+
+    dense = vector_store._group_query_kwargs([0.1], "q", None, 5)
+    params = dense["search_params"].quantization
+    assert (params.oversampling, params.rescore) == (3.0, True)
+
+    hybrid = vector_store._group_query_kwargs([0.1], "q", None, 5, hybrid=True)
+    assert "search_params" not in hybrid
+    assert hybrid["prefetch"][0].params.quantization.oversampling == 3.0
+    assert hybrid["prefetch"][1].params is None
+
+    monkeypatch.setattr(vector_store, "QUANTIZATION", "none")
+    assert "search_params" not in vector_store._group_query_kwargs([0.1], "q", None, 5)
+
+
+@pytest.mark.unit
+def test_ensure_collection_records_errors_for_health(monkeypatch: pytest.MonkeyPatch):
+    class Unreachable(FakeCollectionClient):
+        def collection_exists(self, name):
+            raise ConnectionError("refused")
+
+    _store_with_client(monkeypatch, Unreachable(exists=False))
+    monkeypatch.setattr(vector_store, "_collection_status", None)
+
+    report = vector_store.ensure_collection()
+
+    assert report["status"] == "error"
+    assert vector_store.get_collection_status() is report
+
+
+@pytest.mark.unit
+def test_client_kwargs_select_transport_and_pool(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(vector_store, "QDRANT_TIMEOUT", 20)
+    monkeypatch.setattr(vector_store, "HTTP_KEEPALIVE_CONNECTIONS", 8)
+
+    rest = vector_store.qdrant_client_kwargs("https://q.example", "key")
+    assert rest["timeout"] == 20
+    assert "prefer_grpc" not in rest
+    assert rest["limits"].max_keepalive_connections == 8
+
+    monkeypatch.setattr(vector_store, "QDRANT_TRANSPORT", "grpc")
+    monkeypatch.setattr(vector_store, "QDRANT_GRPC_PORT", 7334)
+    grpc = vector_store.qdrant_client_kwargs("https://q.example", "key")
+    assert (grpc["prefer_grpc"], grpc["grpc_port"]) == (True, 7334)
+
+    with pytest.raises(ValueError):
+        vector_store.qdrant_client_kwargs("https://q.example", "key", "http3")
+
+
+@pytest.mark.unit
+def test_read_timeouts_are_sent_only_when_configured(monkeypatch: pytest.MonkeyPatch):
+    store = _enable_store(monkeypatch, lambda **_: None, [])
+    store._ensure_client()
+    calls: dict[str, dict] = {}
+
+    def scroll(**kwargs):
+        calls["scroll"] = kwargs
+        return [], None
+
+    def count(**kwargs):
+        calls["count"] = kwargs
+        return SimpleNamespace(count=0)
+
+    store._client.scroll = scroll
+    store._client.count = count
+
+    store.count_by_document_id("doc-1")
+    assert "timeout" not in calls["count"]
+    assert "timeout" not in vector_store._group_query_kwargs([0.1], "q", None, 5)
+
+    monkeypatch.setattr(vector_store, "SEARCH_TIMEOUT", 3)
+    monkeypatch.setattr(vector_store, "SCROLL_TIMEOUT", 30)
+    monkeypatch.setattr(vector_store, "COUNT_TIMEOUT", 5)
+    store.count_by_document_id("doc-1")
+    store.list_document_ids()
+
+    assert calls["count"]["timeout"] == 5
+    assert calls["scroll"]["timeout"] == 30
+    assert vector_store._group_query_kwargs([0.1], "q", None, 5)["timeout"] == 3
+
+
+@pytest.mark.unit
+def test_document_ids_scan_disjoint_segments_with_id_only_pages(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    from uuid import NAMESPACE_DNS, UUID, uuid5
+
+    store = _enable_store(monkeypatch, lambda **_: None, [])
+    store._ensure_client()
+    owners = {
+        str(uuid5(NAMESPACE_DNS, f"doc-{i % 7}:{i}")): f"doc-{i % 7}"
+        for i in range(300)
+    }
+    ids = sorted(owners, key=lambda pid: UUID(pid).int)
+    calls: list[dict] = []
+
+    def scroll(collection_name, limit, offset, **kwargs):
+        calls.append({"limit": limit, "offset": offset, **kwargs})
+        start = 0 if offset is None else UUID(offset).int
+        ordered = [pid for pid in ids if UUID(pid).int >= start]
+        page = [
+            SimpleNamespace(id=pid, payload={"document_id": owners[pid]})
+            for pid in ordered[:limit]
+        ]
+        return page, (ordered[limit] if len(ordered) > limit else None)
+
+    store._client.scroll = scroll
+    seen_points: list[str] = []
+    original = vector_store._page_document_ids
+
+    def record(points, segment):
+        seen_points.extend(str(p.id) for p in points if segment.contains(p.id))
+        return original(points, segment)
+
+    monkeypatch.setattr(vector_store, "_page_document_ids", record)
+
+    found = list(store.iter_document_ids(page_size=40, segments=4))
+
+    assert sorted(found) == sorted(set(owners.values()))
+    assert sorted(seen_points) == sorted(ids)
+    assert {c["limit"] for c in calls} == {40}
+    assert all(c["with_payload"] == ["document_id"] for c in calls)
+    assert all(c["with_vectors"] is False for c in calls)
+    assert {c["offset"] for c in calls} >= {
+        s.offset for s in vector_store._scroll_segments(4)
+    }
+
+
+@pytest.mark.unit
+def test_diversified_search_reranks_candidates_with_their_vectors(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    def create(model, input):
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=[1.0, 0.0])])
+
+    store = _enable_store(monkeypatch, create, [])
+    store._ensure_client()
+    monkeypatch.setitem(vector_store._sparse_support, store.collection, True)
+    calls: list[dict] = []
+
+    def hit(doc, score, vector):
+        return SimpleNamespace(
+            id=doc,
+            score=score,
+            vector={"": vector, "bm25": None},
+            payload={"document_id": doc, "content": doc, "metadata": {}},
+        )
+
+    def query_points_groups(**kwargs):
+        calls.append(kwargs)
+        hits = [
+            hit("law-v1", 0.95, [0.95, 0.31]),
+            hit("law-v2", 0.94, [0.94, 0.33]),
+            hit("ops", 0.60, [0.6, -0.8]),
+        ]
+        return SimpleNamespace(groups=[SimpleNamespace(hits=[h]) for h in hits])
+
+    store._client.query_points_groups = query_points_groups
+
+    plain = store.search(query="overview", top_k=2)
+    diverse = store.search(query="overview", top_k=2, diversify=True)
+
+    assert "with_vectors" not in calls[0]
+    assert calls[0]["limit"] == 2
+    assert calls[1]["with_vectors"] is True
+    assert calls[1]["limit"] == 2 * vector_store.diversity.MMR_CANDIDATES
+    assert [r["document_id"] for r in plain] == ["law-v1", "law-v2"]
+    assert [r["document_id"] for r in diverse] == ["law-v1", "ops"]
+    relevance_only = store.search(
+        query="overview", top_k=2, diversify=True, mmr_lambda=1.0
+    )
+    assert [r["document_id"] for r in relevance_only] == ["law-v1", "law-v2"]
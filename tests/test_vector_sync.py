@@ -1,18 +1,19 @@
 """Tests for vector synchronization during document CRUD operations.
 
 Verifies that:
-- UPDATE with content change deletes old vectors and creates new ones
+- UPDATE with content change re-indexes in place without a bulk delete
 - UPDATE with metadata-only skips re-embedding
 - UPDATE with empty content removes all vectors
 - UPDATE on nonexistent doc returns 404
 - MOVE deletes old vectors before re-embedding
-- Multi-chunk documents have ALL old chunks deleted on update
+- Multi-chunk documents leave no stale chunks after a shrinking update
 - DELETE removes vectors
 - Ingest of existing document acts as update
 """
 
 from __future__ import annotations
 
+import asyncio
 from types import SimpleNamespace
 from unittest.mock import patch
 
@@ -21,6 +22,7 @@ from fastapi.testclient import TestClient
 
 import agent_data.server as server
 import agent_data.vector_store as vs_mod
+from tests.helpers import AsyncStoreAdapter
 
 # ---- Fake vector store that tracks calls ----
 
@@ -110,6 +112,9 @@ def pg_mocks(monkeypatch):
     def fake_get(collection, key):
         return store.get(key)
 
+    def fake_get_many(collection, keys):
+        return [store.get(key) for key in keys]
+
     def fake_set(collection, key, data):
         store[key] = dict(data)
 
@@ -117,11 +122,13 @@ def pg_mocks(monkeypatch):
         if key in store:
             store[key].update(updates)
 
-    def fake_stream(collection):
-        return [{"_key": k, **v} for k, v in store.items()]
+    def fake_stream(collection, *, live_only=False, **_):
+        rows = [{"_key": k, **v} for k, v in store.items()]
+        return [r for r in rows if not live_only or r.get("deleted_at") is None]
 
     patches = {
         "get": patch("agent_data.pg_store.get_doc", side_effect=fake_get),
+        "get_many": patch("agent_data.pg_store.get_docs", side_effect=fake_get_many),
         "set": patch("agent_data.pg_store.set_doc", side_effect=fake_set),
         "update": patch("agent_data.pg_store.update_doc", side_effect=fake_update),
         "stream": patch("agent_data.pg_store.stream_docs", side_effect=fake_stream),
@@ -137,6 +144,9 @@ def fake_vs(monkeypatch):
     store = FakeVectorStore()
     monkeypatch.setattr(vs_mod, "get_vector_store", lambda refresh=False: store)
     monkeypatch.setattr(vs_mod, "delete_document", store.delete_document)
+    monkeypatch.setattr(
+        vs_mod, "get_async_vector_store", lambda refresh=False: AsyncStoreAdapter(store)
+    )
     return store
 
 
@@ -169,8 +179,8 @@ def _create_doc(client, doc_id="test-doc", body="Original content", **kwargs):
 class TestUpdateVectorSync:
     """Tests for vector sync during document UPDATE."""
 
-    def test_update_content_triggers_delete_and_reembed(self, client, fake_vs):
-        """UPDATE with content change should delete old vectors then create new."""
+    def test_update_content_reembeds_without_delete(self, client, fake_vs):
+        """UPDATE with content change re-indexes in place; no delete-all first."""
         _create_doc(client, body="Old content about platypus")
         fake_vs.delete_calls.clear()
         fake_vs.upsert_calls.clear()
@@ -193,8 +203,8 @@ class TestUpdateVectorSync:
         assert r.status_code == 200
         assert r.json()["status"] == "updated"
 
-        # Verify delete was called BEFORE upsert
-        assert "test-doc" in fake_vs.delete_calls
+        # The store diffs chunks itself, so no bulk delete is issued
+        assert fake_vs.delete_calls == []
         assert len(fake_vs.upsert_calls) == 1
         assert fake_vs.upsert_calls[0]["content"] == "New content about kangaroo"
 
@@ -235,7 +245,7 @@ class TestUpdateVectorSync:
         results = fake_vs.search(query="content stays")
         assert len(results) == 1
 
-    def test_update_empty_content_removes_vectors(self, client, fake_vs):
+    def test_update_empty_content_removes_vectors(self, client, fake_vs, pg_mocks):
         """UPDATE with empty content should remove all vectors."""
         _create_doc(client, body="Some content to be cleared")
         assert fake_vs.count_by_document_id("test-doc") > 0
@@ -259,6 +269,9 @@ class TestUpdateVectorSync:
         # _sync_vector_entry skips when content is empty
         # so the vectors should be gone
         assert fake_vs.count_by_document_id("test-doc") == 0
+        # ...and the document is not left pending for a restart to re-enqueue
+        assert pg_mocks["store"]["test-doc"]["vector_status"] == "skipped"
+        assert server._pending_vector_document_ids() == []
 
     def test_update_nonexistent_returns_404(self, client, fake_vs):
         """UPDATE on nonexistent document should return 404."""
@@ -280,8 +293,8 @@ class TestUpdateVectorSync:
         assert len(fake_vs.delete_calls) == 0
         assert "nonexistent-doc" not in fake_vs.vectors
 
-    def test_update_multi_chunk_deletes_all_old_chunks(self, client, fake_vs):
-        """Long document with multiple chunks: ALL old chunks deleted on update."""
+    def test_update_multi_chunk_leaves_no_stale_chunks(self, client, fake_vs):
+        """Long document with multiple chunks: no old chunks survive an update."""
         # Create a long document that will produce multiple chunks
         long_body = (
             "Section A about elephants. " * 100
@@ -308,8 +321,8 @@ class TestUpdateVectorSync:
         )
         assert r.status_code == 200
 
-        # ALL old chunks should have been deleted
-        assert "test-doc" in fake_vs.delete_calls
+        # Stale chunks are pruned by the store, not by a delete-all
+        assert fake_vs.delete_calls == []
 
         # New content should be 1 chunk
         new_chunk_count = fake_vs.count_by_document_id("test-doc")
@@ -380,6 +393,123 @@ class TestDeleteVectorSync:
 # ===================================================================
 
 
+class TestWriteBehindSync:
+    """Document writes return before the vector sync runs on the queue."""
+
+    def _run(self, monkeypatch, scenario, debounce=0.2):
+        import httpx
+
+        from agent_data import vector_sync_queue as queue_mod
+
+        monkeypatch.setattr(queue_mod, "VECTOR_SYNC_DEBOUNCE", debounce)
+        queue = queue_mod.VectorSyncQueue()
+        monkeypatch.setattr(server, "vector_sync_queue", queue)
+
+        async def run():
+            await queue.start(
+                server._sync_vector_from_pg, give_up=server._mark_vector_sync_failed
+            )
+            transport = httpx.ASGITransport(app=server.app)
+            try:
+                async with httpx.AsyncClient(
+                    transport=transport, base_url="http://test", headers=HEADERS
+                ) as http:
+                    return await scenario(http, queue)
+            finally:
+                await queue.stop()
+
+        return asyncio.run(run())
+
+    def test_create_is_acknowledged_pending_then_synced(
+        self, monkeypatch, env, pg_mocks, fake_vs
+    ):
+        async def scenario(http, queue):
+            r = await http.post(
+                "/documents",
+                json={
+                    "document_id": "wb-doc",
+                    "parent_id": "root",
+                    "content": {"mime_type": "text/plain", "body": "Hello"},
+                    "metadata": {"title": "WB"},
+                },
+            )
+            assert r.status_code == 200
+            assert pg_mocks["store"]["wb-doc"]["vector_status"] == "pending"
+            assert fake_vs.upsert_calls == []
+            await queue.join()
+
+        self._run(monkeypatch, scenario)
+
+        assert pg_mocks["store"]["wb-doc"]["vector_status"] == "ready"
+        assert len(fake_vs.upsert_calls) == 1
+
+    def test_repeated_updates_coalesce_into_one_embed(
+        self, monkeypatch, env, pg_mocks, fake_vs
+    ):
+        pg_mocks["store"]["wb-doc"] = {
+            "document_id": "wb-doc",
+            "parent_id": "root",
+            "content": {"mime_type": "text/plain", "body": "v0"},
+            "metadata": {},
+            "revision": 1,
+            "deleted_at": None,
+        }
+
+        async def scenario(http, queue):
+            for i in range(1, 4):
+                r = await http.put(
+                    "/documents/wb-doc",
+                    json={
+                        "document_id": "wb-doc",
+                        "patch": {
+                            "content": {"mime_type": "text/plain", "body": f"v{i}"}
+                        },
+                        "update_mask": ["content"],
+                    },
+                )
+                assert r.status_code == 200
+            await queue.join()
+
+        # The debounce window covers all three writes
+        self._run(monkeypatch, scenario, debounce=0.5)
+
+        assert [c["content"] for c in fake_vs.upsert_calls] == ["v3"]
+        assert pg_mocks["store"]["wb-doc"]["vector_status"] == "ready"
+
+    def test_sync_that_keeps_failing_is_marked_error(
+        self, monkeypatch, env, pg_mocks, fake_vs
+    ):
+        from agent_data import vector_sync_queue as queue_mod
+
+        monkeypatch.setattr(queue_mod, "VECTOR_SYNC_MAX_RETRIES", 1)
+        monkeypatch.setattr(queue_mod, "VECTOR_SYNC_RETRY_SECONDS", 0)
+
+        def unavailable(**kwargs):
+            fake_vs.upsert_calls.append(kwargs)
+            raise ConnectionError("qdrant down")
+
+        monkeypatch.setattr(fake_vs, "upsert_document", unavailable)
+
+        async def scenario(http, queue):
+            r = await http.post(
+                "/documents",
+                json={
+                    "document_id": "wb-doc",
+                    "parent_id": "root",
+                    "content": {"mime_type": "text/plain", "body": "Hello"},
+                    "metadata": {"title": "WB"},
+                },
+            )
+            assert r.status_code == 200
+            await queue.join()
+
+        self._run(monkeypatch, scenario, debounce=0)
+
+        assert len(fake_vs.upsert_calls) == 2
+        assert pg_mocks["store"]["wb-doc"]["vector_status"] == "error"
+        assert pg_mocks["store"]["wb-doc"]["vector_error"] == "qdrant down"
+
+
 class TestCountByDocumentId:
     """Tests for QdrantVectorStore.count_by_document_id method."""
 
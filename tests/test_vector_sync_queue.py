@@ -0,0 +1,166 @@
+"""Unit tests for the write-behind vector sync queue."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agent_data import vector_sync_queue as queue_mod
+
+
+@pytest.fixture(autouse=True)
+def no_debounce(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(queue_mod, "VECTOR_SYNC_DEBOUNCE", 0)
+    monkeypatch.setattr(queue_mod, "VECTOR_SYNC_RETRY_SECONDS", 0)
+
+
+@pytest.mark.unit
+def test_enqueue_reports_false_when_not_running():
+    assert queue_mod.VectorSyncQueue().enqueue("doc") is False
+
+
+@pytest.mark.unit
+def test_update_during_sync_runs_one_follow_up():
+    queue = queue_mod.VectorSyncQueue()
+    synced: list[str] = []
+    release = asyncio.Event()
+
+    async def sync(document_id):
+        synced.append(document_id)
+        if len(synced) == 1:
+            await release.wait()
+
+    async def run():
+        await queue.start(sync, workers=2)
+        queue.enqueue("doc")
+        await asyncio.sleep(0.01)
+        # Two writes while the first sync is in flight coalesce into one re-sync
+        queue.enqueue("doc")
+        queue.enqueue("doc")
+        assert queue.stats()["in_flight"] == 1
+        assert queue.stats()["depth"] == 1
+        release.set()
+        await queue.join()
+        await queue.stop()
+
+    asyncio.run(run())
+
+    assert synced == ["doc", "doc"]
+
+
+@pytest.mark.unit
+def test_start_recovers_pending_documents_and_survives_errors(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(queue_mod, "VECTOR_SYNC_MAX_RETRIES", 0)
+    queue = queue_mod.VectorSyncQueue()
+    synced: list[str] = []
+
+    async def sync(document_id):
+        synced.append(document_id)
+        if document_id == "bad":
+            raise RuntimeError("boom")
+
+    async def run():
+        await queue.start(sync, recover=lambda: ["a", "bad", "b"])
+        await queue.join()
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert sorted(synced) == ["a", "b", "bad"]
+    assert stats["depth"] == 0
+
+
+def _error_count() -> float:
+    return queue_mod.SYNC_RESULTS.labels(status="error")._value.get()
+
+
+@pytest.mark.unit
+def test_failed_sync_is_retried_then_given_up(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(queue_mod, "VECTOR_SYNC_MAX_RETRIES", 2)
+    queue = queue_mod.VectorSyncQueue()
+    attempts: list[str] = []
+    gave_up: list[tuple[str, str]] = []
+    errors_before = _error_count()
+
+    async def sync(document_id):
+        attempts.append(document_id)
+        # A returned error result counts as a failure, not only exceptions
+        return SimpleNamespace(status="error", error="qdrant down")
+
+    async def give_up(document_id, error):
+        gave_up.append((document_id, error))
+
+    async def run():
+        await queue.start(sync, workers=1, give_up=give_up)
+        queue.enqueue("doc")
+        await queue.join()
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert attempts == ["doc", "doc", "doc"]
+    assert gave_up == [("doc", "qdrant down")]
+    assert _error_count() - errors_before == 3
+    assert stats["depth"] == 0
+
+
+@pytest.mark.unit
+def test_retry_succeeds_without_giving_up(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(queue_mod, "VECTOR_SYNC_RETRY_SECONDS", 0.05)
+    queue = queue_mod.VectorSyncQueue()
+    attempts: list[str] = []
+    gave_up: list[str] = []
+
+    async def sync(document_id):
+        attempts.append(document_id)
+        if attempts.count(document_id) == 1 and document_id == "flaky":
+            raise ConnectionError("refused")
+
+    async def give_up(document_id, error):
+        gave_up.append(document_id)
+
+    async def run():
+        await queue.start(sync, workers=1, give_up=give_up)
+        queue.enqueue("flaky")
+        await asyncio.sleep(0.01)
+        # The worker is free while "flaky" waits out its backoff
+        queue.enqueue("other")
+        await queue.join()
+        await queue.stop()
+
+    asyncio.run(run())
+
+    assert attempts == ["flaky", "other", "flaky"]
+    assert gave_up == []
+
+
+@pytest.mark.unit
+def test_debounce_waits_on_a_timer_not_a_worker(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(queue_mod, "VECTOR_SYNC_DEBOUNCE", 0.1)
+    queue = queue_mod.VectorSyncQueue()
+    synced: list[str] = []
+
+    async def sync(document_id):
+        synced.append(document_id)
+
+    async def run():
+        await queue.start(sync, workers=1)
+        queue.enqueue("doc")
+        await asyncio.sleep(0.02)
+        # Nothing is queued for the worker until the quiet period ends
+        assert queue._queue.qsize() == 0
+        assert queue.enqueue("doc") is True
+        await queue.join()
+        await queue.stop()
+
+    asyncio.run(run())
+
+    assert synced == ["doc"]